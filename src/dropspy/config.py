@@ -9,11 +9,58 @@ load_dotenv()
 TELEGRAM_API_ID = int(os.getenv("TELEGRAM_API_ID", "0"))
 TELEGRAM_API_HASH = os.getenv("TELEGRAM_API_HASH", "")
 TELEGRAM_SESSION_NAME = os.getenv("TELEGRAM_SESSION_NAME", "default_telegram_session")
+_session_names_str = os.getenv("TELEGRAM_SESSION_NAMES", "")
+TELEGRAM_SESSION_NAMES = [
+    name.strip() for name in _session_names_str.split(",") if name.strip()
+] or [TELEGRAM_SESSION_NAME]
 _target_chats_str = os.getenv("TELEGRAM_TARGET_CHATS", "")
 TELEGRAM_TARGET_CHATS = [
     chat.strip() for chat in _target_chats_str.split(",") if chat.strip()
 ]
 TELEGRAM_DEFAULT_FETCH_DAYS = int(os.getenv("TELEGRAM_DEFAULT_FETCH_DAYS", "7"))
+TELEGRAM_FETCH_CONCURRENCY = int(os.getenv("TELEGRAM_FETCH_CONCURRENCY", "1"))
+TELEGRAM_ENTITY_CACHE_TTL_HOURS = int(
+    os.getenv("TELEGRAM_ENTITY_CACHE_TTL_HOURS", "24")
+)
+FETCH_STREAMING = os.getenv("FETCH_STREAMING", "false").lower() in ("1", "true", "yes")
+
+# --- Storage Settings ---
+STORAGE_FORMAT = os.getenv("STORAGE_FORMAT", "json").lower()
+STORAGE_COMPRESSION = os.getenv("STORAGE_COMPRESSION", "").lower()
+STORAGE_DEDUP_TEXTS = os.getenv("STORAGE_DEDUP_TEXTS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+FETCH_STORE_BACKEND = os.getenv("FETCH_STORE_BACKEND", "files").lower()
+FETCH_COMPRESS_AFTER_DAYS = int(os.getenv("FETCH_COMPRESS_AFTER_DAYS", "0"))
+FETCH_RETENTION_DAYS = int(os.getenv("FETCH_RETENTION_DAYS", "0"))
+
+# --- Prebatch Settings ---
+PREBATCH_DEDUP_MODE = os.getenv("PREBATCH_DEDUP_MODE", "exact").lower()
+PREBATCH_SIMILARITY_THRESHOLD = float(os.getenv("PREBATCH_SIMILARITY_THRESHOLD", "0.7"))
+
+# Normalization rules applied before dedup and token counting; empty disables it
+_normalize_rules_str = os.getenv("PREBATCH_NORMALIZE", "")
+PREBATCH_NORMALIZE = [
+    rule.strip().lower() for rule in _normalize_rules_str.split(",") if rule.strip()
+]
+PREBATCH_FOOTER_PATTERNS_FILE = os.getenv("PREBATCH_FOOTER_PATTERNS_FILE", "")
+# Worker processes for `prebatch --all`
+PREBATCH_WORKERS = int(os.getenv("PREBATCH_WORKERS", str(os.cpu_count() or 1)))
+
+# Messages already pre-batched from other fetch windows: off, drop or mark
+PREBATCH_SEEN_INDEX = os.getenv("PREBATCH_SEEN_INDEX", "off").lower()
+if PREBATCH_SEEN_INDEX not in ("off", "drop", "mark"):
+    raise ValueError(
+        f"PREBATCH_SEEN_INDEX must be off, drop or mark, not {PREBATCH_SEEN_INDEX!r}"
+    )
+PREBATCH_SEEN_MAX_AGE_DAYS = int(os.getenv("PREBATCH_SEEN_MAX_AGE_DAYS", "30"))
+PREBATCH_SEEN_MAX_ENTRIES = int(os.getenv("PREBATCH_SEEN_MAX_ENTRIES", "1000000"))
+
+# --- Watch Mode Settings ---
+WATCH_FLUSH_SIZE = int(os.getenv("WATCH_FLUSH_SIZE", "200"))
+WATCH_FLUSH_INTERVAL_SECONDS = float(os.getenv("WATCH_FLUSH_INTERVAL_SECONDS", "60"))
 
 # --- Google Generative AI API Settings ---
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -47,6 +94,9 @@ _CHAT_MESSAGES_SUBDIR_NAME = "fetches"
 _FETCH_RECORD_FILENAME_ONLY = "last_fetch.json"
 _CHAT_PREBATCHES_SUBDIR_NAME = "prebatches"
 _CHAT_BATCHES_SUBDIR_NAME = "batches"
+_EXPORTS_SUBDIR_NAME = "exports"
+_BLOBS_SUBDIR_NAME = "blobs"
+_SEEN_SUBDIR_NAME = "seen"
 _LOG_SUBDIR_NAME = "logs"  # Example for logs, if you add logging
 
 
@@ -58,6 +108,9 @@ def get_data_path(filename_or_subdir: str) -> str:
 PATH_CHAT_MESSAGES_DIR = get_data_path(_CHAT_MESSAGES_SUBDIR_NAME)
 PATH_CHAT_PREBATCHES_DIR = get_data_path(_CHAT_PREBATCHES_SUBDIR_NAME)
 PATH_CHAT_BATCHES_DIR = get_data_path(_CHAT_BATCHES_SUBDIR_NAME)
+PATH_EXPORTS_DIR = get_data_path(_EXPORTS_SUBDIR_NAME)
+PATH_BLOBS_DIR = get_data_path(_BLOBS_SUBDIR_NAME)
+PATH_SEEN_DIR = get_data_path(_SEEN_SUBDIR_NAME)
 PATH_FETCH_RECORD_FILE = get_data_path(_FETCH_RECORD_FILENAME_ONLY)
 PATH_LOG_DIR = get_data_path(_LOG_SUBDIR_NAME)  # Example for logs
 
@@ -1,29 +1,37 @@
 __all__ = ["BatchPipeline", "BatchStore"]
 
+import os
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 from dropspy.llm.tokenizer import Tokenizer
+from dropspy.utils.blob_store import BlobStore
 from dropspy.utils.formatting import jsonToStr
 from dropspy.utils.json_store import JSONStore
+from dropspy.utils.serializers import Serializer, split_extension
+
 
 class BatchPipeline:
     def __init__(
         self,
         output_dir: str,
         tokenizer: Tokenizer,
+        serializer: Optional[Serializer] = None,
+        blob_store: Optional[BlobStore] = None,
     ):
-        self.store = BatchStore(data_dir=output_dir)
+        self.store = BatchStore(
+            data_dir=output_dir, serializer=serializer, blob_store=blob_store
+        )
         self.splitter = _BatchSplitter(tokenizer=tokenizer)
 
     def run(
         self,
         max_tokens_per_batch: int,
         input_filename: str,
-        prebatched_messages: List[Dict],
+        prebatched_messages: Iterable[Dict],
     ) -> List[str]:
         try:
-            # Step 1: split messages into batches
-            batches = self.splitter.split(
+            # Step 1: split messages into batches, lazily
+            batches = self.splitter.iter_split(
                 max_tokens_per_batch,
                 prebatched_messages,
             )
@@ -49,27 +57,44 @@ class BatchPipeline:
 
 
 class BatchStore(JSONStore):
-    def __init__(self, data_dir: str):
-        super().__init__(data_dir)
+    stage = "batch"
+
+    def __init__(
+        self,
+        data_dir: str,
+        serializer: Optional[Serializer] = None,
+        blob_store: Optional[BlobStore] = None,
+    ):
+        super().__init__(data_dir, serializer, blob_store)
 
     def save(
         self,
-        batches: List[List[Dict]],
+        batches: Iterable[List[Dict]],
         input_filename: str,
     ) -> List[str]:
         try:
-            saved_files = []
-            stem = Path(input_filename).stem
+            stem, _ = split_extension(Path(input_filename).name)
             batch_dir = Path(self.data_dir) / stem
             batch_dir.mkdir(parents=True, exist_ok=True)
 
-            total_batches = len(batches)
-            for idx, messages in enumerate(batches):
-                filename = f"{idx+1}of{total_batches}.json"
-                path = batch_dir / filename
-                message_dict = {str(i): message for i, message in enumerate(messages)}
-                self._save(str(path), message_dict)
-                saved_files.append(str(path))
+            # The total is only known once every batch is written, so each one
+            # is saved as a part and renamed to "{n}of{total}" at the end
+            with self.batched_manifest():
+                part_files = []
+                for idx, messages in enumerate(batches):
+                    path = batch_dir / f"{idx+1}.part"
+                    message_dict = {
+                        str(i): message for i, message in enumerate(messages)
+                    }
+                    part_files.append(self._save(str(path), message_dict))
+
+                saved_files = []
+                total_batches = len(part_files)
+                for idx, part_file in enumerate(part_files):
+                    filename = f"{idx+1}of{total_batches}{self.serializer.extension}"
+                    path = str(batch_dir / filename)
+                    self._move(part_file, path)
+                    saved_files.append(path)
             return saved_files
         except Exception as e:
             raise RuntimeError(f"Failed to store batches: {e}")
@@ -82,13 +107,20 @@ class _BatchSplitter:
     def split(
         self,
         max_tokens_per_batch: int,
-        messages: List[Dict[str, Any]],
+        messages: Iterable[Dict[str, Any]],
     ) -> List[List[Dict[str, Any]]]:
-        batches = []
+        return list(self.iter_split(max_tokens_per_batch, messages))
+
+    def iter_split(
+        self,
+        max_tokens_per_batch: int,
+        messages: Iterable[Dict[str, Any]],
+    ) -> Iterator[List[Dict[str, Any]]]:
         current_batch = []
         current_tokens = 0
 
         for msg in messages:
+            msg = _prompt_record(msg)
             formatted = jsonToStr(msg)
             msg_tokens = self.tokenizer.count_tokens(formatted)
 
@@ -101,7 +133,7 @@ class _BatchSplitter:
 
             if current_tokens + msg_tokens > max_tokens_per_batch:
                 if current_batch:
-                    batches.append(current_batch)
+                    yield current_batch
                 current_batch = [msg]
                 current_tokens = msg_tokens
             else:
@@ -109,5 +141,15 @@ class _BatchSplitter:
                 current_tokens += msg_tokens
 
         if current_batch:
-            batches.append(current_batch)
-        return batches
+            yield current_batch
+
+
+def _prompt_record(msg: Dict[str, Any]) -> Dict[str, Any]:
+    # Normalized texts are what the model reads; the originals stay in the prebatch
+    if "normalized_text" not in msg:
+        return msg
+    return {
+        k: (msg["normalized_text"] if k == "text" else v)
+        for k, v in msg.items()
+        if k != "normalized_text"
+    }
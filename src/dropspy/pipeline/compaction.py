@@ -0,0 +1,178 @@
+__all__ = ["compact_fetches", "apply_retention"]
+
+from datetime import datetime, timedelta, timezone
+import gzip
+from itertools import pairwise
+import logging
+import os
+import shutil
+from typing import Dict, Iterator, List, Optional, Tuple
+from dropspy.pipeline.fetch import (
+    FetchStore,
+    _make_messages_filename,
+    _parse_messages_filename,
+)
+from dropspy.utils.merge import iso_to_timestamp, merge_by_time
+from dropspy.utils.ndjson import (
+    NDJSON_EXTENSION,
+    TIME_INDEX_SUFFIX,
+    write_indexed_records,
+)
+
+logger = logging.getLogger(__name__)
+
+_DAY = timedelta(days=1)
+
+
+def compact_fetches(fetch_store: FetchStore, before: datetime) -> List[str]:
+    """Merges fetch files that ended before ``before`` into one segment per UTC day.
+
+    A segment is a time-ordered NDJSON file named after its day window, so it
+    lists, sorts and loads like any other fetch file, with a sidecar hourly
+    index for range reads; the manifest marks it as a segment. Messages are bucketed by their own time
+    (``day < time <= next day``, like fetch windows), merged with the day's
+    existing segment and deduplicated on (channel_id, id). Only the days
+    before ``before`` are touched, so today's bucket is never sealed early.
+    """
+    cutoff = _day_start(before)
+    inputs = [
+        filename
+        for filename in fetch_store.get_filenames()
+        if not _is_segment(fetch_store, filename)
+        and _parse_messages_filename(filename)[1] <= cutoff
+    ]
+    if not inputs:
+        return []
+    merged = merge_by_time(
+        (_time_ordered(fetch_store, filename) for filename in inputs),
+        time_of=lambda record: record["time"],
+    )
+    with fetch_store.batched_manifest():
+        segments = [
+            _write_segment(fetch_store, day, records)
+            for day, records in _group_by_day(merged)
+        ]
+        for filename in inputs:
+            # A segment indexed before segments were marked is rewritten in place
+            if filename not in segments:
+                _remove(fetch_store, filename)
+    logger.info("Compacted %d fetch files into %d segments", len(inputs), len(segments))
+    return segments
+
+
+def apply_retention(
+    fetch_store: FetchStore,
+    now: datetime,
+    compress_after_days: Optional[int] = None,
+    drop_after_days: Optional[int] = None,
+) -> Dict[str, int]:
+    """Gzips or deletes day segments whose window ended that many days before ``now``."""
+    counts = {"compressed": 0, "dropped": 0}
+    for filename in fetch_store.get_filenames():
+        if not _is_segment(fetch_store, filename):
+            continue
+        age = now - _parse_messages_filename(filename)[1]
+        if drop_after_days and age > timedelta(days=drop_after_days):
+            _remove(fetch_store, filename)
+            counts["dropped"] += 1
+        elif (
+            compress_after_days
+            and age > timedelta(days=compress_after_days)
+            and filename.endswith(NDJSON_EXTENSION)
+        ):
+            _compress(fetch_store, filename)
+            counts["compressed"] += 1
+    return counts
+
+
+def _time_ordered(fetch_store: FetchStore, filename: str) -> Iterator[Dict]:
+    # Fetch files from before merged fetching hold one newest-first block per
+    # channel; those are sorted, the rest are streamed as they are
+    times = (iso_to_timestamp(r["time"]) for r in fetch_store.iter_stored(filename))
+    if all(a <= b for a, b in pairwise(times)):
+        return fetch_store.iter_message_records(filename)
+    return iter(
+        sorted(
+            fetch_store.iter_message_records(filename),
+            key=lambda record: iso_to_timestamp(record["time"]),
+        )
+    )
+
+
+def _group_by_day(
+    records: Iterator[Dict],
+) -> Iterator[Tuple[datetime, List[Dict]]]:
+    day, bucket = None, []
+    for record in records:
+        record_day = _bucket(datetime.fromisoformat(record["time"]))
+        if record_day != day:
+            if bucket:
+                yield day, bucket
+            day, bucket = record_day, []
+        bucket.append(record)
+    if bucket:
+        yield day, bucket
+
+
+def _write_segment(fetch_store: FetchStore, day: datetime, records: List[Dict]) -> str:
+    filename = _make_messages_filename(
+        day.isoformat(), (day + _DAY).isoformat(), NDJSON_EXTENSION
+    )
+    path = os.path.join(fetch_store.data_dir, filename)
+    # A late file for an already compacted day is merged into its segment
+    existing = [f for f in (filename, filename + ".gz") if _exists(fetch_store, f)]
+    sources = [iter(records)] + [_time_ordered(fetch_store, f) for f in existing]
+    seen = set()
+
+    def unique(merged: Iterator[Dict]) -> Iterator[Dict]:
+        for record in merged:
+            key = (record["channel_id"], record["id"])
+            if key not in seen:
+                seen.add(key)
+                yield record
+
+    records = unique(merge_by_time(sources, time_of=lambda record: record["time"]))
+    if fetch_store.blob_store is not None:
+        records = fetch_store.blob_store.dehydrate(records)
+    write_indexed_records(path, records)
+    if filename + ".gz" in existing:
+        _remove(fetch_store, filename + ".gz")
+    fetch_store.track_file(path, segment=True)
+    return filename
+
+
+def _compress(fetch_store: FetchStore, filename: str):
+    path = os.path.join(fetch_store.data_dir, filename)
+    with open(path, "rb") as src, gzip.open(f"{path}.gz.part", "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(f"{path}.gz.part", f"{path}.gz")
+    _remove(fetch_store, filename)
+    fetch_store.track_file(f"{path}.gz", segment=True)
+
+
+def _remove(fetch_store: FetchStore, filename: str):
+    path = os.path.join(fetch_store.data_dir, filename)
+    for p in (path, path + TIME_INDEX_SUFFIX):
+        if os.path.exists(p):
+            os.remove(p)
+    if fetch_store.manifest is not None:
+        fetch_store.manifest.remove(filename)
+
+
+def _exists(fetch_store: FetchStore, filename: str) -> bool:
+    return os.path.exists(os.path.join(fetch_store.data_dir, filename))
+
+
+def _is_segment(fetch_store: FetchStore, filename: str) -> bool:
+    entry = fetch_store.manifest.get(filename)
+    return entry is not None and entry.segment
+
+
+def _bucket(time: datetime) -> datetime:
+    # Windows are (start, end], so midnight itself closes the previous day
+    return _day_start(time - timedelta(microseconds=1))
+
+
+def _day_start(time: datetime) -> datetime:
+    utc = time.astimezone(timezone.utc)
+    return utc.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -0,0 +1,144 @@
+__all__ = ["EXPORT_FORMATS", "export_records", "read_messages"]
+
+from datetime import datetime, timezone
+from itertools import islice
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+    ds = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {"parquet": "parquet", "arrow": "ipc"}
+
+
+def _schema() -> "pa.Schema":
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("channel_id", pa.int64()),
+            # Few distinct handles over many rows, so store each one once per chunk
+            ("channel_handle", pa.dictionary(pa.int32(), pa.string())),
+            ("time", pa.timestamp("s", tz="UTC")),
+            ("text", pa.string()),
+            ("dup_count", pa.int32()),
+            ("day", pa.string()),
+        ]
+    )
+
+
+def _partitioning() -> "ds.Partitioning":
+    return ds.partitioning(
+        pa.schema([("day", pa.string()), ("channel_id", pa.int64())]), flavor="hive"
+    )
+
+
+def export_records(
+    records: Iterable[Dict[str, Any]],
+    output_dir: str,
+    format: str = "parquet",
+    batch_size: int = 64 * 1024,
+) -> int:
+    """Writes message records to a dataset partitioned by ``day=``/``channel_id=``.
+
+    Records are converted in fixed-size record batches, so the input can be a
+    stream of any length. Partitions written by this call replace the same
+    partitions of an earlier export; others are left alone.
+    """
+    _require_pyarrow()
+    schema = _schema()
+    total = 0
+
+    def batches() -> Iterator["pa.RecordBatch"]:
+        nonlocal total
+        records_iter = iter(records)
+        while chunk := list(islice(records_iter, batch_size)):
+            total += len(chunk)
+            # One batch per channel keeps each partition file on one handle
+            # dictionary, which Arrow IPC files require
+            by_channel: Dict[int, List[Dict[str, Any]]] = {}
+            for record in chunk:
+                by_channel.setdefault(record["channel_id"], []).append(record)
+            for channel_records in by_channel.values():
+                yield _to_record_batch(channel_records, schema)
+
+    ds.write_dataset(
+        batches(),
+        output_dir,
+        schema=schema,
+        format=EXPORT_FORMATS[format],
+        partitioning=_partitioning(),
+        existing_data_behavior="delete_matching",
+    )
+    logger.info("Exported %d messages to %s", total, output_dir)
+    return total
+
+
+def read_messages(
+    dataset_dir: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    channel_ids: Optional[Iterable[int]] = None,
+    columns: Optional[List[str]] = None,
+    format: str = "parquet",
+) -> "pa.Table":
+    """Reads an exported dataset with ``start < time <= end`` and channel filters.
+
+    The filters are pushed down, so partitions outside the requested days and
+    channels are never opened.
+    """
+    _require_pyarrow()
+    dataset = ds.dataset(
+        dataset_dir,
+        schema=_schema(),
+        format=EXPORT_FORMATS[format],
+        partitioning=_partitioning(),
+    )
+    conditions = []
+    if start is not None:
+        conditions.append(ds.field("day") >= _day(start))
+        conditions.append(ds.field("time") > pa.scalar(start, pa.timestamp("s", "UTC")))
+    if end is not None:
+        conditions.append(ds.field("day") <= _day(end))
+        conditions.append(ds.field("time") <= pa.scalar(end, pa.timestamp("s", "UTC")))
+    if channel_ids is not None:
+        conditions.append(ds.field("channel_id").isin(list(channel_ids)))
+    condition = None
+    for c in conditions:
+        condition = c if condition is None else condition & c
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def _to_record_batch(
+    records: List[Dict[str, Any]], schema: "pa.Schema"
+) -> "pa.RecordBatch":
+    times = [datetime.fromisoformat(r["time"]) for r in records]
+    return pa.record_batch(
+        [
+            pa.array([r["id"] for r in records], pa.int64()),
+            pa.array([r["channel_id"] for r in records], pa.int64()),
+            pa.array([r["channel_handle"] for r in records]).dictionary_encode(),
+            pa.array(times, pa.timestamp("s", tz="UTC")),
+            pa.array([r["text"] for r in records], pa.string()),
+            pa.array([r.get("dup_count") for r in records], pa.int32()),
+            pa.array([_day(t) for t in times], pa.string()),
+        ],
+        schema=schema,
+    )
+
+
+def _day(time: datetime) -> str:
+    return time.astimezone(timezone.utc).date().isoformat()
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError(
+            "The 'pyarrow' package is required to export messages;"
+            " install it with the 'export' extra"
+        )
@@ -1,44 +1,369 @@
+import asyncio
+import json
 import logging
+import os
+import shutil
 from telethon.sync import TelegramClient
 from telethon.tl.functions.messages import GetHistoryRequest
 from datetime import datetime, timedelta, timezone
 from dropspy.telegram.api_adapter import TelegramAPIAdapter
-from dropspy.telegram.types import RawMessage
+from dropspy.telegram.message_batch import MessageBatch, merge_batches
+from dropspy.telegram.types import ChannelCursor, PagingCheckpoint, RawMessage
+from dropspy.utils.atomic import file_lock, write_atomic
+from dropspy.utils.blob_store import BlobStore
 from dropspy.utils.json_store import JSONStore
-from typing import Dict, List, Optional
+from dropspy.utils.merge import merge_by_time
+from dropspy.utils.serializers import Serializer, split_extension
+from dropspy.utils.write_behind import WriteBehind
+from dropspy.utils.ndjson import (
+    NDJSON_EXTENSION,
+    append_records,
+    index_offset,
+    iter_records,
+    iter_records_reversed,
+)
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from telethon.tl.types import Channel
 
 logger = logging.getLogger(__name__)
 
 
 class FetchStore(JSONStore):
-    def __init__(self, data_dir: str):
-        super().__init__(data_dir)
+    """Fetched message files plus the fetch state: the last fetch time and cursors.
+
+    State updates are appended to ``last_fetch.journal`` and folded into the
+    ``last_fetch`` snapshot every ``checkpoint_every`` updates. Either one is
+    enough to recover the state, so a crash mid-write never loses the
+    cursors and forces a full re-fetch.
+    """
+
+    stage = "fetch"
+    checkpoint_every = 32
+
+    def __init__(
+        self,
+        data_dir: str,
+        serializer: Optional[Serializer] = None,
+        blob_store: Optional[BlobStore] = None,
+    ):
+        super().__init__(data_dir, serializer, blob_store)
         self.LAST_FETCH_KEY = "last_fetch"
+        self.CHANNELS_KEY = "channels"
         self.last_fetch_data_filename = f"{self.LAST_FETCH_KEY}.json"
+        self.last_fetch_journal_path = os.path.join(
+            data_dir, f"{self.LAST_FETCH_KEY}.journal"
+        )
 
-    def save_messages(self, filename: str, messages: List[RawMessage]) -> str:
+    def save_messages(
+        self, filename: str, messages: List[RawMessage] | MessageBatch
+    ) -> str:
         return self._save(filename, messages)
 
     def load_messages_by_filename(self, filename: str) -> List[RawMessage]:
         messages = self._load(filename) or []
         return [RawMessage(**message) for message in messages]
 
+    def iter_message_records(self, filename: str) -> Iterator[Dict]:
+        return self._iter(filename)
+
     def load_last_fetch_times(self) -> datetime | None:
-        last_fetch_file = self._load(self.last_fetch_data_filename) or {}
-        last_fetch = last_fetch_file.get(self.LAST_FETCH_KEY, None)
+        last_fetch = self._load_fetch_state()[0].get(self.LAST_FETCH_KEY)
         if last_fetch is None:
             return None
         logger.info("Last fetch time: %s", last_fetch)
         return datetime.fromisoformat(last_fetch)
 
-    def save_last_fetch_times(self, last_fetch: datetime):
-        data = {self.LAST_FETCH_KEY: last_fetch.isoformat()}
-        return self._save(self.last_fetch_data_filename, data)
+    def load_channel_cursors(self) -> Dict[int, ChannelCursor]:
+        channels = self._load_fetch_state()[0][self.CHANNELS_KEY]
+        return {
+            int(channel_id): ChannelCursor(**cursor)
+            for channel_id, cursor in channels.items()
+        }
+
+    def save_last_fetch_times(
+        self,
+        last_fetch: datetime,
+        cursors: Optional[Dict[int, ChannelCursor]] = None,
+    ):
+        # Another process (e.g. watch next to a cron fetch) may append or
+        # rewrite the journal too; an append must not land in a rewritten one
+        with file_lock(f"{self.last_fetch_journal_path}.lock"):
+            state, journaled = self._load_fetch_state()
+            channels = state[self.CHANNELS_KEY]
+            # Only cursors that moved are journaled; the rest are already recorded
+            changed = {
+                str(channel_id): cursor.to_json()
+                for channel_id, cursor in (cursors or {}).items()
+                if channels.get(str(channel_id)) != cursor.to_json()
+            }
+            entry = {
+                self.LAST_FETCH_KEY: last_fetch.isoformat(),
+                self.CHANNELS_KEY: changed,
+            }
+            try:
+                with open(self.last_fetch_journal_path, "a", encoding="utf-8") as f:
+                    append_records(f, [entry])
+                    os.fsync(f.fileno())
+            except Exception as e:
+                raise RuntimeError(e)
+            state[self.LAST_FETCH_KEY] = entry[self.LAST_FETCH_KEY]
+            channels.update(changed)
+            if journaled + 1 >= self.checkpoint_every or not os.path.exists(
+                self._resolve_path(self.last_fetch_data_filename)
+            ):
+                self._checkpoint_fetch_state(state)
+
+    def _load_fetch_state(self) -> Tuple[Dict, int]:
+        """The snapshot with the journal replayed over it, and the entries replayed."""
+        state = {self.LAST_FETCH_KEY: None, self.CHANNELS_KEY: {}}
+        snapshot = None
+        try:
+            snapshot = self._read(self.last_fetch_data_filename)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error("Unreadable fetch state, recovering from the journal: %s", e)
+        if snapshot is None and not os.path.exists(self.last_fetch_journal_path):
+            if os.path.exists(self._resolve_path(self.last_fetch_data_filename)):
+                # Starting over from the default window could mean days of re-fetching
+                raise RuntimeError(
+                    f"Fetch state in {self.data_dir} is unreadable and has no "
+                    "journal; fix or remove it to fetch again"
+                )
+            return state, 0
+        if snapshot is not None:
+            state[self.LAST_FETCH_KEY] = snapshot.get(self.LAST_FETCH_KEY)
+            state[self.CHANNELS_KEY] = {
+                str(k): v for k, v in snapshot.get(self.CHANNELS_KEY, {}).items()
+            }
+        journaled = 0
+        if os.path.exists(self.last_fetch_journal_path):
+            for entry in iter_records(self.last_fetch_journal_path):
+                if entry.get("checkpoint"):
+                    # The journal restarts from a full copy of the state
+                    state[self.CHANNELS_KEY] = {}
+                state[self.LAST_FETCH_KEY] = entry[self.LAST_FETCH_KEY]
+                state[self.CHANNELS_KEY].update(entry[self.CHANNELS_KEY])
+                journaled += 1
+        return state, journaled
+
+    def _checkpoint_fetch_state(self, state: Dict):
+        self._save(self.last_fetch_data_filename, state)
+        # Restart the journal from the full state instead of truncating it, so
+        # it stays enough to recover from even if the snapshot is damaged
+        entry = dict(state, checkpoint=True)
+        write_atomic(
+            self.last_fetch_journal_path,
+            (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"),
+        )
+
+    # Async variants run the blocking methods on a worker thread, so a fetch
+    # keeps receiving pages while earlier ones are encoded and written
+    async def asave_messages(
+        self, filename: str, messages: List[RawMessage] | MessageBatch
+    ) -> str:
+        return await asyncio.to_thread(self.save_messages, filename, messages)
+
+    async def aload_messages_by_filename(self, filename: str) -> List[RawMessage]:
+        return await asyncio.to_thread(self.load_messages_by_filename, filename)
+
+    async def asave_last_fetch_times(
+        self,
+        last_fetch: datetime,
+        cursors: Optional[Dict[int, ChannelCursor]] = None,
+    ):
+        return await asyncio.to_thread(self.save_last_fetch_times, last_fetch, cursors)
+
+    def iter_messages_between(
+        self, start: datetime, end: datetime
+    ) -> Iterator[RawMessage]:
+        """Yields messages with ``start < time <= end`` from every overlapping window file."""
+        seen = set()
+        for filename in self.get_filenames():
+            window_start, window_end = _parse_messages_filename(filename)
+            if window_end <= start or window_start >= end:
+                continue
+            for record in self._iter_from(filename, start):
+                message = RawMessage(**record)
+                key = (message.channel_id, message.id)
+                if (
+                    key in seen
+                    or not start < datetime.fromisoformat(message.time) <= end
+                ):
+                    continue
+                seen.add(key)
+                yield message
+
+    def _iter_from(self, filename: str, start: datetime) -> Iterator[Dict]:
+        path = self._resolve_path(filename)
+        if path.endswith(NDJSON_EXTENSION) and os.path.exists(path):
+            # Compacted segments carry an hourly index to seek past earlier hours
+            records = iter_records(path, index_offset(path, start))
+            if self.blob_store is not None:
+                return self.blob_store.hydrate(records)
+            return records
+        return self.iter_message_records(filename)
+
+    def _is_tracked(self, path: str) -> bool:
+        stem, _ = split_extension(os.path.basename(path))
+        return stem != self.LAST_FETCH_KEY and super()._is_tracked(path)
 
     def get_filenames(self):
-        files = [f for f in self._list_files() if f != self.last_fetch_data_filename]
+        files = [
+            f
+            for f in self._list_files()
+            if split_extension(f)[0] != self.LAST_FETCH_KEY
+        ]
         return files
 
+    def open_stream(self, start: datetime, end: datetime) -> "FetchStream":
+        filename = _make_messages_filename(
+            start.isoformat(), end.isoformat(), NDJSON_EXTENSION
+        )
+        return FetchStream(
+            spool_dir=os.path.join(self.data_dir, SPOOL_DIRNAME, filename),
+            output_path=os.path.join(self.data_dir, filename),
+            start=start,
+            end=end,
+            on_finalize=self.track_file,
+            blob_store=self.blob_store,
+        )
+
+    def pending_streams(self) -> List["FetchStream"]:
+        spool_root = os.path.join(self.data_dir, SPOOL_DIRNAME)
+        if not os.path.isdir(spool_root):
+            return []
+        streams = []
+        for filename in sorted(os.listdir(spool_root)):
+            start, end = _parse_messages_filename(filename)
+            streams.append(self.open_stream(start, end))
+        return streams
+
+
+SPOOL_DIRNAME = ".spool"
+
+
+class FetchStream:
+    """Appends fetched pages to per-channel spool files as they arrive.
+
+    Pages come back newest first, so each spool file is in descending order;
+    ``finalize`` reads them back to front and merges them into one ascending
+    NDJSON file, holding only one message per channel in memory. The paging
+    position of every channel is checkpointed next to the spool files, with
+    the spool length it covers, so an interrupted stream can be resumed
+    instead of fetched again and never repeats a page.
+    """
+
+    PROGRESS_FILENAME = "progress.json"
+
+    def __init__(
+        self,
+        spool_dir: str,
+        output_path: str,
+        start: datetime,
+        end: datetime,
+        on_finalize: Optional[Callable[[str], None]] = None,
+        blob_store: Optional[BlobStore] = None,
+    ):
+        self.spool_dir = spool_dir
+        self.on_finalize = on_finalize
+        self.blob_store = blob_store
+        self.output_path = output_path
+        self.start = start
+        self.end = end
+        self.latest: Dict[int, ChannelCursor] = {}
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.checkpoints, self.spool_sizes = self._load_progress()
+        self._truncate_spools()
+
+    def write_page(
+        self,
+        channel_id: int,
+        messages: List[RawMessage],
+        checkpoint: Optional[PagingCheckpoint] = None,
+    ):
+        path = os.path.join(self.spool_dir, f"{channel_id}{NDJSON_EXTENSION}")
+        with open(path, "a", encoding="utf-8") as f:
+            append_records(f, (message.to_json() for message in messages))
+            os.fsync(f.fileno())
+        if checkpoint is not None:
+            self.checkpoints[channel_id] = checkpoint
+            self.spool_sizes[channel_id] = os.path.getsize(path)
+            self._save_progress()
+
+    def finalize(self) -> str:
+        spools = [
+            os.path.join(self.spool_dir, f)
+            for f in sorted(os.listdir(self.spool_dir))
+            if f.endswith(NDJSON_EXTENSION)
+        ]
+        merged = merge_by_time(
+            (iter_records_reversed(path) for path in spools),
+            time_of=lambda record: record["time"],
+        )
+        records = (self._track_latest(record) for record in merged)
+        if self.blob_store is not None:
+            records = self.blob_store.dehydrate(records)
+        tmp_path = f"{self.output_path}.part"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            append_records(f, records)
+        os.replace(tmp_path, self.output_path)
+        shutil.rmtree(self.spool_dir)
+        if self.on_finalize is not None:
+            self.on_finalize(self.output_path)
+        return self.output_path
+
+    def _track_latest(self, record: Dict) -> Dict:
+        cursor = self.latest.get(record["channel_id"])
+        if cursor is None or record["id"] > cursor.last_message_id:
+            self.latest[record["channel_id"]] = ChannelCursor(
+                channel_id=record["channel_id"],
+                last_message_id=record["id"],
+                last_message_time=record["time"],
+            )
+        return record
+
+    def _load_progress(
+        self,
+    ) -> Tuple[Dict[int, PagingCheckpoint], Optional[Dict[int, int]]]:
+        path = os.path.join(self.spool_dir, self.PROGRESS_FILENAME)
+        if not os.path.exists(path):
+            return {}, {}
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if "checkpoints" not in data:
+            # Older progress files hold only the checkpoints
+            return {int(k): PagingCheckpoint(**v) for k, v in data.items()}, None
+        checkpoints = {
+            int(k): PagingCheckpoint(**v) for k, v in data["checkpoints"].items()
+        }
+        return checkpoints, {int(k): v for k, v in data["spool_sizes"].items()}
+
+    def _save_progress(self):
+        data = {
+            "checkpoints": {k: v.to_json() for k, v in self.checkpoints.items()},
+            "spool_sizes": self.spool_sizes,
+        }
+        write_atomic(
+            os.path.join(self.spool_dir, self.PROGRESS_FILENAME),
+            json.dumps(data).encode("utf-8"),
+        )
+
+    def _truncate_spools(self):
+        # Pages appended after their channel's last checkpoint are fetched
+        # again on resume, so they are dropped rather than merged twice
+        if self.spool_sizes is None:
+            self.spool_sizes = {}
+            return
+        for f in os.listdir(self.spool_dir):
+            if not f.endswith(NDJSON_EXTENSION):
+                continue
+            path = os.path.join(self.spool_dir, f)
+            size = self.spool_sizes.get(int(f[: -len(NDJSON_EXTENSION)]), 0)
+            if os.path.getsize(path) > size:
+                logger.warning("Dropping unconfirmed pages at the end of %s", path)
+                os.truncate(path, size)
+
 
 async def run_fetch_pipeline(
     fetch_store: FetchStore,
@@ -46,21 +371,148 @@ async def run_fetch_pipeline(
     channel_handles: List[str],
     start: datetime,
     end: datetime,
+    streaming: bool = False,
+    max_pending_writes: int = 8,
 ) -> str:
     try:
         logger.debug(
             "Running fetch pipeline: %s ~ %s", start.isoformat(), end.isoformat()
         )
-        messages = await telegram_api_adapter.fetch_messages(channel_handles, start)
-        logger.debug("Fetched total %d messages from channels", len(messages))
-        filename = _make_messages_filename(start.isoformat(), end.isoformat())
-        message_file = fetch_store.save_messages(filename, messages)
-        fetch_store.save_last_fetch_times(end)
+        cursors = fetch_store.load_channel_cursors()
+        if streaming:
+            message_file, cursors = await _stream_messages(
+                fetch_store,
+                telegram_api_adapter,
+                channel_handles,
+                start,
+                end,
+                cursors,
+                max_pending_writes,
+            )
+        else:
+            per_channel: Dict[int, MessageBatch] = {}
+            advanced = cursors
+
+            async def on_page(
+                entity: Channel,
+                messages: List[RawMessage],
+                checkpoint: PagingCheckpoint,
+            ):
+                nonlocal advanced
+                per_channel.setdefault(entity.id, MessageBatch()).extend(messages)
+                advanced = _advance_cursors(advanced, messages)
+
+            await telegram_api_adapter.stream_messages(
+                channel_handles, start, on_page, cursors, until=end
+            )
+            batch = merge_batches(list(per_channel.values()), newest_first=True)
+            logger.debug("Fetched total %d messages from channels", len(batch))
+            filename = _make_messages_filename(start.isoformat(), end.isoformat())
+            message_file = await fetch_store.asave_messages(filename, batch)
+            cursors = advanced
+        await fetch_store.asave_last_fetch_times(end, cursors)
         logger.debug("Saved messages to %s", message_file)
         return message_file
     except Exception as e:
         raise RuntimeError(e)
 
 
-def _make_messages_filename(start: str, end: str) -> str:
-    return f"{start}~{end}.json"
+async def _stream_messages(
+    fetch_store: FetchStore,
+    telegram_api_adapter: TelegramAPIAdapter,
+    channel_handles: List[str],
+    start: datetime,
+    end: datetime,
+    cursors: Dict[int, ChannelCursor],
+    max_pending_writes: int = 8,
+) -> Tuple[str, Dict[int, ChannelCursor]]:
+    # Finish what an interrupted run started before opening a new window
+    resumed_path = None
+    for stream in fetch_store.pending_streams():
+        logger.warning("Resuming interrupted fetch into %s", stream.output_path)
+        cursors = await _run_stream(
+            stream, telegram_api_adapter, channel_handles, cursors, max_pending_writes
+        )
+        await fetch_store.asave_last_fetch_times(stream.end, cursors)
+        start = max(start, stream.end)
+        resumed_path = stream.output_path
+    if resumed_path is not None and start >= end:
+        # The resumed windows already reach the requested end
+        return resumed_path, cursors
+    stream = fetch_store.open_stream(start, end)
+    cursors = await _run_stream(
+        stream, telegram_api_adapter, channel_handles, cursors, max_pending_writes
+    )
+    return stream.output_path, cursors
+
+
+async def _run_stream(
+    stream: FetchStream,
+    telegram_api_adapter: TelegramAPIAdapter,
+    channel_handles: List[str],
+    cursors: Dict[int, ChannelCursor],
+    max_pending_writes: int = 8,
+) -> Dict[int, ChannelCursor]:
+    total = 0
+    # Checkpoints are read once up front; pages written later only update the copy
+    checkpoints = dict(stream.checkpoints)
+
+    async with WriteBehind(max_pending_writes) as writer:
+
+        async def on_page(
+            entity: Channel, messages: List[RawMessage], checkpoint: PagingCheckpoint
+        ):
+            nonlocal total
+            await writer.submit(
+                lambda: stream.write_page(entity.id, messages, checkpoint)
+            )
+            total += len(messages)
+
+        await telegram_api_adapter.stream_messages(
+            channel_handles,
+            stream.start,
+            on_page,
+            cursors,
+            until=stream.end,
+            checkpoints=checkpoints,
+        )
+    logger.debug("Streamed %d messages into %s", total, stream.output_path)
+    await asyncio.to_thread(stream.finalize)
+    # The spool may also hold pages written before an interruption
+    return _merge_cursors(cursors, stream.latest)
+
+
+def _advance_cursors(
+    cursors: Dict[int, ChannelCursor], messages: List[RawMessage]
+) -> Dict[int, ChannelCursor]:
+    advanced = dict(cursors)
+    for message in messages:
+        cursor = advanced.get(message.channel_id)
+        if cursor is None or message.id > cursor.last_message_id:
+            advanced[message.channel_id] = ChannelCursor(
+                channel_id=message.channel_id,
+                last_message_id=message.id,
+                last_message_time=message.time,
+            )
+    return advanced
+
+
+def _merge_cursors(
+    cursors: Dict[int, ChannelCursor], latest: Dict[int, ChannelCursor]
+) -> Dict[int, ChannelCursor]:
+    merged = dict(cursors)
+    for channel_id, cursor in latest.items():
+        current = merged.get(channel_id)
+        if current is None or cursor.last_message_id > current.last_message_id:
+            merged[channel_id] = cursor
+    return merged
+
+
+def _make_messages_filename(start: str, end: str, extension: str = ".json") -> str:
+    return f"{start}~{end}{extension}"
+
+
+def _parse_messages_filename(filename: str) -> Tuple[datetime, datetime]:
+    stem, _ = split_extension(filename)
+    start, end = stem.split("~")
+    return datetime.fromisoformat(start), datetime.fromisoformat(end)
@@ -0,0 +1,107 @@
+__all__ = ["NORMALIZE_RULES", "TextNormalizer", "load_footer_patterns"]
+
+from itertools import islice
+import re
+from typing import Dict, Iterable, Iterator, List, Sequence
+from dropspy.utils.hashing import content_digest
+
+NORMALIZE_RULES = ("zero_width", "urls", "emoji", "footers", "whitespace")
+
+_ZERO_WIDTH = dict.fromkeys(
+    map(ord, "\u00ad\u200b\u200c\u200d\u200e\u200f\u2060\ufeff")
+)
+_URL = re.compile(r"\b(?:https?://|www\.)([^\s/?#]+)([^\s?#]*)(?:\?[^\s#]*)?(?:#\S*)?")
+_EMOJI = (
+    "[\U0001f000-\U0001faff\u2600-\u27bf\u2b00-\u2bff]"
+    "[\ufe0f\u200d\U0001f3fb-\U0001f3ff]*"
+)
+_EMOJI_RUN = re.compile(rf"({_EMOJI})(?:\s*{_EMOJI})+")
+_SPACES = re.compile("[ \t\u00a0]+")
+_BLANK_LINES = re.compile(r"\n\s*\n(?:\s*\n)+")
+
+
+class TextNormalizer:
+    """Rewrites message texts into a smaller form for dedup keys and token counts.
+
+    Rules are compiled once and applied in order:
+
+    - ``zero_width``: drops zero-width and soft-hyphen characters
+    - ``urls``: cuts links down to host and path, without query strings
+      (tracking and referral parameters) or fragments
+    - ``emoji``: collapses a run of emoji into its first one
+    - ``footers``: drops lines matching any of ``footer_patterns``
+    - ``whitespace``: collapses spaces and blank lines, then strips
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[str] = NORMALIZE_RULES,
+        footer_patterns: Sequence[str] = (),
+    ):
+        self.rules = tuple(rules)
+        unknown = set(self.rules) - set(NORMALIZE_RULES)
+        if unknown:
+            raise ValueError(f"Unknown normalization rules: {sorted(unknown)}")
+        self.footer_patterns = tuple(footer_patterns)
+        self._footer = (
+            re.compile(
+                "|".join(f"(?:{p})" for p in self.footer_patterns),
+                re.IGNORECASE,
+            )
+            if self.footer_patterns
+            else None
+        )
+
+    @property
+    def settings(self) -> str:
+        """Short fingerprint of the rules, to tell outputs of other rules apart."""
+        spec = "\n".join(self.rules + ("",) + self.footer_patterns)
+        return content_digest(spec.encode("utf-8"))[:8]
+
+    def normalize(self, text: str) -> str:
+        for rule in self.rules:
+            if rule == "zero_width":
+                text = text.translate(_ZERO_WIDTH)
+            elif rule == "urls":
+                text = _URL.sub(r"\1\2", text)
+            elif rule == "emoji":
+                text = _EMOJI_RUN.sub(r"\1", text)
+            elif rule == "footers" and self._footer is not None:
+                text = "\n".join(
+                    line for line in text.split("\n") if not self._footer.search(line)
+                )
+            elif rule == "whitespace":
+                text = _BLANK_LINES.sub("\n\n", _SPACES.sub(" ", text))
+                text = "\n".join(line.strip() for line in text.split("\n")).strip()
+        return text
+
+    def normalize_many(self, texts: Iterable[str]) -> List[str]:
+        # Reposts are common, so each distinct text is rewritten once
+        cache: Dict[str, str] = {}
+        out = []
+        for text in texts:
+            normalized = cache.get(text)
+            if normalized is None:
+                normalized = cache[text] = self.normalize(text)
+            out.append(normalized)
+        return out
+
+    def normalize_records(
+        self, records: Iterable[Dict], chunk_size: int = 1024
+    ) -> Iterator[Dict]:
+        """Yields copies of the records with a ``normalized_text`` next to ``text``."""
+        records_iter = iter(records)
+        while chunk := list(islice(records_iter, chunk_size)):
+            normalized = self.normalize_many(record["text"] for record in chunk)
+            for record, text in zip(chunk, normalized):
+                yield dict(record, normalized_text=text)
+
+
+def load_footer_patterns(path: str) -> List[str]:
+    """Reads one regular expression per line, skipping blanks and ``#`` comments."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [
+            line.rstrip("\n")
+            for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
@@ -1,59 +1,255 @@
+from array import array
 import json
+import logging
 import os
-from collections import Counter
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple, TypeVar
+from dropspy.pipeline.normalize import TextNormalizer
+from dropspy.utils.blob_store import BlobStore
+from dropspy.utils.hashing import text_digest
 from dropspy.utils.json_store import JSONStore
+from dropspy.utils.minhash import NearDuplicateIndex
+from dropspy.utils.seen_index import SeenIndex
+from dropspy.utils.serializers import Serializer, split_extension
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 
 class PrebatchStore(JSONStore):
-    def __init__(self, output_dir: str):
-        super().__init__(output_dir)
+    stage = "prebatch"
 
-    def save(self, input_filename: str, prebatched_messages: List[Dict]) -> str:
+    def __init__(
+        self,
+        output_dir: str,
+        serializer: Optional[Serializer] = None,
+        blob_store: Optional[BlobStore] = None,
+    ):
+        super().__init__(output_dir, serializer, blob_store)
+
+    def save(
+        self,
+        input_filename: str,
+        prebatched_messages: Iterable[Dict],
+        source_hash: Optional[str] = None,
+    ) -> str:
         try:
-            return self._save(Path(input_filename).name, prebatched_messages)
+            return self._save(
+                Path(input_filename).name, prebatched_messages, source_hash
+            )
         except Exception as e:
             raise RuntimeError(f"Failed to store prebatced messages: {e}")
-    
+
+    def find_current(self, input_filename: str, source_hash: str) -> Optional[str]:
+        """Returns the output already pre-batched from this exact input, if any."""
+        stem, _ = split_extension(Path(input_filename).name)
+        filename = stem + self.serializer.extension
+        entry = self.manifest.get(filename)
+        path = os.path.join(self.data_dir, filename)
+        if (
+            entry is None
+            or entry.source_hash != source_hash
+            or not os.path.exists(path)
+        ):
+            return None
+        return path
+
+    def iter_messages(self, filename: str) -> Iterator[Dict]:
+        return self._iter(filename)
+
     # TODO: show with user defined timezone
     def get_filenames(self):
         files = self._list_files()
         return files
 
 
+DEDUP_MODES = ("exact", "near")
+SEEN_POLICIES = ("drop", "mark")
+
+
 class Prebatcher:
-    def __init__(self):
-        pass
+    """Collapses repeated messages into one with a ``dup_count``.
+
+    The "exact" mode merges identical texts. The "near" mode also merges
+    reposts whose texts are at least ``similarity_threshold`` alike (e.g.
+    the same announcement with another referral link), and lists the
+    ``channels`` each representative was posted in.
+    """
 
-    def prebatch(self, fetched_messages: Dict) -> List[Dict]:
+    def __init__(self, mode: str = "exact", similarity_threshold: float = 0.7):
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode: {mode}")
+        self.mode = mode
+        self.similarity_threshold = similarity_threshold
+
+    @property
+    def settings(self) -> str:
+        """Settings that change the output; empty for the defaults."""
+        if self.mode == "near":
+            return f"near={self.similarity_threshold}"
+        return ""
+
+    def prebatch(self, fetched_messages: Iterable[Dict]) -> List[Dict]:
         try:
-            text_counts = Counter(msg["text"] for msg in fetched_messages)
-            seen = set()
-            unique_messages = []
-            for msg in fetched_messages:
-                if msg["text"] not in seen:
-                    msg_out = msg.copy()
-                    msg_out["dup_count"] = text_counts[msg["text"]]
-                    unique_messages.append(msg_out)
-                    seen.add(msg["text"])
-            return unique_messages
+            if self.mode == "near":
+                return self._prebatch_near(fetched_messages)
+            firsts, counts = _dedup(fetched_messages, _dedup_text)
+            return [dict(msg, dup_count=count) for msg, count in zip(firsts, counts)]
         except Exception as e:
             raise RuntimeError(f"An error occurred during prebatching: {e}")
 
+    def _prebatch_near(self, messages: Iterable[Dict]) -> List[Dict]:
+        index = NearDuplicateIndex(threshold=self.similarity_threshold)
+        # Identical texts skip the similarity search
+        cluster_of: Dict[bytes, int] = {}
+        representatives: List[Dict] = []
+        for msg in messages:
+            text = _dedup_text(msg)
+            digest = text_digest(text)
+            cluster = cluster_of.get(digest)
+            if cluster is None:
+                cluster = index.find_or_add(len(representatives), text)
+                if cluster == len(representatives):
+                    msg_out = msg.copy()
+                    msg_out["dup_count"] = 0
+                    msg_out["channels"] = []
+                    representatives.append(msg_out)
+                cluster_of[digest] = cluster
+            msg_out = representatives[cluster]
+            msg_out["dup_count"] += 1
+            channel = msg.get("channel_handle", msg.get("channel_id"))
+            if channel is not None and channel not in msg_out["channels"]:
+                msg_out["channels"].append(channel)
+        return representatives
+
+
+def _dedup_text(msg: Dict) -> str:
+    """The text messages are compared by: the normalized form when there is one."""
+    return msg.get("normalized_text", msg["text"])
+
+
+def _dedup(items: Iterable[T], text_of: Callable[[T], str]) -> Tuple[List[T], array]:
+    """First item of each distinct text, in order, and how often each text occurred.
+
+    One pass keyed by a fixed-size digest of the text, so the input can be a
+    stream and no second copy of the texts is held; counts are kept apart
+    and patched into the output by the caller.
+    """
+    position_of: Dict[bytes, int] = {}
+    firsts: List[T] = []
+    counts = array("I")
+    for item in items:
+        digest = text_digest(text_of(item))
+        position = position_of.get(digest)
+        if position is None:
+            position_of[digest] = len(firsts)
+            firsts.append(item)
+            counts.append(1)
+        else:
+            counts[position] += 1
+    return firsts, counts
+
 
 class PrebatchPipeline:
-    def __init__(self, output_dir: str):
-        self.prebatchStore = PrebatchStore(output_dir=output_dir)
-        self.prebatcher = Prebatcher()
+    def __init__(
+        self,
+        output_dir: str,
+        serializer: Optional[Serializer] = None,
+        blob_store: Optional[BlobStore] = None,
+        prebatcher: Optional[Prebatcher] = None,
+        seen_index: Optional[SeenIndex] = None,
+        seen_policy: str = "drop",
+        normalizer: Optional[TextNormalizer] = None,
+    ):
+        if seen_policy not in SEEN_POLICIES:
+            raise ValueError(f"Unknown seen policy: {seen_policy}")
+        self.prebatchStore = PrebatchStore(
+            output_dir=output_dir, serializer=serializer, blob_store=blob_store
+        )
+        self.prebatcher = prebatcher if prebatcher is not None else Prebatcher()
+        # Messages pre-batched from other fetch windows are dropped or marked
+        self.seen_index = seen_index
+        self.seen_policy = seen_policy
+        self.normalizer = normalizer
 
-    def run_prebatch_pipeline(self, input_filename: str, fetched_messages: Dict) -> str:
+    def run_prebatch_pipeline(
+        self,
+        input_filename: str,
+        fetched_messages: Iterable[Dict],
+        source_hash: Optional[str] = None,
+    ) -> str:
         try:
-            unique_messages = self.prebatcher.prebatch(
-                fetched_messages=fetched_messages
-            )
-            out_path = self.prebatchStore.save(input_filename, unique_messages)
-            return out_path
+            out_path = self.find_current(input_filename, source_hash)
+            if out_path is not None:
+                logger.info("%s is unchanged, skipping pre-batch", input_filename)
+                return out_path
+            unique_messages = self.dedup(fetched_messages)
+            return self.save(input_filename, unique_messages, source_hash)
         except Exception as e:
             raise RuntimeError(f"Error in prebatch pipeline: {e}")
 
+    def find_current(
+        self, input_filename: str, source_hash: Optional[str]
+    ) -> Optional[str]:
+        """Output already pre-batched from this input with the same settings, if any."""
+        source_hash = self._versioned(source_hash)
+        if source_hash is None:
+            return None
+        return self.prebatchStore.find_current(input_filename, source_hash)
+
+    def dedup(self, fetched_messages: Iterable[Dict]) -> List[Dict]:
+        """The CPU-bound part of a pre-batch; it touches no shared state."""
+        if self.normalizer is not None:
+            fetched_messages = self.normalizer.normalize_records(fetched_messages)
+        return self.prebatcher.prebatch(fetched_messages=fetched_messages)
+
+    def save(
+        self,
+        input_filename: str,
+        unique_messages: List[Dict],
+        source_hash: Optional[str] = None,
+    ) -> str:
+        if self.seen_index is not None:
+            unique_messages = self._filter_seen(input_filename, unique_messages)
+        return self.prebatchStore.save(
+            input_filename, unique_messages, self._versioned(source_hash)
+        )
+
+    @property
+    def settings(self) -> str:
+        settings = [self.prebatcher.settings]
+        if self.normalizer is not None:
+            settings.append(f"normalize={self.normalizer.settings}")
+        if self.seen_index is not None:
+            settings.append(f"seen={self.seen_policy}")
+        return ",".join(s for s in settings if s)
+
+    def _versioned(self, source_hash: Optional[str]) -> Optional[str]:
+        # Output made with other settings is out of date too
+        if source_hash is not None and self.settings:
+            return f"{source_hash}:{self.settings}"
+        return source_hash
+
+    def _filter_seen(self, input_filename: str, messages: List[Dict]) -> List[Dict]:
+        now = datetime.now(tz=timezone.utc)
+        self.seen_index.age_out(now)
+        source, _ = split_extension(Path(input_filename).name)
+        texts = [_dedup_text(msg) for msg in messages]
+        seen = self.seen_index.check_and_add(
+            (text_digest(text) for text in texts), source, now
+        )
+        if not any(seen):
+            return messages
+        logger.info("%d of %d messages were pre-batched before", sum(seen), len(seen))
+        if self.seen_policy == "drop":
+            return [msg for msg, s in zip(messages, seen) if not s]
+        # "mark" keeps them, flagged and after the new ones
+        records = list(messages)
+        for record, s in zip(records, seen):
+            if s:
+                record["seen_before"] = True
+        return [r for r, s in zip(records, seen) if not s] + [
+            r for r, s in zip(records, seen) if s
+        ]
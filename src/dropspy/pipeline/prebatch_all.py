@@ -0,0 +1,101 @@
+__all__ = ["run_prebatch_all"]
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import logging
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from dropspy.pipeline.fetch import FetchStore
+from dropspy.pipeline.prebatch import PrebatchPipeline
+
+logger = logging.getLogger(__name__)
+
+# Builds the stores a worker process reads from; must be importable by name
+StoreFactory = Callable[[], Tuple[FetchStore, PrebatchPipeline]]
+ProgressCallback = Callable[[int, int, str, str], None]
+
+_worker_stores: Optional[Tuple[FetchStore, PrebatchPipeline]] = None
+
+
+def run_prebatch_all(
+    fetch_store: FetchStore,
+    prebatch_pipeline: PrebatchPipeline,
+    filenames: List[str],
+    make_stores: StoreFactory,
+    workers: int = 1,
+    on_progress: Optional[ProgressCallback] = None,
+) -> Dict[str, str]:
+    """Pre-batches many fetch files, deduplicating them in worker processes.
+
+    Files whose output is up to date are skipped without loading them.
+    Workers only load and deduplicate, each with stores of its own from
+    ``make_stores``; saving (and the seen index, which depends on file
+    order) stays in this process and follows the order of ``filenames``;
+    about two files per worker are in flight at a time, so results do not
+    pile up in memory ahead of the saves.
+    A failed file is reported and the rest still run. Returns each file's
+    status: "skipped", "saved" or "failed".
+    """
+    statuses: Dict[str, str] = {}
+    total = len(filenames)
+
+    def report(filename: str, status: str):
+        statuses[filename] = status
+        if on_progress is not None:
+            on_progress(len(statuses), total, filename, status)
+
+    pending = []
+    for filename in filenames:
+        source_hash = fetch_store.content_hash(filename)
+        if prebatch_pipeline.find_current(filename, source_hash) is not None:
+            report(filename, "skipped")
+        else:
+            pending.append((filename, source_hash))
+
+    executor: Optional[ProcessPoolExecutor] = None
+    futures: Deque[Future] = deque()
+    to_submit = iter(pending)
+    max_in_flight = 2 * workers
+    if workers > 1 and len(pending) > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=min(workers, len(pending)),
+            initializer=_init_worker,
+            initargs=(make_stores,),
+        )
+
+    def submit_ahead():
+        while len(futures) < max_in_flight:
+            item = next(to_submit, None)
+            if item is None:
+                return
+            futures.append(executor.submit(_dedup_in_worker, item[0]))
+
+    try:
+        for filename, source_hash in pending:
+            try:
+                if executor is not None:
+                    # Futures are submitted in file order, so the oldest is this file's
+                    submit_ahead()
+                    unique_messages = futures.popleft().result()
+                else:
+                    unique_messages = prebatch_pipeline.dedup(
+                        fetch_store.iter_message_records(filename)
+                    )
+                prebatch_pipeline.save(filename, unique_messages, source_hash)
+                report(filename, "saved")
+            except Exception as e:
+                logger.error("Failed to pre-batch %s: %s", filename, e)
+                report(filename, "failed")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return statuses
+
+
+def _init_worker(make_stores: StoreFactory):
+    global _worker_stores
+    _worker_stores = make_stores()
+
+
+def _dedup_in_worker(filename: str):
+    fetch_store, prebatch_pipeline = _worker_stores
+    return prebatch_pipeline.dedup(fetch_store.iter_message_records(filename))
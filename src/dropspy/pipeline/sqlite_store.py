@@ -0,0 +1,269 @@
+import hashlib
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+from dropspy.pipeline.fetch import (
+    FetchStore,
+    _make_messages_filename,
+    _parse_messages_filename,
+)
+from dropspy.telegram.message_batch import MessageBatch
+from dropspy.telegram.types import ChannelCursor, PagingCheckpoint, RawMessage
+from dropspy.utils.hashing import TEXT_DIGEST_SIZE, text_digest
+from dropspy.utils.serializers import Serializer, split_extension
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    channel_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    channel_handle TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    time TEXT NOT NULL,
+    text TEXT NOT NULL,
+    text_hash BLOB NOT NULL,
+    PRIMARY KEY (channel_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS messages_timestamp ON messages (timestamp);
+CREATE INDEX IF NOT EXISTS messages_channel_timestamp
+    ON messages (channel_id, timestamp);
+CREATE INDEX IF NOT EXISTS messages_text_hash ON messages (text_hash);
+CREATE TABLE IF NOT EXISTS windows (
+    name TEXT PRIMARY KEY,
+    start INTEGER NOT NULL,
+    "end" INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stream_progress (
+    window TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    offset_id INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    last_message_id INTEGER,
+    last_message_time TEXT,
+    PRIMARY KEY (window, channel_id)
+);
+"""
+
+_UPSERT_MESSAGE = """
+INSERT INTO messages (channel_id, id, channel_handle, timestamp, time, text, text_hash)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (channel_id, id) DO UPDATE SET
+    channel_handle = excluded.channel_handle,
+    timestamp = excluded.timestamp,
+    time = excluded.time,
+    text = excluded.text,
+    text_hash = excluded.text_hash
+"""
+
+_SELECT_MESSAGES = "SELECT id, channel_id, channel_handle, time, text FROM messages"
+
+
+class SQLiteFetchStore(FetchStore):
+    """Keeps every fetched message in one indexed SQLite database.
+
+    Messages are upserted on ``(channel_id, id)``, so overlapping windows and
+    re-fetches never duplicate rows, and time ranges, channels and texts can be
+    queried without loading whole fetch files. A fetch "file" is a named time
+    window over the table: loading it returns the messages with
+    ``start < time <= end``. Fetch times and cursors stay in the ``last_fetch`` files.
+    """
+
+    # Windows live in the database, not in files
+    stage = None
+
+    def __init__(
+        self,
+        data_dir: str,
+        serializer: Optional[Serializer] = None,
+        db_filename: str = "messages.sqlite3",
+    ):
+        super().__init__(data_dir, serializer)
+        self.db_path = os.path.join(data_dir, db_filename)
+        # Async saves and streamed pages are written from worker threads, one
+        # at a time
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def save_messages(
+        self, filename: str, messages: List[RawMessage] | MessageBatch
+    ) -> str:
+        start, end = _parse_messages_filename(filename)
+        name, _ = split_extension(filename)
+        if isinstance(messages, MessageBatch):
+            messages = messages.messages()
+        with self.conn:
+            self._upsert(messages)
+            self._add_window(name, start, end)
+        return name
+
+    def load_messages_by_filename(self, filename: str) -> List[RawMessage]:
+        start, end = _parse_messages_filename(filename)
+        return list(self.iter_messages_between(start, end))
+
+    def iter_message_records(self, filename: str) -> Iterator[Dict]:
+        start, end = _parse_messages_filename(filename)
+        return (message.to_json() for message in self.iter_messages_between(start, end))
+
+    def iter_messages_between(
+        self,
+        start: datetime,
+        end: datetime,
+        channel_ids: Optional[Iterable[int]] = None,
+    ) -> Iterator[RawMessage]:
+        query = f"{_SELECT_MESSAGES} WHERE timestamp > ? AND timestamp <= ?"
+        params: List = [int(start.timestamp()), int(end.timestamp())]
+        if channel_ids is not None:
+            channel_ids = list(channel_ids)
+            query += f" AND channel_id IN ({','.join('?' * len(channel_ids))})"
+            params += channel_ids
+        query += " ORDER BY timestamp, channel_id, id"
+        for row in self.conn.execute(query, params):
+            yield RawMessage(*row)
+
+    def content_hash(self, filename: str) -> Optional[str]:
+        # A window has no file to hash: this covers every row in it instead, so
+        # it changes when a message in the window is added or edited
+        start, end = _parse_messages_filename(filename)
+        digest = hashlib.blake2b(digest_size=TEXT_DIGEST_SIZE)
+        rows = self.conn.execute(
+            "SELECT channel_id, id, channel_handle, time, text_hash FROM messages"
+            " WHERE timestamp > ? AND timestamp <= ?"
+            " ORDER BY timestamp, channel_id, id",
+            (int(start.timestamp()), int(end.timestamp())),
+        )
+        for channel_id, id, channel_handle, time, text_hash in rows:
+            digest.update(f"{channel_id}\0{id}\0{channel_handle}\0{time}\0".encode())
+            digest.update(text_hash)
+        return digest.hexdigest()
+
+    def find_by_text(self, text: str) -> List[RawMessage]:
+        rows = self.conn.execute(
+            f"{_SELECT_MESSAGES} WHERE text_hash = ? AND text = ? ORDER BY timestamp",
+            (text_digest(text), text),
+        )
+        return [RawMessage(*row) for row in rows]
+
+    def count_messages(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def get_filenames(self):
+        rows = self.conn.execute("SELECT name FROM windows ORDER BY name")
+        return [name for (name,) in rows]
+
+    def open_stream(self, start: datetime, end: datetime) -> "SQLiteFetchStream":
+        return SQLiteFetchStream(self, start, end)
+
+    def pending_streams(self) -> List["SQLiteFetchStream"]:
+        rows = self.conn.execute(
+            "SELECT DISTINCT window FROM stream_progress ORDER BY window"
+        )
+        return [self.open_stream(*_parse_messages_filename(name)) for (name,) in rows]
+
+    def _upsert(self, messages: Iterable[RawMessage]):
+        self.conn.executemany(
+            _UPSERT_MESSAGE,
+            (
+                (
+                    message.channel_id,
+                    message.id,
+                    message.channel_handle,
+                    int(datetime.fromisoformat(message.time).timestamp()),
+                    message.time,
+                    message.text,
+                    text_digest(message.text),
+                )
+                for message in messages
+            ),
+        )
+
+    def _add_window(self, name: str, start: datetime, end: datetime):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO windows (name, start, "end") VALUES (?, ?, ?)',
+            (name, int(start.timestamp()), int(end.timestamp())),
+        )
+
+
+class SQLiteFetchStream:
+    """Streams fetched pages straight into the archive.
+
+    Each page and its paging checkpoint are committed in one transaction, so
+    a resumed stream never loses or repeats a page.
+    """
+
+    def __init__(self, store: SQLiteFetchStore, start: datetime, end: datetime):
+        self.store = store
+        self.start = start
+        self.end = end
+        self.output_path = _make_messages_filename(
+            start.isoformat(), end.isoformat(), ""
+        )
+        self.checkpoints: Dict[int, PagingCheckpoint] = {}
+        self.latest: Dict[int, ChannelCursor] = {}
+        self._load_progress()
+
+    def write_page(
+        self,
+        channel_id: int,
+        messages: List[RawMessage],
+        checkpoint: Optional[PagingCheckpoint] = None,
+    ):
+        for message in messages:
+            cursor = self.latest.get(message.channel_id)
+            if cursor is None or message.id > cursor.last_message_id:
+                self.latest[message.channel_id] = ChannelCursor(
+                    channel_id=message.channel_id,
+                    last_message_id=message.id,
+                    last_message_time=message.time,
+                )
+        if checkpoint is None:
+            checkpoint = self.checkpoints.get(
+                channel_id, PagingCheckpoint(channel_id, offset_id=0, done=False)
+            )
+        self.checkpoints[channel_id] = checkpoint
+        latest = self.latest.get(channel_id)
+        with self.store.conn:
+            self.store._upsert(messages)
+            self.store.conn.execute(
+                "INSERT OR REPLACE INTO stream_progress VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.output_path,
+                    channel_id,
+                    checkpoint.offset_id,
+                    int(checkpoint.done),
+                    latest.last_message_id if latest else None,
+                    latest.last_message_time if latest else None,
+                ),
+            )
+
+    def finalize(self) -> str:
+        with self.store.conn:
+            self.store._add_window(self.output_path, self.start, self.end)
+            self.store.conn.execute(
+                "DELETE FROM stream_progress WHERE window = ?", (self.output_path,)
+            )
+        return self.output_path
+
+    def _load_progress(self):
+        rows = self.store.conn.execute(
+            "SELECT channel_id, offset_id, done, last_message_id, last_message_time"
+            " FROM stream_progress WHERE window = ?",
+            (self.output_path,),
+        )
+        for channel_id, offset_id, done, last_id, last_time in rows:
+            self.checkpoints[channel_id] = PagingCheckpoint(
+                channel_id=channel_id, offset_id=offset_id, done=bool(done)
+            )
+            if last_id is not None:
+                self.latest[channel_id] = ChannelCursor(
+                    channel_id=channel_id,
+                    last_message_id=last_id,
+                    last_message_time=last_time,
+                )
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+from dropspy.pipeline.fetch import (
+    FetchStore,
+    _advance_cursors,
+    _make_messages_filename,
+    run_fetch_pipeline,
+)
+from dropspy.pipeline.prebatch import PrebatchPipeline
+from dropspy.telegram.api_adapter import TelegramAPIAdapter
+from dropspy.telegram.types import RawMessage
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWatcher:
+    """Buffers live messages and flushes them as small fetch files.
+
+    A flush happens once ``flush_size`` messages are buffered or
+    ``flush_interval`` seconds have passed since the last one, whichever
+    comes first. Each flush advances the fetch cursors, so a later one-shot
+    ``fetch`` continues where the watcher stopped.
+    """
+
+    def __init__(
+        self,
+        fetch_store: FetchStore,
+        flush_size: int,
+        flush_interval: float,
+        prebatch_pipeline: Optional[PrebatchPipeline] = None,
+    ):
+        self.fetch_store = fetch_store
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.prebatch_pipeline = prebatch_pipeline
+        self.cursors = fetch_store.load_channel_cursors()
+        self.window_start = datetime.now(tz=timezone.utc)
+        self._buffer: List[RawMessage] = []
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.cursors = self.fetch_store.load_channel_cursors()
+        last_fetch = self.fetch_store.load_last_fetch_times()
+        if last_fetch is not None:
+            self.window_start = last_fetch
+        self._timer = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        if self._timer is None:
+            # Never started, so the catch-up fetch did not finish: flushing now
+            # would move last_fetch and the cursors past messages it never got
+            return
+        self._timer.cancel()
+        try:
+            await self._timer
+        except asyncio.CancelledError:
+            pass
+        self._timer = None
+        await self.flush()
+
+    async def add(self, message: RawMessage):
+        self._buffer.append(message)
+        # Until start() the cursors don't yet reflect the catch-up fetch
+        if self._timer is not None and len(self._buffer) >= self.flush_size:
+            await self.flush()
+
+    async def flush(self) -> Optional[str]:
+        async with self._lock:
+            # Messages stay buffered until they and the cursors are saved, so a
+            # failed flush is retried; more may be added while this one awaits
+            taken = len(self._buffer)
+            end = datetime.now(tz=timezone.utc)
+            # Messages the catch-up fetch already stored may also arrive live
+            messages = [m for m in self._buffer[:taken] if not self._is_stored(m)]
+            if not messages:
+                del self._buffer[:taken]
+                return None
+            messages.sort(key=lambda msg: msg.time)
+            filename = _make_messages_filename(
+                self.window_start.isoformat(), end.isoformat()
+            )
+            path = await self.fetch_store.asave_messages(filename, messages)
+            cursors = _advance_cursors(self.cursors, messages)
+            await self.fetch_store.asave_last_fetch_times(end, cursors)
+            self.cursors = cursors
+            del self._buffer[:taken]
+            self.window_start = end
+            logger.info("Flushed %d live messages to %s", len(messages), path)
+            if self.prebatch_pipeline is not None:
+                out_path = await asyncio.to_thread(
+                    self.prebatch_pipeline.run_prebatch_pipeline,
+                    filename,
+                    [message.to_json() for message in messages],
+                )
+                logger.info("Pre-batched live messages to %s", out_path)
+            return path
+
+    def _is_stored(self, message: RawMessage) -> bool:
+        cursor = self.cursors.get(message.channel_id)
+        return cursor is not None and message.id <= cursor.last_message_id
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                # Keep watching; the messages stay buffered for the next flush
+                logger.error("Failed to flush live messages: %s", e)
+
+
+async def run_watch_pipeline(
+    fetch_store: FetchStore,
+    telegram_api_adapter: TelegramAPIAdapter,
+    channel_handles: List[str],
+    catch_up_start: datetime,
+    flush_size: int,
+    flush_interval: float,
+    prebatch_pipeline: Optional[PrebatchPipeline] = None,
+):
+    watcher = MessageWatcher(
+        fetch_store=fetch_store,
+        flush_size=flush_size,
+        flush_interval=flush_interval,
+        prebatch_pipeline=prebatch_pipeline,
+    )
+    # Subscribe before catching up so nothing falls between the two
+    unsubscribe = await telegram_api_adapter.subscribe_new_messages(
+        channel_handles, watcher.add
+    )
+    try:
+        await run_fetch_pipeline(
+            fetch_store=fetch_store,
+            telegram_api_adapter=telegram_api_adapter,
+            channel_handles=channel_handles,
+            start=catch_up_start,
+            end=datetime.now(tz=timezone.utc),
+        )
+        watcher.start()
+        await telegram_api_adapter.run_until_disconnected()
+    except Exception as e:
+        raise RuntimeError(e)
+    finally:
+        unsubscribe()
+        await watcher.stop()
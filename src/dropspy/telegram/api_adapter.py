@@ -1,8 +1,22 @@
+import asyncio
 import logging
-from typing import Awaitable, Callable, List, Tuple, cast
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, cast
 from datetime import datetime
-from dropspy.telegram.types import ChannelInfo, RawMessage
-from telethon import TelegramClient
+from dropspy.telegram.entity_cache import EntityCache
+from dropspy.telegram.types import (
+    ChannelCursor,
+    ChannelInfo,
+    PagingCheckpoint,
+    RawMessage,
+)
+from dropspy.utils.merge import merge_by_time
+from telethon import TelegramClient, events
+from telethon.errors import (
+    ChannelInvalidError,
+    ChannelPrivateError,
+    FloodWaitError,
+)
 from telethon.tl.types import (
     Channel,
     Message,
@@ -11,6 +25,14 @@ from telethon.hints import Entity
 
 logger = logging.getLogger(__name__)
 
+# Receives each page of a channel as soon as it is fetched (newest first),
+# with the position to resume from if the run is interrupted after it
+PageHandler = Callable[[Channel, List[RawMessage], PagingCheckpoint], Awaitable[None]]
+MessageHandler = Callable[[RawMessage], Awaitable[None]]
+
+# Raised when a cached access hash no longer matches the channel
+_STALE_ENTITY_ERRORS = (ChannelInvalidError, ChannelPrivateError)
+
 
 class TelegramAPIAdapter:
     def __init__(
@@ -19,13 +41,27 @@ class TelegramAPIAdapter:
         api_hash: str,
         session_name: str,
         limit_per_api_call: int = 100,
-        max_api_calls: int = 30,
+        max_api_calls: Optional[int] = None,
+        min_page_size: int = 20,
+        max_concurrent_fetches: int = 1,
+        max_flood_wait_retries: int = 5,
+        entity_cache: Optional[EntityCache] = None,
+        client: Optional[TelegramClient] = None,
     ):
-        self.client = TelegramClient(
-            session=session_name, api_id=api_id, api_hash=api_hash
+        # A prebuilt client (e.g. FakeTelegramClient) replaces the real session
+        self.client = (
+            client
+            if client is not None
+            else TelegramClient(session=session_name, api_id=api_id, api_hash=api_hash)
         )
         self.limit_per_api_call = limit_per_api_call
         self.max_api_calls = max_api_calls
+        self.min_page_size = min(min_page_size, limit_per_api_call)
+        self.max_concurrent_fetches = max(1, max_concurrent_fetches)
+        self.max_flood_wait_retries = max_flood_wait_retries
+        # Shared by every channel task: a FloodWait is an account-wide limit
+        self._flood_wait = _FloodWaitBackoff()
+        self.entity_cache = entity_cache
 
     async def connect(self):
         if not self.client.is_connected():
@@ -66,77 +102,265 @@ class TelegramAPIAdapter:
         self,
         channel_handles: List[str],
         last_fetch: datetime,
+        cursors: Optional[Dict[int, ChannelCursor]] = None,
+        until: Optional[datetime] = None,
     ) -> List[RawMessage]:
         try:
-            fetched: List[RawMessage] = []
-            entities = await self._get_entities(channel_handles)
-            for entity in entities:
-                if not isinstance(entity, Channel):
-                    continue
+            per_channel: Dict[int, List[RawMessage]] = {}
+
+            async def collect(
+                entity: Channel,
+                messages: List[RawMessage],
+                checkpoint: PagingCheckpoint,
+            ):
+                per_channel.setdefault(entity.id, []).extend(messages)
+
+            await self.stream_messages(
+                channel_handles, last_fetch, collect, cursors, until
+            )
+            # Each channel arrives newest first, so reversing it is already sorted
+            return list(merge_by_time(reversed(msgs) for msgs in per_channel.values()))
+        except Exception as e:
+            raise RuntimeError(e)
+
+    async def stream_messages(
+        self,
+        channel_handles: List[str],
+        last_fetch: datetime,
+        on_page: PageHandler,
+        cursors: Optional[Dict[int, ChannelCursor]] = None,
+        until: Optional[datetime] = None,
+        checkpoints: Optional[Dict[int, PagingCheckpoint]] = None,
+    ):
+        cursors = cursors or {}
+        checkpoints = checkpoints or {}
+        entities = await self._get_entities(channel_handles)
+        channels = [entity for entity in entities if isinstance(entity, Channel)]
+        semaphore = asyncio.Semaphore(self.max_concurrent_fetches)
+
+        async def fetch_channel(entity: Channel):
+            checkpoint = checkpoints.get(entity.id)
+            if checkpoint is not None and checkpoint.done:
+                return
+            offset_id = checkpoint.offset_id if checkpoint else 0
+            cursor = cursors.get(entity.id)
+            min_id = cursor.last_message_id if cursor else 0
+            async with semaphore:
                 logger.debug(
                     "Fetching messages from [%s](@%s)", entity.title, entity.username
                 )
-                messages = await self._fetch_messages(entity, last_fetch)
+                try:
+                    count = await self._fetch_messages(
+                        entity, last_fetch, min_id, on_page, until, offset_id
+                    )
+                except _STALE_ENTITY_ERRORS:
+                    refreshed = await self._refresh_entity(entity)
+                    if refreshed is None:
+                        raise
+                    entity = refreshed
+                    count = await self._fetch_messages(
+                        entity, last_fetch, min_id, on_page, until, offset_id
+                    )
                 logger.debug(
                     "Fetched %d messages from [%s](@%s)",
-                    len(messages),
+                    count,
                     entity.title,
                     entity.username,
                 )
-                fetched.extend(messages)
-            fetched.sort(key=lambda msg: msg.time)
-            return fetched
-        except Exception as e:
-            raise RuntimeError(e)
+
+        await asyncio.gather(*(fetch_channel(entity) for entity in channels))
 
     async def _get_entities(self, channel_handles: List[str]) -> List[Entity]:
+        if self.entity_cache is None:
+            return await self._resolve_entities(channel_handles)
+        entities: Dict[str, Entity] = {}
+        for handle in channel_handles:
+            cached = self.entity_cache.get(handle)
+            if cached is not None:
+                entities[handle] = cached.to_channel()
+        missing = [handle for handle in channel_handles if handle not in entities]
+        if missing:
+            logger.debug("Resolving %d uncached channel handles", len(missing))
+            resolved = await self._resolve_entities(missing)
+            for handle, entity in zip(missing, resolved):
+                if isinstance(entity, Channel):
+                    self.entity_cache.put(handle, entity)
+                entities[handle] = entity
+            self.entity_cache.save()
+        return [entities[handle] for handle in channel_handles]
+
+    async def _resolve_entities(self, channel_handles: List[str]) -> List[Entity]:
         entities = await self.client.get_entity(channel_handles)
         if isinstance(entities, Entity):
             entities = [entities]
         return entities
 
+    async def _refresh_entity(self, entity: Channel) -> Optional[Channel]:
+        if self.entity_cache is None:
+            return None
+        handle = self.entity_cache.invalidate(entity.id)
+        if handle is None:
+            return None
+        logger.info("Re-resolving %s after a stale cache hit", handle)
+        refreshed = (await self._resolve_entities([handle]))[0]
+        if not isinstance(refreshed, Channel):
+            self.entity_cache.save()
+            return None
+        self.entity_cache.put(handle, refreshed)
+        self.entity_cache.save()
+        return refreshed
+
     async def _fetch_messages(
-        self, channel_entity: Channel, last_fetch: datetime
-    ) -> List[RawMessage]:
-        fetched = []
-        trials = 0
-        offset_id = 0
+        self,
+        channel_entity: Channel,
+        last_fetch: datetime,
+        min_id: int,
+        on_page: PageHandler,
+        until: Optional[datetime] = None,
+        offset_id: int = 0,
+    ) -> int:
+        count = 0
+        calls = 0
+        # Quiet channels finish in one small request; busy ones grow the page
+        page_size = self.min_page_size
         while True:
-            end, messages = await self._fetch_loop(
+            end, messages, offset_id = await self._fetch_page(
                 channel_entity=channel_entity,
                 last_fetch=last_fetch,
                 offset_id=offset_id,
-                limit=self.limit_per_api_call,
+                # offset_id already encodes the position once paging has started
+                offset_date=None if offset_id else until,
+                min_id=min_id,
+                limit=page_size,
+            )
+            count += len(messages)
+            calls += 1
+            if not end and self.max_api_calls and calls >= self.max_api_calls:
+                logger.warning(
+                    "Stopped paging [%s](@%s) after %d calls",
+                    channel_entity.title,
+                    channel_entity.username,
+                    calls,
+                )
+                end = True
+            checkpoint = PagingCheckpoint(
+                channel_id=channel_entity.id, offset_id=offset_id, done=end
             )
-            fetched.extend(messages)
-            trials += 1
-            if end or trials >= self.max_api_calls:
-                break
-            offset_id = messages[-1].id
-        return fetched
+            await on_page(channel_entity, messages, checkpoint)
+            if end:
+                return count
+            page_size = min(page_size * 2, self.limit_per_api_call)
+
+    async def _fetch_page(
+        self,
+        channel_entity: Channel,
+        last_fetch: datetime,
+        offset_id: int,
+        offset_date: Optional[datetime],
+        min_id: int,
+        limit: int,
+    ) -> Tuple[bool, List[RawMessage], int]:
+        retries = 0
+        while True:
+            await self._flood_wait.wait()
+            try:
+                return await self._fetch_loop(
+                    channel_entity=channel_entity,
+                    last_fetch=last_fetch,
+                    offset_id=offset_id,
+                    offset_date=offset_date,
+                    min_id=min_id,
+                    limit=limit,
+                )
+            except FloodWaitError as e:
+                retries += 1
+                if retries > self.max_flood_wait_retries:
+                    raise
+                logger.warning(
+                    "FloodWait of %ds on [%s](@%s), pausing all fetches (retry %d/%d)",
+                    e.seconds,
+                    channel_entity.title,
+                    channel_entity.username,
+                    retries,
+                    self.max_flood_wait_retries,
+                )
+                self._flood_wait.trigger(e.seconds)
 
     async def _fetch_loop(
-        self, channel_entity: Channel, last_fetch: datetime, offset_id: int, limit: int
-    ) -> Tuple[bool, List[RawMessage]]:
+        self,
+        channel_entity: Channel,
+        last_fetch: datetime,
+        offset_id: int,
+        offset_date: Optional[datetime],
+        min_id: int,
+        limit: int,
+    ) -> Tuple[bool, List[RawMessage], int]:
         raw_messages: List[RawMessage] = []
+        seen = 0
         async for message in self.client.iter_messages(
-            entity=channel_entity, offset_id=offset_id, limit=limit
+            entity=channel_entity,
+            offset_id=offset_id,
+            offset_date=offset_date,
+            min_id=min_id,
+            limit=limit,
         ):
+            seen += 1
+            # Service messages still move the paging position forward
+            offset_id = message.id
             if not isinstance(message, Message) or message.date is None:
                 continue
-            if message.date <= last_fetch:
-                return True, raw_messages
-            raw_message = RawMessage(
-                id=message.id,
-                channel_id=channel_entity.id,
-                channel_handle=self._format_handle(channel_entity.username),
-                time=message.date.isoformat(),
-                text=message.message.strip(),
-            )
-            raw_messages.append(raw_message)
-        if len(raw_messages) < limit:
-            return True, raw_messages
-        return False, raw_messages
+            # With a cursor, Telegram already filters by id via min_id
+            if not min_id and message.date <= last_fetch:
+                return True, raw_messages, offset_id
+            raw_messages.append(self._to_raw_message(channel_entity, message))
+        return seen < limit, raw_messages, offset_id
+
+    async def subscribe_new_messages(
+        self, channel_handles: List[str], on_message: MessageHandler
+    ) -> Callable[[], None]:
+        entities = await self._get_entities(channel_handles)
+        channels = {
+            entity.id: entity for entity in entities if isinstance(entity, Channel)
+        }
+
+        async def handle(event: events.NewMessage.Event):
+            message = event.message
+            channel = channels.get(getattr(message.peer_id, "channel_id", None))
+            if channel is None or message.date is None:
+                return
+            await on_message(self._to_raw_message(channel, message))
+
+        event_filter = events.NewMessage(chats=list(channels.values()))
+        self.client.add_event_handler(handle, event_filter)
+        logger.info("Watching %d channels for new messages", len(channels))
+        return lambda: self.client.remove_event_handler(handle, event_filter)
+
+    async def run_until_disconnected(self):
+        await cast(Callable[[], Awaitable[None]], self.client.run_until_disconnected)()
+
+    def _to_raw_message(self, channel_entity: Channel, message: Message) -> RawMessage:
+        return RawMessage(
+            id=message.id,
+            channel_id=channel_entity.id,
+            channel_handle=self._format_handle(channel_entity.username),
+            time=message.date.isoformat(),
+            text=(message.message or "").strip(),
+        )
 
     def _format_handle(self, handle: str | None) -> str:
         return f"@{handle}" if handle else ""
+
+
+class _FloodWaitBackoff:
+    def __init__(self):
+        self._resume_at = 0.0
+
+    def trigger(self, seconds: float):
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    async def wait(self):
+        delay = self._resume_at - time.monotonic()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            # Another task may have extended the pause while we slept
+            delay = self._resume_at - time.monotonic()
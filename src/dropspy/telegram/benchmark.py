@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List
+from dropspy.telegram.api_adapter import TelegramAPIAdapter
+from dropspy.telegram.fake_client import FakeTelegramClient, synthetic_channels
+
+
+@dataclass
+class FetchBenchmark:
+    messages: int
+    requests: int
+    flood_waits: int
+    seconds: float
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.messages / self.seconds if self.seconds else 0.0
+
+
+async def run_fetch_benchmark(
+    client: FakeTelegramClient,
+    channel_handles: List[str],
+    last_fetch: datetime,
+    max_concurrent_fetches: int = 1,
+    limit_per_api_call: int = 100,
+) -> FetchBenchmark:
+    adapter = TelegramAPIAdapter(
+        api_id=0,
+        api_hash="",
+        session_name="",
+        limit_per_api_call=limit_per_api_call,
+        max_concurrent_fetches=max_concurrent_fetches,
+        client=client,
+    )
+    started = time.perf_counter()
+    messages = await adapter.fetch_messages(channel_handles, last_fetch)
+    return FetchBenchmark(
+        messages=len(messages),
+        requests=client.requests,
+        flood_waits=client.flood_waits,
+        seconds=time.perf_counter() - started,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure fetch throughput against an offline fake Telegram"
+    )
+    parser.add_argument("--channels", type=int, default=80)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--flood-wait-every", type=int, default=0)
+    parser.add_argument("--flood-wait-seconds", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+
+    start = datetime.now(tz=timezone.utc) - timedelta(days=1)
+    channels = synthetic_channels(
+        args.channels,
+        args.messages,
+        start=start,
+        interval=timedelta(days=1) / (args.messages + 1),
+    )
+    client = FakeTelegramClient(
+        channels,
+        latency=args.latency,
+        page_size=args.page_size,
+        flood_wait_every=args.flood_wait_every,
+        flood_wait_seconds=args.flood_wait_seconds,
+    )
+    result = asyncio.run(
+        run_fetch_benchmark(
+            client,
+            list(channels),
+            last_fetch=start,
+            max_concurrent_fetches=args.concurrency,
+        )
+    )
+    for key, value in asdict(result).items():
+        print(f"{key}: {value}")
+    print(f"messages_per_second: {result.messages_per_second:.1f}")
+
+
+if __name__ == "__main__":
+    main()
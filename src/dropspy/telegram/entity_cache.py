@@ -0,0 +1,89 @@
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from telethon.tl.types import Channel, ChatPhotoEmpty
+from dropspy.utils.json_store import JSONStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedEntity:
+    channel_id: int
+    access_hash: int
+    title: str
+    username: Optional[str]
+    resolved_at: str
+
+    def to_json(self) -> dict:
+        return asdict(self)
+
+    def to_channel(self) -> Channel:
+        # Enough of a Channel for iter_messages to build an InputPeerChannel
+        return Channel(
+            id=self.channel_id,
+            title=self.title,
+            photo=ChatPhotoEmpty(),
+            date=None,
+            access_hash=self.access_hash,
+            username=self.username,
+        )
+
+
+class EntityCache(JSONStore):
+    """Maps channel handles to resolved channels so warm runs skip get_entity.
+
+    Access hashes are only valid for the account that resolved them, so each
+    session should use its own cache file.
+    """
+
+    def __init__(
+        self, data_dir: str, ttl: timedelta, filename: str = "entity_cache.json"
+    ):
+        super().__init__(data_dir)
+        self.ttl = ttl
+        self.filename = filename
+        self._entries: Optional[Dict[str, CachedEntity]] = None
+
+    @property
+    def entries(self) -> Dict[str, CachedEntity]:
+        if self._entries is None:
+            data = self._load(self.filename) or {}
+            self._entries = {
+                handle: CachedEntity(**entry) for handle, entry in data.items()
+            }
+        return self._entries
+
+    def get(self, handle: str) -> Optional[CachedEntity]:
+        entry = self.entries.get(handle)
+        if entry is None:
+            return None
+        resolved_at = datetime.fromisoformat(entry.resolved_at)
+        if datetime.now(tz=timezone.utc) - resolved_at > self.ttl:
+            logger.debug("Entity cache entry for %s expired", handle)
+            return None
+        return entry
+
+    def put(self, handle: str, entity: Channel):
+        if entity.access_hash is None:
+            # "min" channels carry no usable access hash
+            return
+        self.entries[handle] = CachedEntity(
+            channel_id=entity.id,
+            access_hash=entity.access_hash,
+            title=entity.title,
+            username=entity.username,
+            resolved_at=datetime.now(tz=timezone.utc).isoformat(),
+        )
+
+    def invalidate(self, channel_id: int) -> Optional[str]:
+        for handle, entry in list(self.entries.items()):
+            if entry.channel_id == channel_id:
+                del self.entries[handle]
+                logger.info("Invalidated cached entity for %s", handle)
+                return handle
+        return None
+
+    def save(self) -> str:
+        return self._save(self.filename, self.entries)
@@ -0,0 +1,185 @@
+import asyncio
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from telethon.errors import FloodWaitError
+from telethon.tl.types import Channel, ChatPhotoEmpty, Message, PeerChannel
+
+
+@dataclass
+class FakeChannel:
+    entity: Channel
+    # Newest first, the order Telegram returns history in
+    messages: List[Message] = field(default_factory=list)
+
+
+class FakeTelegramClient:
+    """Offline stand-in for the parts of TelegramClient the adapter uses.
+
+    History requests are served from in-memory channels in pages of at most
+    ``page_size`` messages. Every page costs ``latency`` seconds, and every
+    ``flood_wait_every``-th request fails with a FloodWaitError, so fetch
+    throughput can be measured without an account or network.
+    """
+
+    def __init__(
+        self,
+        channels: Dict[str, FakeChannel],
+        latency: float = 0.0,
+        page_size: int = 100,
+        flood_wait_every: int = 0,
+        flood_wait_seconds: int = 0,
+    ):
+        self.channels = channels
+        self.latency = latency
+        self.page_size = page_size
+        self.flood_wait_every = flood_wait_every
+        self.flood_wait_seconds = flood_wait_seconds
+        self.requests = 0
+        self.flood_waits = 0
+        self._by_id = {channel.entity.id: channel for channel in channels.values()}
+        self._handlers: List[Callable[[Any], Any]] = []
+        self._connected = False
+        self._disconnected: Optional[asyncio.Event] = None
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self):
+        self._connected = True
+
+    async def disconnect(self):
+        self._connected = False
+        if self._disconnected is not None:
+            self._disconnected.set()
+
+    async def is_user_authorized(self) -> bool:
+        return True
+
+    async def get_entity(self, entity: str | Sequence[str]):
+        if isinstance(entity, str):
+            return (await self.get_entity([entity]))[0]
+        await self._request()
+        try:
+            return [self.channels[handle].entity for handle in entity]
+        except KeyError as e:
+            raise ValueError(f"No user has {e.args[0]} as username")
+
+    async def get_dialogs(self) -> List[Any]:
+        await self._request()
+        return [SimpleNamespace(entity=c.entity) for c in self.channels.values()]
+
+    async def iter_messages(
+        self,
+        entity: Channel,
+        limit: Optional[int] = None,
+        *,
+        offset_date: Optional[datetime] = None,
+        offset_id: int = 0,
+        min_id: int = 0,
+        **kwargs,
+    ):
+        history = self._by_id[entity.id].messages
+        matching = [
+            m
+            for m in history
+            if (not offset_id or m.id < offset_id)
+            and (offset_date is None or m.date < offset_date)
+            and m.id > min_id
+        ]
+        remaining = math.inf if limit is None else limit
+        position = 0
+        while remaining > 0:
+            requested = int(min(self.page_size, remaining))
+            await self._request()
+            page = matching[position : position + requested]
+            for message in page:
+                yield message
+            position += len(page)
+            remaining -= len(page)
+            if len(page) < requested:
+                return
+
+    def add_event_handler(self, callback: Callable[[Any], Any], event: Any = None):
+        self._handlers.append(callback)
+
+    def remove_event_handler(self, callback: Callable[[Any], Any], event: Any = None):
+        self._handlers.remove(callback)
+
+    async def run_until_disconnected(self):
+        self._disconnected = asyncio.Event()
+        await self._disconnected.wait()
+
+    async def publish(self, handle: str, text: str, date: Optional[datetime] = None):
+        channel = self.channels[handle]
+        last_id = channel.messages[0].id if channel.messages else 0
+        message = _make_message(
+            channel.entity.id, last_id + 1, date or datetime.now(tz=timezone.utc), text
+        )
+        channel.messages.insert(0, message)
+        for handler in list(self._handlers):
+            await handler(SimpleNamespace(message=message))
+
+    async def _request(self):
+        self.requests += 1
+        if self.flood_wait_every and self.requests % self.flood_wait_every == 0:
+            self.flood_waits += 1
+            raise FloodWaitError(request=None, capture=self.flood_wait_seconds)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+def synthetic_channels(
+    channel_count: int,
+    messages_per_channel: int,
+    start: datetime,
+    interval: timedelta = timedelta(minutes=1),
+    text: Callable[[int, int], str] = lambda channel, i: f"message {i} in {channel}",
+) -> Dict[str, FakeChannel]:
+    channels = {}
+    for c in range(1, channel_count + 1):
+        entity = _make_channel(c, f"channel{c}")
+        messages = [
+            _make_message(c, i, start + interval * i, text(c, i))
+            for i in range(messages_per_channel, 0, -1)
+        ]
+        channels[f"@{entity.username}"] = FakeChannel(entity, messages)
+    return channels
+
+
+def recorded_channels(records: Iterable[Dict[str, Any]]) -> Dict[str, FakeChannel]:
+    """Rebuilds channels from saved fetch records (``RawMessage.to_json`` dicts)."""
+    channels: Dict[str, FakeChannel] = {}
+    for record in records:
+        handle = record["channel_handle"]
+        if handle not in channels:
+            entity = _make_channel(record["channel_id"], handle.lstrip("@"))
+            channels[handle] = FakeChannel(entity)
+        channels[handle].messages.append(
+            _make_message(
+                record["channel_id"],
+                record["id"],
+                datetime.fromisoformat(record["time"]),
+                record["text"],
+            )
+        )
+    for channel in channels.values():
+        channel.messages.sort(key=lambda m: m.id, reverse=True)
+    return channels
+
+
+def _make_channel(channel_id: int, username: str) -> Channel:
+    return Channel(
+        id=channel_id,
+        title=username,
+        photo=ChatPhotoEmpty(),
+        date=None,
+        access_hash=channel_id,
+        username=username,
+    )
+
+
+def _make_message(channel_id: int, id: int, date: datetime, text: str) -> Message:
+    return Message(id=id, peer_id=PeerChannel(channel_id), date=date, message=text)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+from array import array
+from datetime import datetime, timezone
+import heapq
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+from dropspy.telegram.types import RawMessage
+from dropspy.utils.encoders import register_encoder
+from dropspy.utils.merge import iso_to_timestamp
+
+
+class MessageBatch:
+    """Column-oriented message collection for large fetch windows.
+
+    Ids and timestamps live in typed arrays, channel handles are interned
+    and stored once, so a message costs a few machine words plus its text
+    instead of an object with its own ``__dict__``. Times are kept as UTC
+    epoch seconds and rendered back as ISO strings on output.
+    """
+
+    __slots__ = (
+        "ids",
+        "channel_ids",
+        "timestamps",
+        "handle_indexes",
+        "texts",
+        "_handles",
+        "_handle_lookup",
+    )
+
+    def __init__(self):
+        self.ids = array("q")
+        self.channel_ids = array("q")
+        self.timestamps = array("q")
+        self.handle_indexes = array("I")
+        self.texts: List[str] = []
+        self._handles: List[str] = []
+        self._handle_lookup: Dict[str, int] = {}
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[RawMessage]) -> MessageBatch:
+        batch = cls()
+        batch.extend(messages)
+        return batch
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> MessageBatch:
+        batch = cls()
+        for record in records:
+            batch._append(
+                record["id"],
+                record["channel_id"],
+                record["channel_handle"],
+                _to_timestamp(record["time"]),
+                record["text"],
+            )
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (self.record(i) for i in range(len(self)))
+
+    def append(self, message: RawMessage):
+        self._append(
+            message.id,
+            message.channel_id,
+            message.channel_handle,
+            _to_timestamp(message.time),
+            message.text,
+        )
+
+    def extend(self, messages: Iterable[RawMessage]):
+        for message in messages:
+            self.append(message)
+
+    def handle(self, i: int) -> str:
+        return self._handles[self.handle_indexes[i]]
+
+    def time(self, i: int) -> str:
+        return datetime.fromtimestamp(self.timestamps[i], tz=timezone.utc).isoformat()
+
+    def message(self, i: int) -> RawMessage:
+        return RawMessage(
+            id=self.ids[i],
+            channel_id=self.channel_ids[i],
+            channel_handle=self.handle(i),
+            time=self.time(i),
+            text=self.texts[i],
+        )
+
+    def messages(self) -> Iterator[RawMessage]:
+        return (self.message(i) for i in range(len(self)))
+
+    def record(self, i: int) -> Dict[str, Any]:
+        return {
+            "id": self.ids[i],
+            "channel_id": self.channel_ids[i],
+            "channel_handle": self.handle(i),
+            "time": self.time(i),
+            "text": self.texts[i],
+        }
+
+    def select(self, indexes: Iterable[int]) -> MessageBatch:
+        selected = MessageBatch()
+        # Handle indexes stay valid because the handle table is shared
+        selected._handles = self._handles
+        selected._handle_lookup = self._handle_lookup
+        indexes = list(indexes)
+        selected.ids = array("q", (self.ids[i] for i in indexes))
+        selected.channel_ids = array("q", (self.channel_ids[i] for i in indexes))
+        selected.timestamps = array("q", (self.timestamps[i] for i in indexes))
+        selected.handle_indexes = array("I", (self.handle_indexes[i] for i in indexes))
+        selected.texts = [self.texts[i] for i in indexes]
+        return selected
+
+    def sorted_by_time(self) -> MessageBatch:
+        order = sorted(range(len(self)), key=self.timestamps.__getitem__)
+        return self.select(order)
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        return list(self)
+
+    def append_row(self, other: MessageBatch, i: int):
+        self._append(
+            other.ids[i],
+            other.channel_ids[i],
+            other.handle(i),
+            other.timestamps[i],
+            other.texts[i],
+        )
+
+    def _append(self, id: int, channel_id: int, handle: str, timestamp: int, text: str):
+        handle_index = self._handle_lookup.get(handle)
+        if handle_index is None:
+            handle_index = len(self._handles)
+            self._handles.append(sys.intern(handle))
+            self._handle_lookup[handle] = handle_index
+        self.ids.append(id)
+        self.channel_ids.append(channel_id)
+        self.timestamps.append(timestamp)
+        self.handle_indexes.append(handle_index)
+        self.texts.append(text)
+
+
+register_encoder(MessageBatch, MessageBatch.to_json)
+
+
+def merge_batches(
+    batches: Sequence[MessageBatch], newest_first: bool = False
+) -> MessageBatch:
+    """K-way merges batches that are each sorted by time into one ascending batch.
+
+    Set ``newest_first`` when every input is in descending order, as fetched
+    channel history is.
+    """
+
+    def rows(n: int, batch: MessageBatch):
+        indexes = range(len(batch))
+        if newest_first:
+            indexes = reversed(indexes)
+        return ((batch.timestamps[i], n, i) for i in indexes)
+
+    merged = MessageBatch()
+    for _, n, i in heapq.merge(*(rows(n, batch) for n, batch in enumerate(batches))):
+        merged.append_row(batches[n], i)
+    return merged
+
+
+def _to_timestamp(time: str) -> int:
+    return int(iso_to_timestamp(time))
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Union
+from dropspy.telegram.api_adapter import MessageHandler, PageHandler, TelegramAPIAdapter
+from dropspy.telegram.types import (
+    ChannelCursor,
+    ChannelInfo,
+    PagingCheckpoint,
+    RawMessage,
+)
+from dropspy.utils.merge import merge_by_time
+
+logger = logging.getLogger(__name__)
+
+
+class ShardedTelegramAPIAdapter:
+    """Spreads target channels across several Telegram accounts.
+
+    Each handle is always assigned to the same session (by a hash of the
+    handle), so per-account entity caches stay warm between runs. Shards are
+    fetched in parallel, each under its own account's rate limits.
+    """
+
+    def __init__(self, adapters: List[TelegramAPIAdapter]):
+        if not adapters:
+            raise ValueError("At least one adapter is required")
+        self.adapters = adapters
+
+    def shard_for(self, channel_handle: str) -> int:
+        key = channel_handle.strip().lstrip("@").lower().encode("utf-8")
+        return zlib.crc32(key) % len(self.adapters)
+
+    def partition(self, channel_handles: List[str]) -> List[List[str]]:
+        shards: List[List[str]] = [[] for _ in self.adapters]
+        for handle in channel_handles:
+            shards[self.shard_for(handle)].append(handle)
+        return shards
+
+    async def connect(self):
+        await asyncio.gather(*(adapter.connect() for adapter in self.adapters))
+        return self
+
+    async def disconnect(self):
+        await asyncio.gather(*(adapter.disconnect() for adapter in self.adapters))
+
+    async def fetch_participating_channels_info(self) -> List[ChannelInfo]:
+        results = await asyncio.gather(
+            *(adapter.fetch_participating_channels_info() for adapter in self.adapters)
+        )
+        channels: Dict[int, ChannelInfo] = {}
+        for infos in results:
+            for info in infos:
+                channels.setdefault(info.id, info)
+        return list(channels.values())
+
+    async def fetch_messages(
+        self,
+        channel_handles: List[str],
+        last_fetch: datetime,
+        cursors: Optional[Dict[int, ChannelCursor]] = None,
+        until: Optional[datetime] = None,
+    ) -> List[RawMessage]:
+        results = await asyncio.gather(
+            *(
+                adapter.fetch_messages(handles, last_fetch, cursors, until)
+                for adapter, handles in self._assigned(channel_handles)
+            )
+        )
+        return list(merge_by_time(results))
+
+    async def stream_messages(
+        self,
+        channel_handles: List[str],
+        last_fetch: datetime,
+        on_page: PageHandler,
+        cursors: Optional[Dict[int, ChannelCursor]] = None,
+        until: Optional[datetime] = None,
+        checkpoints: Optional[Dict[int, PagingCheckpoint]] = None,
+    ):
+        await asyncio.gather(
+            *(
+                adapter.stream_messages(
+                    handles, last_fetch, on_page, cursors, until, checkpoints
+                )
+                for adapter, handles in self._assigned(channel_handles)
+            )
+        )
+
+    async def subscribe_new_messages(
+        self, channel_handles: List[str], on_message: MessageHandler
+    ) -> Callable[[], None]:
+        unsubscribes = await asyncio.gather(
+            *(
+                adapter.subscribe_new_messages(handles, on_message)
+                for adapter, handles in self._assigned(channel_handles)
+            )
+        )
+
+        def unsubscribe():
+            for remove in unsubscribes:
+                remove()
+
+        return unsubscribe
+
+    async def run_until_disconnected(self):
+        await asyncio.gather(
+            *(adapter.run_until_disconnected() for adapter in self.adapters)
+        )
+
+    def _assigned(self, channel_handles: List[str]):
+        for adapter, handles in zip(self.adapters, self.partition(channel_handles)):
+            if handles:
+                logger.debug("Assigned %d channels to a session", len(handles))
+                yield adapter, handles
+
+
+AnyTelegramAPIAdapter = Union[TelegramAPIAdapter, ShardedTelegramAPIAdapter]
@@ -1,7 +1,8 @@
 from __future__ import annotations
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass
 from datetime import datetime
 import json
+from dropspy.utils.encoders import register_encoder
 
 
 @dataclass
@@ -19,8 +20,40 @@ class ChannelInfo:
         except AssertionError:
             return False
 
+    def to_json(self) -> dict:
+        return {"id": self.id, "title": self.title, "handle": self.handle}
+
+
+@dataclass
+class ChannelCursor:
+    channel_id: int
+    last_message_id: int
+    last_message_time: str
+
+    def to_json(self) -> dict:
+        return {
+            "channel_id": self.channel_id,
+            "last_message_id": self.last_message_id,
+            "last_message_time": self.last_message_time,
+        }
+
 
 @dataclass
+class PagingCheckpoint:
+    channel_id: int
+    # Next page continues below this message id; 0 means start from the newest
+    offset_id: int
+    done: bool
+
+    def to_json(self) -> dict:
+        return {
+            "channel_id": self.channel_id,
+            "offset_id": self.offset_id,
+            "done": self.done,
+        }
+
+
+@dataclass(slots=True)
 class RawMessage:
     id: int
     channel_id: int
@@ -41,9 +74,20 @@ class RawMessage:
             return False
 
     def to_json(self) -> dict:
-        return asdict(self)
+        # Built directly rather than with asdict, which deep-copies every field
+        return {
+            "id": self.id,
+            "channel_id": self.channel_id,
+            "channel_handle": self.channel_handle,
+            "time": self.time,
+            "text": self.text,
+        }
 
     @classmethod
     def from_json(cls, data: str) -> RawMessage:
         obj = json.loads(data)
         return cls(**obj)
+
+
+for _record_type in (ChannelInfo, ChannelCursor, PagingCheckpoint, RawMessage):
+    register_encoder(_record_type, _record_type.to_json)
@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+import os
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process locking on Windows; one writer at a time is assumed
+    fcntl = None
+
+
+def write_atomic(path: str, raw: bytes):
+    """Replaces ``path`` so a crash leaves either the old or the new file, never a torn one."""
+    tmp_path = f"{path}.part"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Holds an exclusive lock on ``path`` across processes (e.g. ``watch`` and a cron ``fetch``)."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,153 @@
+from itertools import islice
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List
+from dropspy.utils.hashing import text_digest
+
+logger = logging.getLogger(__name__)
+
+# Key that replaces "text" in records whose text lives in the blob store
+TEXT_REF_KEY = "text_hash"
+# Every text field kept in the blob store, with the key its hash replaces it by
+TEXT_REF_KEYS = {"text": TEXT_REF_KEY, "normalized_text": "normalized_text_hash"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    hash BLOB PRIMARY KEY,
+    text TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Stays under SQLite's default limit on bound parameters
+_MAX_PARAMS = 900
+
+
+class BlobStore:
+    """Message texts stored once each, keyed by a hash of the text.
+
+    Stores that are given one save records with ``text`` (and a
+    ``normalized_text``, if any) swapped for its hash and swap it back on
+    load, so a text shared by overlapping fetch windows, their prebatches
+    and batches is written to disk once.
+    Knowing whether a text was seen before is a single key lookup.
+    """
+
+    def __init__(self, data_dir: str, db_filename: str = "texts.sqlite3"):
+        os.makedirs(data_dir, exist_ok=True)
+        self.db_path = os.path.join(data_dir, db_filename)
+        # Shared with the worker threads of async saves, one call at a time
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __contains__(self, text: str) -> bool:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM texts WHERE hash = ?", (text_digest(text),)
+            ).fetchone()
+        return row is not None
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM texts").fetchone()[0]
+
+    def put_many(self, texts: Iterable[str]) -> List[str]:
+        """Stores the texts that are not stored yet and returns each one's hash."""
+        rows = [(text_digest(text), text) for text in texts]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO texts (hash, text) VALUES (?, ?)", rows
+            )
+        return [digest.hex() for digest, _ in rows]
+
+    def get_many(self, refs: Iterable[str]) -> Dict[str, str]:
+        unique = list(set(refs))
+        texts: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(unique), _MAX_PARAMS):
+                chunk = unique[i : i + _MAX_PARAMS]
+                rows = self.conn.execute(
+                    f"SELECT hash, text FROM texts"
+                    f" WHERE hash IN ({','.join('?' * len(chunk))})",
+                    [bytes.fromhex(ref) for ref in chunk],
+                )
+                texts.update((digest.hex(), text) for digest, text in rows)
+        if len(texts) != len(unique):
+            raise RuntimeError(
+                f"{len(unique) - len(texts)} texts are missing from {self.db_path}"
+            )
+        return texts
+
+    def dehydrate(
+        self, records: Iterable[Any], chunk_size: int = 1024
+    ) -> Iterator[Any]:
+        """Yields the records with each text field replaced by its hash."""
+        records_iter = iter(records)
+        while chunk := list(islice(records_iter, chunk_size)):
+            refs = iter(
+                self.put_many(
+                    r[key] for r in chunk for key in TEXT_REF_KEYS if _has_text(r, key)
+                )
+            )
+            for record in chunk:
+                for key, ref_key in TEXT_REF_KEYS.items():
+                    if _has_text(record, key):
+                        record = _swap(record, key, ref_key, next(refs))
+                yield record
+
+    def hydrate(self, records: Iterable[Any], chunk_size: int = 1024) -> Iterator[Any]:
+        """Yields the records with each text hash replaced by the text again."""
+        records_iter = iter(records)
+        while chunk := list(islice(records_iter, chunk_size)):
+            texts = self.get_many(
+                r[ref_key]
+                for r in chunk
+                for ref_key in TEXT_REF_KEYS.values()
+                if _has_ref(r, ref_key)
+            )
+            for record in chunk:
+                for key, ref_key in TEXT_REF_KEYS.items():
+                    if _has_ref(record, ref_key):
+                        record = _swap(record, ref_key, key, texts[record[ref_key]])
+                yield record
+
+    def dehydrate_data(self, data: Any) -> Any:
+        return _map_records(data, self.dehydrate)
+
+    def hydrate_data(self, data: Any) -> Any:
+        return _map_records(data, self.hydrate)
+
+
+def _map_records(data: Any, fn) -> Any:
+    # Stores save lists of records, single records, or records keyed by index
+    if isinstance(data, list):
+        return list(fn(data))
+    if isinstance(data, dict):
+        if _has_text(data) or _has_ref(data):
+            return next(fn([data]))
+        if data and all(isinstance(v, dict) for v in data.values()):
+            return dict(zip(data.keys(), fn(data.values())))
+    return data
+
+
+def _swap(record: Dict, old_key: str, new_key: str, value: Any) -> Dict:
+    # Keeps the field where it was, so hydrated records match the originals
+    return {
+        (new_key if k == old_key else k): (value if k == old_key else v)
+        for k, v in record.items()
+    }
+
+
+def _has_text(record: Any, key: str = "text") -> bool:
+    return isinstance(record, dict) and isinstance(record.get(key), str)
+
+
+def _has_ref(record: Any, ref_key: str = TEXT_REF_KEY) -> bool:
+    return isinstance(record, dict) and ref_key in record
@@ -0,0 +1,13 @@
+from typing import Any, Callable, Dict
+
+# Looked up by exact type when stores serialize records in bulk
+ENCODERS: Dict[type, Callable[[Any], Any]] = {}
+
+
+def register_encoder(cls: type, encoder: Callable[[Any], Any]):
+    """Registers a one-step encoder for a record type saved in bulk.
+
+    The encoder must return plain JSON data (dicts, lists and scalars); it is
+    looked up by exact type before the generic walker is tried.
+    """
+    ENCODERS[cls] = encoder
@@ -1,8 +1,19 @@
 import json
+from typing import Optional
+from dropspy.utils.manifest import Manifest
+
+
 def jsonToStr(msg: dict) -> str:
     json_str = json.dumps(msg, ensure_ascii=False)
     return json_str
 
-def print_filename_with_index(files: list[str]):
+def print_filename_with_index(files: list[str], manifest: Optional[Manifest] = None):
     for idx, filename in enumerate(files):
-        print(f"{idx}: {filename}")
\ No newline at end of file
+        entry = manifest.get(filename) if manifest is not None else None
+        if entry is None:
+            print(f"{idx}: {filename}")
+            continue
+        time_range = f"{entry.start} ~ {entry.end}" if entry.start else "no messages"
+        print(
+            f"{idx}: {filename} ({entry.count} items, {time_range}, {entry.bytes} bytes)"
+        )
\ No newline at end of file
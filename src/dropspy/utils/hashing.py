@@ -0,0 +1,20 @@
+import hashlib
+
+TEXT_DIGEST_SIZE = 16
+
+
+def text_digest(text: str) -> bytes:
+    """Stable 128-bit digest of a message text, used to index and compare texts."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=TEXT_DIGEST_SIZE).digest()
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=TEXT_DIGEST_SIZE).hexdigest()
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.blake2b(digest_size=TEXT_DIGEST_SIZE)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -1,23 +1,122 @@
+from contextlib import nullcontext
 from dataclasses import asdict, is_dataclass
 import dataclasses
+from datetime import datetime, timezone
 import logging
 import os
 import json
-from typing import Dict, List, Mapping, Any, Sequence
+import threading
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+)
+from dropspy.utils.atomic import write_atomic
+from dropspy.utils.blob_store import BlobStore
+from dropspy.utils.encoders import ENCODERS
+from dropspy.utils.hashing import content_digest, file_digest
+from dropspy.utils.manifest import (
+    MANIFEST_FILENAME,
+    Manifest,
+    ManifestEntry,
+    time_range,
+)
+from dropspy.utils.ndjson import NDJSON_EXTENSION, NDJSON_GZ_EXTENSION, iter_records
+from dropspy.utils.serializers import (
+    STORE_EXTENSIONS,
+    JSONSerializer,
+    Serializer,
+    iter_items,
+    loads,
+    split_extension,
+)
 
 logger = logging.getLogger(__name__)
 
+_SCALAR_TYPES = frozenset((str, int, float, bool, type(None)))
+
 
 class JSONStore:
-    def __init__(self, data_dir: str):
+    # Stores that name their pipeline stage keep a manifest of the files they save
+    stage: Optional[str] = None
+
+    def __init__(
+        self,
+        data_dir: str,
+        serializer: Optional[Serializer] = None,
+        blob_store: Optional[BlobStore] = None,
+    ):
         self.data_dir = data_dir
+        self.serializer = serializer if serializer is not None else JSONSerializer()
+        # Message texts go to the blob store and files keep their hashes
+        self.blob_store = blob_store
+        self._manifest: Optional[Manifest] = None
+        self._manifest_lock = threading.Lock()
         os.makedirs(self.data_dir, exist_ok=True)
 
+    @property
+    def manifest(self) -> Optional[Manifest]:
+        if self.stage is None:
+            return None
+        with self._manifest_lock:
+            if self._manifest is None:
+                self._manifest = Manifest(self.data_dir)
+                if not self._manifest.exists():
+                    self.rebuild_manifest()
+        return self._manifest
+
+    def rebuild_manifest(self):
+        """Re-indexes every data file, e.g. after files were changed by hand.
+
+        Listings trust the manifest and never scan the directory; this (and the
+        ``reindex`` command) is how files added or removed outside the store
+        are picked up.
+        """
+        manifest = self._manifest or Manifest(self.data_dir)
+        previous, manifest.entries = manifest.entries, {}
+        for filename in self._tracked_files():
+            entry = self._describe_file(os.path.join(self.data_dir, filename))
+            # What a file is for can't be told from its contents
+            entry.segment = filename in previous and previous[filename].segment
+            manifest.entries[entry.filename] = entry
+        manifest.save()
+        self._manifest = manifest
+
+    def batched_manifest(self) -> ContextManager:
+        """Writes the manifest once for all the saves, moves and removals inside."""
+        if self.manifest is None:
+            return nullcontext()
+        return self.manifest.batched()
+
+    def content_hash(self, filename: str) -> Optional[str]:
+        entry = self.manifest.get(filename) if self.manifest is not None else None
+        return entry.content_hash if entry is not None else None
+
     def _list_files(self):
-        files = [f for f in os.listdir(self.data_dir) if f.endswith(".json")]
+        if self.manifest is not None:
+            return self.manifest.filenames()
+        files = [
+            f
+            for f in os.listdir(self.data_dir)
+            if f.endswith(STORE_EXTENSIONS) and f != MANIFEST_FILENAME
+        ]
         files.sort()
         return files
 
+    def _tracked_files(self) -> Iterator[str]:
+        for root, dirs, files in os.walk(self.data_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for f in files:
+                path = os.path.join(root, f)
+                if f.endswith(STORE_EXTENSIONS) and self._is_tracked(path):
+                    yield self._relative(path)
+
     def get_file_by_index(self, idx: int) -> Dict[str, Any]:
         files = self._list_files()
         if idx < 0 or idx >= len(files):
@@ -26,28 +125,178 @@ class JSONStore:
         content = self._load(filename)
         return {"filename": filename, "content": content}
 
-    def _save(self, filename: str, data: Any) -> str:
-        path = os.path.join(self.data_dir, filename)
+    def _save(self, filename: str, data: Any, source_hash: Optional[str] = None) -> str:
+        # The extension always follows the configured format, whatever the caller used
+        stem, _ = split_extension(filename)
+        path = os.path.join(self.data_dir, stem + self.serializer.extension)
         try:
             serializable_data = self._make_serializable(data)
+            if self.blob_store is not None:
+                serializable_data = self.blob_store.dehydrate_data(serializable_data)
             os.makedirs(os.path.dirname(path), exist_ok=True)
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(serializable_data, f, ensure_ascii=False, indent=2)
+            raw = self.serializer.dumps(serializable_data)
+            write_atomic(path, raw)
+            self._remove_other_formats(path)
+            if self.manifest is not None and self._is_tracked(path):
+                items = _items(serializable_data)
+                start, end = time_range(items)
+                self.manifest.put(
+                    ManifestEntry(
+                        filename=self._relative(path),
+                        stage=self.stage,
+                        count=len(items),
+                        bytes=len(raw),
+                        content_hash=content_digest(raw),
+                        saved_at=datetime.now(tz=timezone.utc).isoformat(),
+                        start=start,
+                        end=end,
+                        source_hash=source_hash,
+                    )
+                )
         except Exception as e:
             logger.error(f"Failed to save file: {path} - {e}")
             raise RuntimeError(e)
         return path
 
     def _load(self, filename: str) -> Any:
-        path = os.path.join(self.data_dir, filename)
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        # TODO: add proper error handling
+            return self._read(filename)
+        except FileNotFoundError:
+            return None
         except Exception as e:
+            logger.error(f"Failed to load file: {filename} - {e}")
             return None
 
+    def _read(self, filename: str) -> Any:
+        """Like ``_load``, but raises on a missing or unreadable file."""
+        path = self._resolve_path(filename)
+        if path.endswith((NDJSON_EXTENSION, NDJSON_GZ_EXTENSION)):
+            data = list(iter_records(path))
+        else:
+            with open(path, "rb") as f:
+                data = loads(f.read())
+        if self.blob_store is not None:
+            data = self.blob_store.hydrate_data(data)
+        return data
+
+    def _iter(self, filename: str) -> Iterator[Any]:
+        """Yields the items of a saved list one at a time instead of loading it whole."""
+        if self.blob_store is not None:
+            return self.blob_store.hydrate(self.iter_stored(filename))
+        return self.iter_stored(filename)
+
+    def iter_stored(self, filename: str) -> Iterator[Any]:
+        """Like ``_iter``, but yields items as saved, with text hashes left in."""
+        path = self._resolve_path(filename)
+        if not os.path.exists(path):
+            return
+        if path.endswith((NDJSON_EXTENSION, NDJSON_GZ_EXTENSION)):
+            yield from iter_records(path)
+            return
+        with open(path, "rb") as f:
+            yield from iter_items(f)
+
+    def track_file(
+        self, path: str, source_hash: Optional[str] = None, segment: bool = False
+    ):
+        """Adds a file written outside ``_save`` to the manifest."""
+        if self.manifest is not None:
+            entry = self._describe_file(path)
+            entry.source_hash = source_hash
+            entry.segment = segment
+            self.manifest.put(entry)
+
+    def _move(self, src: str, dst: str):
+        os.replace(src, dst)
+        if self.manifest is not None:
+            self.manifest.rename(self._relative(src), self._relative(dst))
+
+    def _is_tracked(self, path: str) -> bool:
+        return os.path.basename(path) != MANIFEST_FILENAME
+
+    def _describe_file(self, path: str) -> ManifestEntry:
+        filename = self._relative(path)
+        count = 0
+
+        def counted(items: Iterable[Any]) -> Iterator[Any]:
+            nonlocal count
+            for item in items:
+                count += 1
+                yield item
+
+        try:
+            start, end = time_range(counted(self.iter_stored(filename)))
+        except Exception:
+            # Not a list (e.g. a batch file keyed by index), so load it whole
+            count = 0
+            start, end = time_range(counted(_items(self._load(filename))))
+        return ManifestEntry(
+            filename=filename,
+            stage=self.stage,
+            count=count,
+            bytes=os.path.getsize(path),
+            content_hash=file_digest(path),
+            saved_at=datetime.fromtimestamp(
+                os.path.getmtime(path), tz=timezone.utc
+            ).isoformat(),
+            start=start,
+            end=end,
+        )
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.data_dir)
+
+    def _resolve_path(self, filename: str) -> str:
+        """Finds the file holding ``filename`` in whichever format it was saved."""
+        path = os.path.join(self.data_dir, filename)
+        stem, _ = split_extension(path)
+        candidates = [path, stem + self.serializer.extension]
+        candidates += [stem + ext for ext in STORE_EXTENSIONS]
+        for candidate in candidates:
+            if os.path.exists(candidate):
+                return candidate
+        return path
+
+    def _remove_other_formats(self, path: str):
+        # A save replaces the logical file, so a copy left in a previous format is stale
+        stem, current = split_extension(path)
+        for ext in STORE_EXTENSIONS:
+            if (
+                ext != current
+                and ext not in (NDJSON_EXTENSION, NDJSON_GZ_EXTENSION)
+                and os.path.exists(stem + ext)
+            ):
+                os.remove(stem + ext)
+                if self._manifest is not None:
+                    self._manifest.remove(self._relative(stem + ext))
+
     def _make_serializable(self, obj: Any) -> Any:
+        obj_type = type(obj)
+        if obj_type in _SCALAR_TYPES:
+            return obj
+        encoder = ENCODERS.get(obj_type)
+        if encoder is not None:
+            return encoder(obj)
+        if obj_type is list:
+            return self._serialize_list(obj)
+        if obj_type is dict and _is_flat_record(obj):
+            # e.g. a prebatched message; already plain data, so no copy is needed
+            return obj
+        return self._serialize_generic(obj)
+
+    def _serialize_list(self, items: List[Any]) -> List[Any]:
+        if not items:
+            return []
+        item_type = type(items[0])
+        encoder = ENCODERS.get(item_type)
+        if encoder is None:
+            return [self._make_serializable(item) for item in items]
+        return [
+            encoder(item) if type(item) is item_type else self._make_serializable(item)
+            for item in items
+        ]
+
+    def _serialize_generic(self, obj: Any) -> Any:
         if hasattr(obj, "to_json") and callable(obj.to_json):
             return obj.to_json()
 
@@ -64,3 +313,17 @@ class JSONStore:
             return obj
 
         return str(obj)
+
+
+def _items(data: Any) -> List[Any]:
+    if isinstance(data, Mapping):
+        return list(data.values())
+    if isinstance(data, list):
+        return data
+    return []
+
+
+def _is_flat_record(record: Dict[Any, Any]) -> bool:
+    return all(type(key) is str for key in record) and all(
+        type(value) in _SCALAR_TYPES for value in record.values()
+    )
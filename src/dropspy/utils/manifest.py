@@ -0,0 +1,178 @@
+from contextlib import contextmanager
+import dataclasses
+from dataclasses import asdict, dataclass
+import json
+import logging
+import os
+import threading
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+from dropspy.utils.atomic import file_lock, write_atomic
+from dropspy.utils.merge import iso_to_timestamp
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "_manifest.json"
+
+
+@dataclass
+class ManifestEntry:
+    filename: str
+    stage: str
+    count: int
+    bytes: int
+    content_hash: str
+    saved_at: str
+    start: Optional[str] = None
+    end: Optional[str] = None
+    source_hash: Optional[str] = None
+    # Compacted day segment, as opposed to a file saved by a fetch
+    segment: bool = False
+
+    def to_json(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class Manifest:
+    """Index of the files in one store, rewritten on every save.
+
+    Lets listing, index lookups and change checks read one small file
+    instead of listing and opening every data file. Several processes may
+    share a store (e.g. ``watch`` next to a cron ``fetch``): each update
+    re-reads the file under a lock and merges its own changes, and reads
+    reload the file when another process has replaced it. Updates made
+    inside ``batched()`` are written once, when it exits.
+    """
+
+    def __init__(self, data_dir: str):
+        self.path = os.path.join(data_dir, MANIFEST_FILENAME)
+        self._lock = threading.RLock()
+        # Changes not written yet, by filename; None marks a removal
+        self._pending: Dict[str, Optional[ManifestEntry]] = {}
+        self._depth = 0
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self.entries: Dict[str, ManifestEntry] = self._read()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def get(self, filename: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            self._reload_if_changed()
+            return self.entries.get(filename)
+
+    def filenames(self) -> List[str]:
+        with self._lock:
+            self._reload_if_changed()
+            return sorted(self.entries)
+
+    def put(self, entry: ManifestEntry):
+        self.put_many([entry])
+
+    def put_many(self, entries: Iterable[ManifestEntry]):
+        with self._lock:
+            for entry in entries:
+                self._change(entry.filename, entry)
+            self._flush()
+
+    def remove(self, *filenames: str):
+        with self._lock:
+            for name in filenames:
+                self._change(name, None)
+            self._flush()
+
+    def rename(self, old: str, new: str):
+        with self._lock:
+            self._reload_if_changed()
+            entry = self.entries.get(old)
+            if entry is not None:
+                self._change(old, None)
+                self._change(new, dataclasses.replace(entry, filename=new))
+                self._flush()
+
+    @contextmanager
+    def batched(self) -> Iterator["Manifest"]:
+        with self._lock:
+            self._depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._depth -= 1
+                self._flush()
+
+    def save(self):
+        """Writes the entries as they are, replacing whatever is on disk."""
+        with self._lock, self._file_lock():
+            self._pending.clear()
+            self._write()
+
+    def _change(self, filename: str, entry: Optional[ManifestEntry]):
+        self._pending[filename] = entry
+        self._apply({filename: entry})
+
+    def _apply(self, changes: Dict[str, Optional[ManifestEntry]]):
+        for name, entry in changes.items():
+            if entry is None:
+                self.entries.pop(name, None)
+            else:
+                self.entries[name] = entry
+
+    def _flush(self):
+        if self._depth or not self._pending:
+            return
+        with self._file_lock():
+            # Another process may have written since; merge into its version
+            self._reload_if_changed()
+            self._pending.clear()
+            self._write()
+
+    def _write(self):
+        data = {name: entry.to_json() for name, entry in self.entries.items()}
+        write_atomic(self.path, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        self._stamp = self._current_stamp()
+
+    def _reload_if_changed(self):
+        if self._current_stamp() != self._stamp:
+            self.entries = self._read()
+            self._apply(self._pending)
+
+    def _current_stamp(self) -> Optional[Tuple[int, int, int]]:
+        # Saves replace the file, so a new inode or mtime means new content
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _file_lock(self) -> ContextManager[None]:
+        return file_lock(self.path + ".lock")
+
+    def _read(self) -> Dict[str, ManifestEntry]:
+        self._stamp = self._current_stamp()
+        if self._stamp is None:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {name: ManifestEntry(**entry) for name, entry in data.items()}
+        except Exception as e:
+            logger.warning("Ignoring unreadable manifest %s: %s", self.path, e)
+            return {}
+
+
+def time_range(items: Iterable[Any]) -> Tuple[Optional[str], Optional[str]]:
+    """Earliest and latest ``time`` among record-like items, compared as instants."""
+    first = last = None
+    for item in items:
+        time = item.get("time") if isinstance(item, dict) else None
+        if not isinstance(time, str):
+            continue
+        try:
+            timestamp = iso_to_timestamp(time)
+        except ValueError:
+            continue
+        if first is None or timestamp < first[0]:
+            first = (timestamp, time)
+        if last is None or timestamp > last[0]:
+            last = (timestamp, time)
+    return (first[1] if first else None, last[1] if last else None)
@@ -0,0 +1,20 @@
+import heapq
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+def iso_to_timestamp(time: str) -> float:
+    return datetime.fromisoformat(time).timestamp()
+
+
+def merge_by_time(
+    streams: Iterable[Iterable[T]], time_of: Callable[[T], str] = lambda m: m.time
+) -> Iterator[T]:
+    """Lazily merges streams that are each already in ascending time order.
+
+    Costs O(n log k) for k streams, parses each ISO time once and never
+    holds more than one pending item per stream.
+    """
+    return heapq.merge(*streams, key=lambda item: iso_to_timestamp(time_of(item)))
@@ -0,0 +1,117 @@
+from collections import deque
+from operator import eq
+import re
+import zlib
+from typing import Deque, Dict, Hashable, List, Optional, Tuple
+
+Signature = Tuple[int, ...]
+
+_WHITESPACE = re.compile(r"\s+")
+# Larger than any per-bin value, so a borrowed value never ties with a real one
+_BORROW_OFFSET = 1 << 32
+
+
+class MinHasher:
+    """MinHash signatures of texts over overlapping character shingles.
+
+    Uses one-permutation hashing: every shingle is hashed once and lands in
+    one of ``num_perm`` bins, which keep their smallest hash. That makes a
+    signature linear in the length of the text instead of in
+    ``num_perm * length``. Empty bins borrow from the next filled bin so
+    short texts still get a full signature.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+    def signature(self, text: str) -> Signature:
+        data = _WHITESPACE.sub(" ", text).strip().lower().encode("utf-8")
+        k = self.shingle_size
+        shingles = {data[i : i + k] for i in range(max(len(data) - k + 1, 1))}
+        bins: List[Optional[int]] = [None] * self.num_perm
+        for shingle in shingles:
+            h = zlib.crc32(shingle)
+            b, value = h % self.num_perm, h // self.num_perm
+            if bins[b] is None or value < bins[b]:
+                bins[b] = value
+        return tuple(self._densify(bins))
+
+    def _densify(self, bins: List[Optional[int]]) -> List[int]:
+        n = len(bins)
+        filled = [i for i in range(n) if bins[i] is not None]
+        if not filled:
+            return [0] * n
+        out = []
+        for i in range(n):
+            if bins[i] is not None:
+                out.append(bins[i])
+                continue
+            distance = 1
+            while bins[(i + distance) % n] is None:
+                distance += 1
+            out.append(bins[(i + distance) % n] + distance * _BORROW_OFFSET)
+        return out
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(map(eq, a, b)) / len(a)
+
+
+class NearDuplicateIndex:
+    """Clusters texts whose estimated similarity is at least ``threshold``.
+
+    Signatures are split into ``bands``; texts sharing any whole band land
+    in the same bucket and only those candidates are compared. Buckets keep
+    their latest ``max_bucket_size`` texts, so templated messages that share
+    bands without being duplicates don't make adding a text quadratic.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.7,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        max_bucket_size: int = 16,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_bucket_size = max_bucket_size
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self._signatures: Dict[Hashable, Signature] = {}
+        self._buckets: Dict[Tuple[int, Signature], Deque[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def find_or_add(self, key: Hashable, text: str) -> Hashable:
+        """Returns the key of the most similar text already added, or adds this one."""
+        signature = self.hasher.signature(text)
+        band_keys = [
+            (b, signature[b * self.rows : (b + 1) * self.rows])
+            for b in range(self.bands)
+        ]
+        candidates = {
+            candidate
+            for band_key in band_keys
+            for candidate in self._buckets.get(band_key, ())
+        }
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            score = similarity(signature, self._signatures[candidate])
+            if score >= best_score:
+                best, best_score = candidate, score
+        if best is not None:
+            return best
+        self._signatures[key] = signature
+        for band_key in band_keys:
+            bucket = self._buckets.get(band_key)
+            if bucket is None:
+                bucket = self._buckets[band_key] = deque(maxlen=self.max_bucket_size)
+            bucket.append(key)
+        return key
@@ -0,0 +1,128 @@
+from datetime import datetime, timezone
+import gzip
+import json
+import logging
+import os
+from typing import Any, Dict, IO, Iterable, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+NDJSON_EXTENSION = ".ndjson"
+NDJSON_GZ_EXTENSION = ".ndjson.gz"
+TIME_INDEX_SUFFIX = ".index"
+
+
+def append_records(f: IO[str], records: Iterable[Dict[str, Any]]):
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+    f.flush()
+
+
+def iter_records(path: str, offset: int = 0) -> Iterator[Dict[str, Any]]:
+    if path.endswith(".gz"):
+        opened = gzip.open(path, "rt", encoding="utf-8")
+    else:
+        opened = open(path, "r", encoding="utf-8")
+    with opened as f:
+        if offset:
+            f.seek(offset)
+        for line in f:
+            record = _parse_line(path, line)
+            if record is not None:
+                yield record
+
+
+def iter_records_reversed(
+    path: str, chunk_size: int = 64 * 1024
+) -> Iterator[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+        while position > 0:
+            read_size = min(chunk_size, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b"\n")
+            # The first piece may be the tail of a line that starts in an earlier chunk
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                record = _parse_line(path, line)
+                if record is not None:
+                    yield record
+        record = _parse_line(path, remainder)
+        if record is not None:
+            yield record
+
+
+def write_indexed_records(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Writes time-ordered records plus a sidecar of hourly byte offsets.
+
+    The sidecar lets ``index_offset`` skip straight to the first hour of a
+    time range instead of scanning the file from the top.
+    """
+    hours: List[List[Any]] = []
+    channels: Dict[str, int] = {}
+    offset = count = 0
+    previous = None
+    try:
+        with open(f"{path}.part", "wb") as f:
+            for record in records:
+                # The hourly offsets are only valid over time-ordered lines
+                time = datetime.fromisoformat(record["time"])
+                if previous is not None and time < previous:
+                    raise ValueError(
+                        f"Records for {path} are out of time order at {record['time']}"
+                    )
+                previous = time
+                hour = _hour(record["time"])
+                if not hours or hours[-1][0] != hour:
+                    hours.append([hour, offset, 0])
+                hours[-1][2] += 1
+                key = str(record["channel_id"])
+                channels[key] = channels.get(key, 0) + 1
+                line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                offset += len(line)
+                count += 1
+    except Exception:
+        os.remove(f"{path}.part")
+        raise
+    with open(f"{path}{TIME_INDEX_SUFFIX}.part", "w", encoding="utf-8") as f:
+        json.dump({"hours": hours, "channels": channels}, f)
+    os.replace(f"{path}.part", path)
+    os.replace(f"{path}{TIME_INDEX_SUFFIX}.part", f"{path}{TIME_INDEX_SUFFIX}")
+    return count
+
+
+def index_offset(path: str, start: datetime) -> int:
+    """Byte offset from which every record after ``start`` can be read; 0 if unindexed."""
+    index_path = f"{path}{TIME_INDEX_SUFFIX}"
+    if not os.path.exists(index_path):
+        return 0
+    with open(index_path, "r", encoding="utf-8") as f:
+        hours = json.load(f)["hours"]
+    start_hour = _hour(start.isoformat())
+    offset = 0
+    for hour, hour_offset, _ in hours:
+        if hour > start_hour:
+            break
+        offset = hour_offset
+    return offset
+
+
+def _hour(time: str) -> str:
+    parsed = datetime.fromisoformat(time).astimezone(timezone.utc)
+    return parsed.replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+def _parse_line(path: str, line: str | bytes) -> Dict[str, Any] | None:
+    if not line.strip():
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        # A crash mid-append leaves a truncated last line
+        logger.warning("Skipping malformed line in %s", path)
+        return None
@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+import logging
+import math
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    digest BLOB PRIMARY KEY,
+    source TEXT NOT NULL,
+    first_seen INTEGER NOT NULL,
+    last_seen INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS seen_last_seen ON seen (last_seen);
+"""
+
+
+class BloomFilter:
+    """Fixed-size set of digests with no false negatives and rare false positives."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.size = max(
+            int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8 * 1024
+        )
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, digest: bytes):
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(digest)
+        )
+
+    def _positions(self, digest: bytes) -> Iterable[int]:
+        # Two halves of an already uniform digest stand in for k hash functions
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+
+class SeenIndex:
+    """Text digests already pre-batched, kept across runs and fetch windows.
+
+    Each digest remembers the ``source`` (input file) it was first seen in,
+    so pre-batching that same file again does not count its own messages as
+    seen. Lookups go through an in-memory Bloom filter first and touch the
+    database only for digests that may be present; the filter is rebuilt
+    when another process has written to the index. The index is bounded:
+    ``age_out`` forgets digests not seen for ``max_age`` and, beyond
+    ``max_entries``, the least recently seen ones.
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        max_age: Optional[timedelta] = None,
+        max_entries: int = 1_000_000,
+        db_filename: str = "seen.sqlite3",
+    ):
+        os.makedirs(data_dir, exist_ok=True)
+        self.db_path = os.path.join(data_dir, db_filename)
+        self.max_age = max_age
+        self.max_entries = max_entries
+        # Several pipelines may share the index from worker threads
+        self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._bloom: Optional[BloomFilter] = None
+        self._data_version: Optional[int] = None
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def check_and_add(
+        self, digests: Iterable[bytes], source: str, now: datetime
+    ) -> List[bool]:
+        """For each digest, whether another source had it; then records them all."""
+        digests = list(digests)
+        timestamp = int(now.timestamp())
+        with self._lock:
+            bloom = self._get_bloom()
+            maybe = list({d for d in digests if d in bloom})
+            first_sources = {}
+            for i in range(0, len(maybe), 900):
+                chunk = maybe[i : i + 900]
+                rows = self.conn.execute(
+                    "SELECT digest, source FROM seen"
+                    f" WHERE digest IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                first_sources.update(rows)
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO seen (digest, source, first_seen, last_seen)"
+                    " VALUES (?, ?, ?, ?) ON CONFLICT (digest)"
+                    " DO UPDATE SET last_seen = excluded.last_seen",
+                    ((d, source, timestamp, timestamp) for d in set(digests)),
+                )
+            for d in digests:
+                bloom.add(d)
+        return [first_sources.get(d, source) != source for d in digests]
+
+    def age_out(self, now: datetime) -> int:
+        """Forgets expired and excess digests; returns how many were removed."""
+        removed = 0
+        with self._lock, self.conn:
+            if self.max_age is not None:
+                cutoff = int((now - self.max_age).timestamp())
+                removed += self.conn.execute(
+                    "DELETE FROM seen WHERE last_seen < ?", (cutoff,)
+                ).rowcount
+            excess = (
+                self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+                - self.max_entries
+            )
+            if excess > 0:
+                removed += self.conn.execute(
+                    "DELETE FROM seen WHERE digest IN"
+                    " (SELECT digest FROM seen ORDER BY last_seen LIMIT ?)",
+                    (excess,),
+                ).rowcount
+            if removed:
+                # A Bloom filter can't forget, so it's rebuilt on next use
+                self._bloom = None
+        if removed:
+            logger.info("Forgot %d seen messages", removed)
+        return removed
+
+    def _get_bloom(self) -> BloomFilter:
+        # data_version changes when another connection (e.g. a CLI prebatch next
+        # to a long-running watch) commits, so its digests are loaded too
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._bloom is None or version != self._data_version:
+            bloom = BloomFilter(self.max_entries)
+            for (digest,) in self.conn.execute("SELECT digest FROM seen"):
+                bloom.add(digest)
+            self._bloom = bloom
+            self._data_version = version
+        return self._bloom
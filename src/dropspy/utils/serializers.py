@@ -0,0 +1,215 @@
+from abc import ABC, abstractmethod
+import io
+import json
+from typing import Any, BinaryIO, Iterator, Optional, Tuple
+from dropspy.utils.ndjson import NDJSON_EXTENSION, NDJSON_GZ_EXTENSION
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON_EXTENSION = ".json"
+MSGPACK_EXTENSION = ".msgpack"
+ZSTD_EXTENSION = ".zst"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+STORE_EXTENSIONS = (
+    JSON_EXTENSION + ZSTD_EXTENSION,
+    MSGPACK_EXTENSION + ZSTD_EXTENSION,
+    NDJSON_GZ_EXTENSION,
+    NDJSON_EXTENSION,
+    JSON_EXTENSION,
+    MSGPACK_EXTENSION,
+)
+
+
+class Serializer(ABC):
+    extension = JSON_EXTENSION
+
+    @abstractmethod
+    def dumps(self, data: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def loads(self, raw: bytes) -> Any:
+        pass
+
+
+class JSONSerializer(Serializer):
+    """Human readable JSON; the historical on-disk format."""
+
+    def __init__(self, indent: Optional[int] = 2):
+        self.indent = indent
+
+    def dumps(self, data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, indent=self.indent).encode("utf-8")
+
+    def loads(self, raw: bytes) -> Any:
+        return _json_loads(raw)
+
+
+class OrjsonSerializer(Serializer):
+    """Compact JSON written by orjson; still readable as plain ``.json``."""
+
+    def __init__(self):
+        _require(orjson, "orjson", "orjson")
+
+    def dumps(self, data: Any) -> bytes:
+        return orjson.dumps(data)
+
+    def loads(self, raw: bytes) -> Any:
+        return orjson.loads(raw)
+
+
+class MsgpackSerializer(Serializer):
+    extension = MSGPACK_EXTENSION
+
+    def __init__(self):
+        _require(msgpack, "msgpack", "msgpack")
+
+    def dumps(self, data: Any) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, raw: bytes) -> Any:
+        return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+
+class ZstdSerializer(Serializer):
+    """Wraps another serializer with zstd compression."""
+
+    def __init__(self, inner: Serializer, level: int = 3):
+        _require(zstandard, "zstandard", "zstd")
+        self.inner = inner
+        self.extension = inner.extension + ZSTD_EXTENSION
+        self.compressor = zstandard.ZstdCompressor(level=level)
+
+    def dumps(self, data: Any) -> bytes:
+        return self.compressor.compress(self.inner.dumps(data))
+
+    def loads(self, raw: bytes) -> Any:
+        return loads(raw)
+
+
+SERIALIZERS = {
+    "json": JSONSerializer,
+    "orjson": OrjsonSerializer,
+    "msgpack": MsgpackSerializer,
+}
+
+
+def make_serializer(format: str = "json", compression: str = "") -> Serializer:
+    if format not in SERIALIZERS:
+        raise ValueError(f"Unknown storage format: {format}")
+    serializer = SERIALIZERS[format]()
+    if compression == "zstd":
+        serializer = ZstdSerializer(serializer)
+    elif compression:
+        raise ValueError(f"Unknown storage compression: {compression}")
+    return serializer
+
+
+def loads(raw: bytes) -> Any:
+    """Decodes any format written by a ``Serializer``, detected from its bytes."""
+    if raw.startswith(ZSTD_MAGIC):
+        _require(zstandard, "zstandard", "zstd")
+        raw = zstandard.ZstdDecompressor().decompress(raw, max_output_size=1 << 31)
+    # Stores only write objects and arrays, which never start a msgpack document
+    # with a printable byte
+    if raw.lstrip()[:1] in (b"{", b"[", b""):
+        return _json_loads(raw)
+    _require(msgpack, "msgpack", "msgpack")
+    return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+
+def iter_items(f: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """Lazily yields the items of a top-level array written by any ``Serializer``.
+
+    Only the item being decoded is held in memory, so arbitrarily large files
+    can be read in bounded memory.
+    """
+    if f.peek(len(ZSTD_MAGIC)).startswith(ZSTD_MAGIC):
+        _require(zstandard, "zstandard", "zstd")
+        f = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(f))
+    if f.peek(1).lstrip()[:1] in (b"[", b"{", b""):
+        yield from _iter_json_array(io.TextIOWrapper(f, encoding="utf-8"), chunk_size)
+        return
+    _require(msgpack, "msgpack", "msgpack")
+    unpacker = msgpack.Unpacker(f, raw=False, strict_map_key=False)
+    for _ in range(unpacker.read_array_header()):
+        yield unpacker.unpack()
+
+
+def split_extension(filename: str) -> Tuple[str, str]:
+    for ext in STORE_EXTENSIONS:
+        if filename.endswith(ext):
+            return filename[: -len(ext)], ext
+    return filename, ""
+
+
+def _iter_json_array(f: io.TextIOBase, chunk_size: int) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+
+    def skip(chars: str) -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf):
+                return True
+            if eof:
+                return False
+            fill()
+
+    if not skip(" \t\r\n"):
+        return
+    if buf[pos] != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    while True:
+        if not skip(" \t\r\n,"):
+            raise ValueError("Unterminated JSON array")
+        if buf[pos] == "]":
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # A number may continue in the next chunk
+                if end < len(buf) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+        pos = end
+        yield item
+
+
+def _json_loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode("utf-8"))
+
+
+def _require(module: Any, name: str, extra: str):
+    if module is None:
+        raise RuntimeError(
+            f"The '{name}' package is required for this storage format;"
+            f" install it with the '{extra}' extra"
+        )
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehind:
+    """Runs blocking writes on a worker thread, in submission order.
+
+    At most ``max_pending`` writes wait in the queue; ``submit`` blocks once
+    it is full, so a fast producer is slowed to disk speed instead of
+    buffering without bound. After a write fails the rest are skipped and the
+    error is raised from the next ``submit`` or from ``drain``.
+    """
+
+    def __init__(self, max_pending: int = 8):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._worker: Optional[asyncio.Task] = None
+        self._error: Optional[Exception] = None
+
+    async def __aenter__(self) -> "WriteBehind":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            # Persist what was already fetched even when fetching failed
+            await self.close()
+        except Exception as e:
+            if exc is None:
+                raise
+            logger.error("Failed to write pending pages: %s", e)
+
+    async def submit(self, write: Callable[[], Any]):
+        self._raise_error()
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        await self._queue.put(write)
+
+    async def drain(self):
+        if self._worker is not None:
+            await self._queue.join()
+        self._raise_error()
+
+    async def close(self):
+        try:
+            await self.drain()
+        finally:
+            if self._worker is not None:
+                self._worker.cancel()
+                self._worker = None
+
+    async def _run(self):
+        while True:
+            write = await self._queue.get()
+            try:
+                if self._error is None:
+                    await asyncio.to_thread(write)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError(self._error)
@@ -1,8 +1,10 @@
 import logging
 import os
+from types import SimpleNamespace
 import pytest
 
 from dropspy.config import LOGGER_PREFIX
+from dropspy.telegram.types import PagingCheckpoint, RawMessage
 from dropspy.utils.logging import cleanup_logging, setup_logging
 
 TEST_LOGGER = LOGGER_PREFIX + ".tests"
@@ -17,3 +19,75 @@ def configure_logging_for_tests():
     yield
     cleanup_logging()
     logger.info("Cleaned up logging for tests")
+
+
+def _make_message(channel_id, id, time="2025-01-01T00:00:00+00:00"):
+    return RawMessage(
+        id=id,
+        channel_id=channel_id,
+        channel_handle=f"@chan{channel_id}",
+        time=time,
+        text=f"message {id}",
+    )
+
+
+class _PagedAdapter:
+    def __init__(self, pages, fail_after=None):
+        self.pages = pages
+        self.fail_after = fail_after
+
+    async def stream_messages(
+        self,
+        channel_handles,
+        last_fetch,
+        on_page,
+        cursors,
+        until=None,
+        checkpoints=None,
+    ):
+        checkpoints = checkpoints or {}
+        for i, (channel_id, messages) in enumerate(self.pages):
+            checkpoint = checkpoints.get(channel_id)
+            if checkpoint and (
+                checkpoint.done or messages[0].id >= checkpoint.offset_id
+            ):
+                continue
+            cursor = cursors.get(channel_id)
+            messages = [
+                m for m in messages if not cursor or m.id > cursor.last_message_id
+            ]
+            if i == self.fail_after:
+                raise ConnectionError("connection lost")
+            done = all(other != channel_id for other, _ in self.pages[i + 1 :])
+            await on_page(
+                SimpleNamespace(id=channel_id),
+                messages,
+                PagingCheckpoint(channel_id, messages[-1].id if messages else 0, done),
+            )
+
+
+def _make_pages():
+    def at(minute):
+        return f"2025-01-01T00:{minute:02d}:00+00:00"
+
+    # Each channel is paged newest first, and the channels interleave
+    return [
+        (1, [_make_message(1, 4, at(40)), _make_message(1, 3, at(30))]),
+        (2, [_make_message(2, 9, at(35)), _make_message(2, 8, at(5))]),
+        (1, [_make_message(1, 2, at(20)), _make_message(1, 1, at(10))]),
+    ]
+
+
+@pytest.fixture
+def make_message():
+    return _make_message
+
+
+@pytest.fixture
+def make_pages():
+    return _make_pages
+
+
+@pytest.fixture
+def paged_adapter():
+    return _PagedAdapter
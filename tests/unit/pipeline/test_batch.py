@@ -146,3 +146,29 @@ def test_run_creates_files(batch_pipeline, tmp_path):
             if msg["text"] in content:
                 assert True
     assert len(batch_files) == 3
+
+
+def test_run_accepts_a_stream_and_leaves_no_parts(batch_pipeline, tmp_path):
+    messages = ({"channel": "@c", "text": f"message {i}"} for i in range(5))
+
+    batch_files = batch_pipeline.run(
+        max_tokens_per_batch=16,
+        input_filename="window.ndjson",
+        prebatched_messages=messages,
+    )
+
+    assert [Path(f).name for f in batch_files] == [f"{i}of5.json" for i in range(1, 6)]
+    assert sorted(p.name for p in (tmp_path / "window").iterdir()) == sorted(
+        Path(f).name for f in batch_files
+    )
+
+
+def test_batches_carry_and_count_the_normalized_text():
+    messages = [
+        {"id": i, "text": "x" * 200, "normalized_text": "short"} for i in range(3)
+    ]
+    batcher = _BatchSplitter(tokenizer=DummyTokenizer())
+
+    batches = batcher.split(max_tokens_per_batch=30, messages=messages)
+
+    assert batches == [[{"id": i, "text": "short"} for i in range(3)]]
@@ -0,0 +1,144 @@
+from datetime import datetime, timezone
+import pytest
+from dropspy.pipeline.compaction import apply_retention, compact_fetches
+from dropspy.pipeline.fetch import FetchStore
+from dropspy.utils.ndjson import TIME_INDEX_SUFFIX
+
+DAY1 = "2025-01-01T00:00:00+00:00~2025-01-02T00:00:00+00:00.ndjson"
+DAY2 = "2025-01-02T00:00:00+00:00~2025-01-03T00:00:00+00:00.ndjson"
+
+
+def at(day, hour, minute=0):
+    return datetime(2025, 1, day, hour, minute, tzinfo=timezone.utc)
+
+
+def save_window(store, start, end, messages):
+    return store.save_messages(f"{start.isoformat()}~{end.isoformat()}.json", messages)
+
+
+@pytest.fixture
+def fetch_store(tmp_path, make_message):
+    store = FetchStore(str(tmp_path))
+    save_window(
+        store,
+        at(1, 0),
+        at(1, 12),
+        [
+            make_message(1, 1, at(1, 3).isoformat()),
+            make_message(2, 1, at(1, 11).isoformat()),
+        ],
+    )
+    # Overlaps the first window and ends exactly at midnight
+    save_window(
+        store,
+        at(1, 11),
+        at(2, 0),
+        [
+            make_message(2, 1, at(1, 11).isoformat()),
+            make_message(1, 2, at(2, 0).isoformat()),
+        ],
+    )
+    save_window(store, at(2, 0), at(2, 6), [make_message(1, 3, at(2, 5).isoformat())])
+    save_window(
+        store, at(2, 6), at(3, 1), [make_message(1, 4, at(3, 0, 30).isoformat())]
+    )
+    return store
+
+
+def test_compact_merges_past_files_into_daily_segments(fetch_store, tmp_path):
+    segments = compact_fetches(fetch_store, before=at(3, 0, 45))
+
+    assert segments == [DAY1, DAY2]
+    late = "2025-01-02T06:00:00+00:00~2025-01-03T01:00:00+00:00.json"
+    assert fetch_store.get_filenames() == [DAY1, DAY2, late]
+    assert [
+        (m.channel_id, m.id) for m in fetch_store.load_messages_by_filename(DAY1)
+    ] == [(1, 1), (2, 1), (1, 2)]
+    assert fetch_store.manifest.get(DAY1).count == 3
+    assert (tmp_path / (DAY1 + TIME_INDEX_SUFFIX)).exists()
+    assert [m.id for m in fetch_store.iter_messages_between(at(1, 10), at(2, 23))] == [
+        1,
+        2,
+        3,
+    ]
+
+
+def test_late_files_merge_into_existing_segment(fetch_store, make_message):
+    compact_fetches(fetch_store, before=at(3, 0))
+    apply_retention(fetch_store, now=at(9, 0), compress_after_days=3)
+    save_window(
+        fetch_store,
+        at(1, 20),
+        at(1, 21),
+        [make_message(3, 1, at(1, 20, 30).isoformat())],
+    )
+
+    compact_fetches(fetch_store, before=at(3, 0))
+
+    assert DAY1 + ".gz" not in fetch_store.get_filenames()
+    assert [m.channel_id for m in fetch_store.load_messages_by_filename(DAY1)] == [
+        1,
+        2,
+        3,
+        1,
+    ]
+
+
+def test_retention_compresses_then_drops_segments(fetch_store, tmp_path):
+    compact_fetches(fetch_store, before=at(3, 0))
+
+    counts = apply_retention(
+        fetch_store, now=at(5, 12), compress_after_days=3, drop_after_days=3
+    )
+    assert counts == {"compressed": 0, "dropped": 1}
+    counts = apply_retention(fetch_store, now=at(5, 12), compress_after_days=2)
+
+    assert counts == {"compressed": 1, "dropped": 0}
+    assert fetch_store.get_filenames()[0] == DAY2 + ".gz"
+    assert [m.id for m in fetch_store.load_messages_by_filename(DAY2 + ".gz")] == [3]
+    assert not (tmp_path / DAY1).exists()
+
+
+def test_legacy_newest_first_files_compact_into_ordered_segments(tmp_path):
+    store = FetchStore(str(tmp_path))
+    # Written before merged fetching: one newest-first block per channel
+    times = {1: [at(2, 5), at(1, 20), at(1, 2)], 2: [at(2, 1), at(1, 8)]}
+    store.save_messages(
+        f"{at(1, 0).isoformat()}~{at(3, 0).isoformat()}.json",
+        [
+            {
+                "id": i,
+                "channel_id": channel_id,
+                "channel_handle": f"@chan{channel_id}",
+                "time": time.isoformat(),
+                "text": f"message {i}",
+            }
+            for channel_id, channel_times in times.items()
+            for i, time in enumerate(channel_times)
+        ],
+    )
+
+    segments = compact_fetches(store, before=at(3, 12))
+
+    assert segments == [DAY1, DAY2]
+    assert [
+        m.time for name in segments for m in store.load_messages_by_filename(name)
+    ] == [t.isoformat() for t in (at(1, 2), at(1, 8), at(1, 20), at(2, 1), at(2, 5))]
+    assert [m.id for m in store.iter_messages_between(at(2, 0), at(2, 3))] == [0]
+
+
+def test_segments_are_told_apart_by_the_manifest_not_the_name(tmp_path, make_message):
+    store = FetchStore(str(tmp_path))
+    # A streamed fetch that happens to span exactly one UTC day
+    stream = store.open_stream(at(1, 0), at(2, 0))
+    stream.write_page(1, [make_message(1, 1, at(1, 3).isoformat())])
+    stream.finalize()
+
+    assert apply_retention(store, now=at(9, 0), drop_after_days=3)["dropped"] == 0
+    assert compact_fetches(store, before=at(3, 0)) == [DAY1]
+    assert store.get_filenames() == [DAY1]
+    assert [m.id for m in store.load_messages_by_filename(DAY1)] == [1]
+
+    store.rebuild_manifest()
+    assert store.manifest.get(DAY1).segment
+    assert apply_retention(store, now=at(9, 0), drop_after_days=3)["dropped"] == 1
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from dropspy.pipeline.export import export_records, read_messages
+
+
+def make_records():
+    return [
+        {
+            "id": i,
+            "channel_id": i % 2,
+            "channel_handle": f"@chan{i % 2}",
+            "time": f"2025-01-0{1 + i // 4}T0{i % 4}:00:00+00:00",
+            "text": f"message {i}",
+            "dup_count": 1,
+        }
+        for i in range(8)
+    ]
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_export_partitions_by_day_and_channel(tmp_path, format):
+    assert export_records(make_records(), str(tmp_path), format, batch_size=3) == 8
+
+    partitions = sorted(
+        str(p.parent.relative_to(tmp_path)) for p in tmp_path.rglob("part-*")
+    )
+    assert partitions == [
+        "day=2025-01-01/channel_id=0",
+        "day=2025-01-01/channel_id=1",
+        "day=2025-01-02/channel_id=0",
+        "day=2025-01-02/channel_id=1",
+    ]
+    table = read_messages(str(tmp_path), format=format)
+    assert sorted(table.column("id").to_pylist()) == list(range(8))
+    assert str(table.schema.field("channel_handle").type).startswith("dictionary")
+
+
+def test_read_messages_filters_time_and_channel(tmp_path):
+    export_records(make_records(), str(tmp_path))
+
+    table = read_messages(
+        str(tmp_path),
+        start=datetime(2025, 1, 1, 1, tzinfo=timezone.utc),
+        end=datetime(2025, 1, 2, 2, tzinfo=timezone.utc),
+        channel_ids=[1],
+        columns=["id", "text"],
+    )
+
+    assert sorted(table.column("id").to_pylist()) == [3, 5]
+    assert table.column_names == ["id", "text"]
+
+
+def test_export_replaces_partitions_on_rerun(tmp_path):
+    export_records(make_records(), str(tmp_path))
+    export_records(make_records()[:4], str(tmp_path))
+
+    assert read_messages(str(tmp_path)).num_rows == 8
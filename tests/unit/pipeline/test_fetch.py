@@ -0,0 +1,258 @@
+from datetime import datetime, timezone
+import multiprocessing
+from pathlib import Path
+import pytest
+from dropspy.pipeline.fetch import (
+    FetchStore,
+    _advance_cursors,
+    _make_messages_filename,
+    run_fetch_pipeline,
+)
+from dropspy.telegram.types import ChannelCursor, PagingCheckpoint
+
+
+@pytest.fixture
+def fetch_store(tmp_path):
+    return FetchStore(str(tmp_path))
+
+
+def test_channel_cursors_round_trip(fetch_store):
+    end = datetime(2025, 1, 2, tzinfo=timezone.utc)
+    cursors = {1: ChannelCursor(1, 42, "2025-01-01T12:00:00+00:00")}
+    fetch_store.save_last_fetch_times(end, cursors)
+
+    assert fetch_store.load_last_fetch_times() == end
+    assert fetch_store.load_channel_cursors() == cursors
+
+
+def test_save_last_fetch_times_keeps_existing_cursors(fetch_store):
+    cursors = {1: ChannelCursor(1, 42, "2025-01-01T12:00:00+00:00")}
+    fetch_store.save_last_fetch_times(
+        datetime(2025, 1, 2, tzinfo=timezone.utc), cursors
+    )
+    fetch_store.save_last_fetch_times(datetime(2025, 1, 3, tzinfo=timezone.utc))
+
+    assert fetch_store.load_channel_cursors() == cursors
+
+
+def test_legacy_last_fetch_file_has_no_cursors(fetch_store):
+    fetch_store._save(
+        fetch_store.last_fetch_data_filename,
+        {"last_fetch": "2025-01-01T00:00:00+00:00"},
+    )
+    assert fetch_store.load_channel_cursors() == {}
+
+
+def test_fetch_state_survives_a_torn_snapshot(fetch_store, tmp_path):
+    for day in (2, 3):
+        fetch_store.save_last_fetch_times(
+            datetime(2025, 1, day, tzinfo=timezone.utc),
+            {1: ChannelCursor(1, day, f"2025-01-0{day}T00:00:00+00:00")},
+        )
+    (tmp_path / "last_fetch.json").write_text('{"last_fe', encoding="utf-8")
+    # A crash mid-append leaves a partial last line
+    with open(tmp_path / "last_fetch.journal", "a", encoding="utf-8") as f:
+        f.write('{"last_fetch": "2025-01-0')
+
+    assert fetch_store.load_last_fetch_times() == datetime(
+        2025, 1, 3, tzinfo=timezone.utc
+    )
+    assert fetch_store.load_channel_cursors()[1].last_message_id == 3
+
+
+def test_unrecoverable_fetch_state_is_an_error(fetch_store, tmp_path):
+    (tmp_path / "last_fetch.json").write_text('{"last_fe', encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        fetch_store.load_last_fetch_times()
+
+
+def test_journal_is_checkpointed_into_the_snapshot(fetch_store, tmp_path):
+    fetch_store.checkpoint_every = 3
+    for i in range(1, 7):
+        fetch_store.save_last_fetch_times(
+            datetime(2025, 1, i, tzinfo=timezone.utc),
+            {i: ChannelCursor(i, i, f"2025-01-0{i}T00:00:00+00:00")},
+        )
+
+    journal = (tmp_path / "last_fetch.journal").read_text().splitlines()
+    assert len(journal) == 2
+    snapshot = fetch_store._read(fetch_store.last_fetch_data_filename)
+    assert len(snapshot["channels"]) == 5
+    assert len(fetch_store.load_channel_cursors()) == 6
+
+
+def _save_cursors(data_dir, channel_ids):
+    fetch_store = FetchStore(data_dir)
+    fetch_store.checkpoint_every = 3
+    for channel_id in channel_ids:
+        fetch_store.save_last_fetch_times(
+            datetime(2025, 1, 1, tzinfo=timezone.utc),
+            {channel_id: ChannelCursor(channel_id, 1, "2025-01-01T00:00:00+00:00")},
+        )
+
+
+def test_processes_sharing_the_fetch_state_lose_no_updates(tmp_path):
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=_save_cursors, args=(str(tmp_path), range(i, 200, 2)))
+        for i in range(2)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert sorted(FetchStore(str(tmp_path)).load_channel_cursors()) == list(range(200))
+
+
+def test_advance_cursors_keeps_highest_id_per_channel(make_message):
+    cursors = {1: ChannelCursor(1, 10, "2025-01-01T00:00:00+00:00")}
+    messages = [make_message(1, 5), make_message(1, 12), make_message(2, 3)]
+
+    advanced = _advance_cursors(cursors, messages)
+
+    assert advanced[1].last_message_id == 12
+    assert advanced[2].last_message_id == 3
+    assert cursors[1].last_message_id == 10
+
+
+@pytest.mark.asyncio
+async def test_run_fetch_pipeline_streaming(fetch_store, make_pages, paged_adapter):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2025, 1, 2, tzinfo=timezone.utc)
+
+    path = await run_fetch_pipeline(
+        fetch_store=fetch_store,
+        telegram_api_adapter=paged_adapter(make_pages()),
+        channel_handles=["@chan1", "@chan2"],
+        start=start,
+        end=end,
+        streaming=True,
+    )
+
+    assert path.endswith(".ndjson")
+    messages = fetch_store.load_messages_by_filename(Path(path).name)
+    assert [(m.channel_id, m.id) for m in messages] == [
+        (2, 8),
+        (1, 1),
+        (1, 2),
+        (1, 3),
+        (2, 9),
+        (1, 4),
+    ]
+    assert fetch_store.load_channel_cursors()[1].last_message_id == 4
+    assert fetch_store.get_filenames() == [Path(path).name]
+
+
+@pytest.mark.asyncio
+async def test_run_fetch_pipeline_in_memory(
+    fetch_store, make_message, make_pages, paged_adapter
+):
+    path = await run_fetch_pipeline(
+        fetch_store=fetch_store,
+        telegram_api_adapter=paged_adapter(make_pages()),
+        channel_handles=["@chan1", "@chan2"],
+        start=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        end=datetime(2025, 1, 2, tzinfo=timezone.utc),
+    )
+
+    assert path.endswith(".json")
+    messages = fetch_store.load_messages_by_filename(Path(path).name)
+    assert [m.id for m in messages] == [8, 1, 2, 3, 9, 4]
+    assert messages[0] == make_message(2, 8, "2025-01-01T00:05:00+00:00")
+    assert fetch_store.load_channel_cursors()[2].last_message_id == 9
+
+
+@pytest.mark.asyncio
+async def test_interrupted_stream_is_resumed(fetch_store, make_pages, paged_adapter):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    first_end = datetime(2025, 1, 2, tzinfo=timezone.utc)
+    with pytest.raises(RuntimeError):
+        await run_fetch_pipeline(
+            fetch_store=fetch_store,
+            telegram_api_adapter=paged_adapter(make_pages(), fail_after=2),
+            channel_handles=["@chan1", "@chan2"],
+            start=start,
+            end=first_end,
+            streaming=True,
+        )
+    assert fetch_store.get_filenames() == []
+    assert fetch_store.load_channel_cursors() == {}
+    (pending,) = fetch_store.pending_streams()
+    assert pending.checkpoints[1] == PagingCheckpoint(1, 3, False)
+    assert pending.checkpoints[2].done
+
+    await run_fetch_pipeline(
+        fetch_store=fetch_store,
+        telegram_api_adapter=paged_adapter(make_pages()),
+        channel_handles=["@chan1", "@chan2"],
+        start=start,
+        end=datetime(2025, 1, 3, tzinfo=timezone.utc),
+        streaming=True,
+    )
+
+    resumed, latest = fetch_store.get_filenames()
+    assert resumed.endswith(f"~{first_end.isoformat()}.ndjson")
+    messages = fetch_store.load_messages_by_filename(resumed)
+    assert sorted(m.id for m in messages) == [1, 2, 3, 4, 8, 9]
+    assert fetch_store.load_messages_by_filename(latest) == []
+    assert fetch_store.pending_streams() == []
+
+
+def test_resumed_stream_drops_pages_written_after_the_last_checkpoint(
+    fetch_store, make_pages
+):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2025, 1, 2, tzinfo=timezone.utc)
+    (_, first), (_, second), _ = make_pages()
+    stream = fetch_store.open_stream(start, end)
+    stream.write_page(1, first, PagingCheckpoint(1, 3, False))
+    # A crash after appending a page but before checkpointing it
+    stream.write_page(2, second)
+
+    (resumed,) = fetch_store.pending_streams()
+    resumed.write_page(2, second, PagingCheckpoint(2, 8, True))
+    path = resumed.finalize()
+
+    messages = fetch_store.load_messages_by_filename(Path(path).name)
+    assert [m.id for m in messages] == [8, 3, 9, 4]
+
+
+@pytest.mark.asyncio
+async def test_resuming_up_to_the_same_end_opens_no_new_window(
+    fetch_store, make_pages, paged_adapter
+):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2025, 1, 2, tzinfo=timezone.utc)
+    run = dict(
+        fetch_store=fetch_store,
+        channel_handles=["@chan1", "@chan2"],
+        start=start,
+        end=end,
+        streaming=True,
+    )
+    with pytest.raises(RuntimeError):
+        await run_fetch_pipeline(
+            telegram_api_adapter=paged_adapter(make_pages(), fail_after=2), **run
+        )
+
+    path = await run_fetch_pipeline(
+        telegram_api_adapter=paged_adapter(make_pages()), **run
+    )
+
+    assert fetch_store.get_filenames() == [Path(path).name]
+    assert len(fetch_store.load_messages_by_filename(Path(path).name)) == 6
+
+
+@pytest.mark.asyncio
+async def test_async_save_and_load_messages(fetch_store, make_message):
+    messages = [make_message(1, 1, "2025-01-01T00:10:00+00:00")]
+    filename = _make_messages_filename(
+        "2025-01-01T00:00:00+00:00", "2025-01-02T00:00:00+00:00"
+    )
+
+    path = await fetch_store.asave_messages(filename, messages)
+
+    assert await fetch_store.aload_messages_by_filename(Path(path).name) == messages
+    assert fetch_store.manifest.get(Path(path).name).count == 1
@@ -0,0 +1,57 @@
+import pytest
+from dropspy.pipeline.normalize import TextNormalizer, load_footer_patterns
+
+
+@pytest.mark.parametrize(
+    "rules, text, expected",
+    [
+        (["zero_width"], "air\u200bdrop\u00ad!", "airdrop!"),
+        (
+            ["urls"],
+            "see https://x.io/a/b?ref=1#top and www.y.com?utm=2",
+            "see x.io/a/b and y.com",
+        ),
+        (["emoji"], "gm 🚀🚀 🚀🔥 fam ❤️❤️", "gm 🚀 fam ❤️"),
+        (["whitespace"], "  a \t b\n\n\n\n c  ", "a b\n\nc"),
+    ],
+)
+def test_each_rule(rules, text, expected):
+    assert TextNormalizer(rules).normalize(text) == expected
+
+
+def test_footers_are_dropped_line_by_line():
+    normalizer = TextNormalizer(["footers"], [r"^follow us", r"t\.me/\w+$"])
+
+    text = "New pool live\nFollow us on X\nchannel: t.me/drops"
+
+    assert normalizer.normalize(text) == "New pool live"
+
+
+def test_unknown_rule_is_rejected():
+    with pytest.raises(ValueError):
+        TextNormalizer(["lowercase"])
+
+
+def test_settings_change_with_rules_and_footers():
+    assert TextNormalizer().settings == TextNormalizer().settings
+    assert TextNormalizer().settings != TextNormalizer(["urls"]).settings
+    assert TextNormalizer().settings != TextNormalizer(footer_patterns=["x"]).settings
+
+
+def test_normalize_records_keeps_the_original_text():
+    records = [{"id": 1, "text": "a  b"}, {"id": 2, "text": "a  b"}]
+
+    result = list(TextNormalizer().normalize_records(iter(records), chunk_size=1))
+
+    assert result == [
+        {"id": 1, "text": "a  b", "normalized_text": "a b"},
+        {"id": 2, "text": "a  b", "normalized_text": "a b"},
+    ]
+    assert "normalized_text" not in records[0]
+
+
+def test_load_footer_patterns(tmp_path):
+    path = tmp_path / "footers.txt"
+    path.write_text("# promo lines\n^join us\n\n  \nsubscribe$\n", encoding="utf-8")
+
+    assert load_footer_patterns(str(path)) == ["^join us", "subscribe$"]
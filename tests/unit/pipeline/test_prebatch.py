@@ -1,7 +1,9 @@
 import pytest
 import json
 from pathlib import Path
-from dropspy.pipeline.prebatch import PrebatchPipeline
+from dropspy.pipeline.normalize import TextNormalizer
+from dropspy.pipeline.prebatch import PrebatchPipeline, Prebatcher
+from dropspy.utils.seen_index import SeenIndex
 
 
 @pytest.fixture
@@ -41,3 +43,108 @@ def test_prebatch_pipeline_no_duplicates(tmp_path):
     assert len(result) == 2
     for msg in result:
         assert msg["dup_count"] == 1
+
+
+def test_prebatch_pipeline_reads_a_stream_once(tmp_path, test_messages):
+    pipeline = PrebatchPipeline(str(tmp_path / "out"))
+    out_path = pipeline.run_prebatch_pipeline(
+        str(tmp_path / "input.json"), (msg for msg in test_messages)
+    )
+
+    with open(out_path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    assert [(m["channel"], m["dup_count"]) for m in result] == [("a", 2), ("c", 1)]
+
+
+def test_near_duplicate_reposts_collapse_into_one(tmp_path):
+    announcement = (
+        "Huge AIRDROP for early users! Join now and claim 500 XYZ tokens "
+        "before the snapshot on Friday. Link: https://example.com/ref?code="
+    )
+    messages = [
+        {"channel_handle": "@a", "text": announcement + "abc123"},
+        {"channel_handle": "@b", "text": "BTC is up 3% today, ETH is flat"},
+        {"channel_handle": "@c", "text": announcement + "zz9988  🔥🔥"},
+        {"channel_handle": "@a", "text": announcement + "abc123"},
+    ]
+    pipeline = PrebatchPipeline(
+        str(tmp_path / "out"), prebatcher=Prebatcher(mode="near")
+    )
+
+    out_path = pipeline.run_prebatch_pipeline(str(tmp_path / "input.json"), messages)
+
+    with open(out_path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    assert [(m["text"], m["dup_count"], m["channels"]) for m in result] == [
+        (announcement + "abc123", 3, ["@a", "@c"]),
+        ("BTC is up 3% today, ETH is flat", 1, ["@b"]),
+    ]
+
+
+def test_changing_dedup_mode_redoes_prebatch(tmp_path):
+    messages = [{"channel_handle": "@a", "text": "x"}]
+    exact = PrebatchPipeline(str(tmp_path / "out"))
+    out_path = exact.run_prebatch_pipeline("input.json", messages, "hash")
+    near = PrebatchPipeline(str(tmp_path / "out"), prebatcher=Prebatcher("near"))
+
+    near.run_prebatch_pipeline("input.json", messages, "hash")
+
+    with open(out_path, "r", encoding="utf-8") as f:
+        assert json.load(f)[0]["channels"] == ["@a"]
+
+
+@pytest.mark.parametrize("policy", ["drop", "mark"])
+def test_messages_prebatched_from_earlier_windows(tmp_path, policy):
+    seen_index = SeenIndex(str(tmp_path / "seen"))
+    pipeline = PrebatchPipeline(
+        str(tmp_path / "out"), seen_index=seen_index, seen_policy=policy
+    )
+    pipeline.run_prebatch_pipeline("day1.json", [{"text": "daily repost"}])
+
+    out_path = pipeline.run_prebatch_pipeline(
+        "day2.json", [{"text": "daily repost"}, {"text": "news"}]
+    )
+
+    with open(out_path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    if policy == "drop":
+        assert [m["text"] for m in result] == ["news"]
+    else:
+        assert [(m["text"], m.get("seen_before")) for m in result] == [
+            ("news", None),
+            ("daily repost", True),
+        ]
+    seen_index.close()
+
+
+def test_prebatch_consumes_a_one_shot_iterator_without_touching_input():
+    messages = [{"text": "same"}, {"text": "other"}, {"text": "same"}]
+
+    result = Prebatcher().prebatch(iter(messages))
+
+    assert result == [
+        {"text": "same", "dup_count": 2},
+        {"text": "other", "dup_count": 1},
+    ]
+    assert "dup_count" not in messages[0]
+
+
+def test_normalized_variants_dedup_and_keep_the_original_text(tmp_path):
+    normalizer = TextNormalizer(footer_patterns=[r"^join us:"])
+    pipeline = PrebatchPipeline(str(tmp_path / "out"), normalizer=normalizer)
+    messages = [
+        {"text": "Claim at https://example.com/claim?ref=abc 🔥🔥🔥"},
+        {"text": "Claim at  https://example.com/claim?ref=xyz 🔥\nJoin us: t.me/x"},
+    ]
+
+    out_path = pipeline.run_prebatch_pipeline("input.json", messages)
+
+    with open(out_path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    assert result == [
+        {
+            "text": "Claim at https://example.com/claim?ref=abc 🔥🔥🔥",
+            "normalized_text": "Claim at example.com/claim 🔥",
+            "dup_count": 2,
+        }
+    ]
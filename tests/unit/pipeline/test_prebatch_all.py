@@ -0,0 +1,158 @@
+from concurrent.futures import Future
+from functools import partial
+import json
+import pytest
+from dropspy.pipeline import prebatch_all as prebatch_all_module
+from dropspy.pipeline.fetch import FetchStore
+from dropspy.pipeline.prebatch import PrebatchPipeline
+from dropspy.pipeline.prebatch_all import run_prebatch_all
+from dropspy.telegram.types import RawMessage
+from dropspy.utils.seen_index import SeenIndex
+
+
+def make_stores(root, seen_policy=None):
+    seen_index = SeenIndex(str(root / "seen")) if seen_policy else None
+    return FetchStore(str(root / "fetches")), PrebatchPipeline(
+        str(root / "prebatches"),
+        seen_index=seen_index,
+        seen_policy=seen_policy or "drop",
+    )
+
+
+def save_fetches(fetch_store, texts_per_file):
+    filenames = []
+    for day, texts in enumerate(texts_per_file, start=1):
+        filename = f"2025-01-{day:02d}T00:00:00~2025-01-{day + 1:02d}T00:00:00.json"
+        messages = [
+            RawMessage(
+                id=i,
+                channel_id=1,
+                channel_handle="@a",
+                time=f"2025-01-{day:02d}T12:00:00+00:00",
+                text=text,
+            )
+            for i, text in enumerate(texts)
+        ]
+        fetch_store.save_messages(filename, messages)
+        filenames.append(filename)
+    return filenames
+
+
+def read_texts(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [(m["text"], m["dup_count"]) for m in json.load(f)]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_prebatches_every_file_and_skips_up_to_date_ones(tmp_path, workers):
+    fetch_store, pipeline = make_stores(tmp_path)
+    filenames = save_fetches(fetch_store, [["a", "a", "b"], ["c"], ["d", "d"]])
+    progress = []
+
+    statuses = run_prebatch_all(
+        fetch_store,
+        pipeline,
+        filenames,
+        make_stores=partial(make_stores, tmp_path),
+        workers=workers,
+        on_progress=lambda *args: progress.append(args),
+    )
+
+    assert statuses == dict.fromkeys(filenames, "saved")
+    assert [(done, total) for done, total, _, _ in progress] == [
+        (1, 3),
+        (2, 3),
+        (3, 3),
+    ]
+    prebatch_dir = tmp_path / "prebatches"
+    assert read_texts(prebatch_dir / filenames[0]) == [("a", 2), ("b", 1)]
+    assert read_texts(prebatch_dir / filenames[2]) == [("d", 2)]
+    assert len(pipeline.prebatchStore.get_filenames()) == 3
+
+    save_fetches(fetch_store, [["a", "a", "b"], ["changed"]])
+    statuses = run_prebatch_all(
+        fetch_store,
+        pipeline,
+        filenames,
+        make_stores=partial(make_stores, tmp_path),
+        workers=workers,
+    )
+
+    assert statuses == {
+        filenames[0]: "skipped",
+        filenames[1]: "saved",
+        filenames[2]: "skipped",
+    }
+    assert read_texts(prebatch_dir / filenames[1]) == [("changed", 1)]
+
+
+class InlineExecutor:
+    """Runs submitted work right away and counts the submissions."""
+
+    submitted = 0
+
+    def __init__(self, max_workers, initializer, initargs):
+        initializer(*initargs)
+
+    def submit(self, fn, *args):
+        InlineExecutor.submitted += 1
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, cancel_futures=False):
+        pass
+
+
+def test_keeps_about_two_files_per_worker_in_flight(tmp_path, monkeypatch):
+    monkeypatch.setattr(prebatch_all_module, "ProcessPoolExecutor", InlineExecutor)
+    monkeypatch.setattr(InlineExecutor, "submitted", 0)
+    fetch_store, pipeline = make_stores(tmp_path)
+    filenames = save_fetches(fetch_store, [[str(i)] for i in range(10)])
+    in_flight = []
+
+    statuses = run_prebatch_all(
+        fetch_store,
+        pipeline,
+        filenames,
+        make_stores=partial(make_stores, tmp_path),
+        workers=2,
+        on_progress=lambda done, *_: in_flight.append(InlineExecutor.submitted - done),
+    )
+
+    assert statuses == dict.fromkeys(filenames, "saved")
+    assert max(in_flight) == 3
+    assert InlineExecutor.submitted == 10
+
+
+def test_seen_index_follows_file_order_with_workers(tmp_path):
+    fetch_store, pipeline = make_stores(tmp_path, seen_policy="drop")
+    filenames = save_fetches(fetch_store, [["repost", "x"], ["repost", "y"]])
+
+    run_prebatch_all(
+        fetch_store,
+        pipeline,
+        filenames,
+        make_stores=partial(make_stores, tmp_path, "drop"),
+        workers=2,
+    )
+
+    prebatch_dir = tmp_path / "prebatches"
+    assert read_texts(prebatch_dir / filenames[0]) == [("repost", 1), ("x", 1)]
+    assert read_texts(prebatch_dir / filenames[1]) == [("y", 1)]
+    pipeline.seen_index.close()
+
+
+def test_a_failed_file_does_not_stop_the_rest(tmp_path):
+    fetch_store, pipeline = make_stores(tmp_path)
+    filenames = save_fetches(fetch_store, [["a"], ["b"]])
+    (tmp_path / "fetches" / filenames[0]).write_text("{not json", encoding="utf-8")
+
+    statuses = run_prebatch_all(
+        fetch_store,
+        pipeline,
+        filenames,
+        make_stores=partial(make_stores, tmp_path),
+    )
+
+    assert statuses == {filenames[0]: "failed", filenames[1]: "saved"}
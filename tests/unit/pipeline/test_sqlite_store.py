@@ -0,0 +1,138 @@
+from datetime import datetime, timezone
+import pytest
+from dropspy.pipeline.fetch import FetchStore, run_fetch_pipeline
+from dropspy.pipeline.sqlite_store import SQLiteFetchStore
+from dropspy.telegram.message_batch import MessageBatch
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+END = datetime(2025, 1, 2, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = SQLiteFetchStore(str(tmp_path))
+    yield store
+    store.close()
+
+
+def test_save_upserts_on_channel_and_id(sqlite_store, make_message):
+    window = f"{START.isoformat()}~{END.isoformat()}.json"
+    sqlite_store.save_messages(
+        window, [make_message(1, 1, "2025-01-01T01:00:00+00:00")]
+    )
+    edited = make_message(1, 1, "2025-01-01T01:00:00+00:00")
+    edited.text = "edited"
+
+    name = sqlite_store.save_messages(window, MessageBatch.from_messages([edited]))
+
+    assert sqlite_store.count_messages() == 1
+    assert sqlite_store.get_filenames() == [name]
+    assert sqlite_store.load_messages_by_filename(name) == [edited]
+    assert sqlite_store.find_by_text("edited") == [edited]
+    assert sqlite_store.find_by_text("message 1") == []
+
+
+def test_window_content_hash_follows_its_messages(sqlite_store, make_message):
+    window = f"{START.isoformat()}~{END.isoformat()}.json"
+    message = make_message(1, 1, "2025-01-01T01:00:00+00:00")
+    name = sqlite_store.save_messages(window, [message])
+    original = sqlite_store.content_hash(name)
+
+    sqlite_store.save_messages(window, [message])
+    assert sqlite_store.content_hash(name) == original
+
+    message.text = "edited"
+    sqlite_store.save_messages(window, [message])
+    edited = sqlite_store.content_hash(name)
+    assert edited != original
+
+    outside = make_message(2, 1, "2025-01-03T01:00:00+00:00")
+    sqlite_store.save_messages(
+        "2025-01-02T00:00:00~2025-01-04T00:00:00.json", [outside]
+    )
+    assert sqlite_store.content_hash(name) == edited
+
+
+def test_time_range_and_channel_queries(sqlite_store, make_pages):
+    sqlite_store.save_messages(
+        f"{START.isoformat()}~{END.isoformat()}.json",
+        [message for _, page in make_pages() for message in page],
+    )
+    middle = datetime(2025, 1, 1, 0, 20, tzinfo=timezone.utc)
+
+    assert [m.id for m in sqlite_store.iter_messages_between(START, middle)] == [
+        8,
+        1,
+        2,
+    ]
+    assert [
+        m.id for m in sqlite_store.iter_messages_between(middle, END, channel_ids=[2])
+    ] == [9]
+    assert [m.id for m in sqlite_store.iter_messages_between(START, END)] == [
+        8,
+        1,
+        2,
+        3,
+        9,
+        4,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_interrupted_stream_resumes_into_archive(
+    sqlite_store, make_pages, paged_adapter
+):
+    with pytest.raises(RuntimeError):
+        await run_fetch_pipeline(
+            fetch_store=sqlite_store,
+            telegram_api_adapter=paged_adapter(make_pages(), fail_after=2),
+            channel_handles=["@chan1", "@chan2"],
+            start=START,
+            end=END,
+            streaming=True,
+        )
+    (pending,) = sqlite_store.pending_streams()
+    assert pending.checkpoints[2].done
+    assert sqlite_store.count_messages() == 4
+
+    await run_fetch_pipeline(
+        fetch_store=sqlite_store,
+        telegram_api_adapter=paged_adapter(make_pages()),
+        channel_handles=["@chan1", "@chan2"],
+        start=START,
+        end=datetime(2025, 1, 3, tzinfo=timezone.utc),
+        streaming=True,
+    )
+
+    resumed, _ = sqlite_store.get_filenames()
+    assert [m.id for m in sqlite_store.load_messages_by_filename(resumed)] == [
+        8,
+        1,
+        2,
+        3,
+        9,
+        4,
+    ]
+    assert sqlite_store.load_channel_cursors()[1].last_message_id == 4
+    assert sqlite_store.pending_streams() == []
+
+
+def test_file_store_reads_time_ranges_across_windows(
+    tmp_path, make_message, make_pages
+):
+    fetch_store = FetchStore(str(tmp_path))
+    pages = make_pages()
+    fetch_store.save_messages(
+        f"{START.isoformat()}~{END.isoformat()}.json", pages[0][1]
+    )
+    fetch_store.save_messages(
+        f"{END.isoformat()}~2025-01-03T00:00:00+00:00.json",
+        [make_message(3, 7, "2025-01-02T06:00:00+00:00")],
+    )
+
+    messages = fetch_store.iter_messages_between(
+        datetime(2025, 1, 1, 0, 35, tzinfo=timezone.utc),
+        datetime(2025, 1, 2, 12, tzinfo=timezone.utc),
+    )
+
+    assert [(m.channel_id, m.id) for m in messages] == [(1, 4), (3, 7)]
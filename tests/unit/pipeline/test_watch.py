@@ -0,0 +1,153 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from dropspy.pipeline.fetch import FetchStore
+from dropspy.pipeline.prebatch import PrebatchPipeline
+from dropspy.pipeline.watch import MessageWatcher, run_watch_pipeline
+from dropspy.telegram.types import ChannelCursor, RawMessage
+
+
+def make_message(id, channel_id=1, text=None):
+    return RawMessage(
+        id=id,
+        channel_id=channel_id,
+        channel_handle=f"@chan{channel_id}",
+        time=f"2025-01-01T00:00:{id:02d}+00:00",
+        text=text or f"message {id}",
+    )
+
+
+@pytest.fixture
+def fetch_store(tmp_path):
+    return FetchStore(str(tmp_path / "fetches"))
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_buffer_is_full(fetch_store):
+    watcher = MessageWatcher(fetch_store, flush_size=2, flush_interval=3600)
+    watcher.start()
+    await watcher.add(make_message(1))
+    assert fetch_store.get_filenames() == []
+
+    await watcher.add(make_message(2))
+    await watcher.stop()
+
+    files = fetch_store.get_filenames()
+    assert len(files) == 1
+    assert [m.id for m in fetch_store.load_messages_by_filename(files[0])] == [1, 2]
+    assert fetch_store.load_channel_cursors()[1].last_message_id == 2
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_interval(fetch_store):
+    watcher = MessageWatcher(fetch_store, flush_size=100, flush_interval=0.01)
+    watcher.start()
+    await watcher.add(make_message(1))
+    await asyncio.sleep(0.05)
+
+    assert len(fetch_store.get_filenames()) == 1
+    await watcher.stop()
+
+
+@pytest.mark.asyncio
+async def test_skips_messages_already_fetched(fetch_store):
+    fetch_store.save_last_fetch_times(
+        datetime(2025, 1, 1, tzinfo=timezone.utc),
+        {1: ChannelCursor(1, 5, "2025-01-01T00:00:05+00:00")},
+    )
+    watcher = MessageWatcher(fetch_store, flush_size=100, flush_interval=3600)
+    watcher.start()
+    await watcher.add(make_message(5))
+    await watcher.add(make_message(6))
+    await watcher.stop()
+
+    files = fetch_store.get_filenames()
+    assert [m.id for m in fetch_store.load_messages_by_filename(files[0])] == [6]
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_messages_for_the_next_one(fetch_store, monkeypatch):
+    watcher = MessageWatcher(fetch_store, flush_size=100, flush_interval=3600)
+    watcher.start()
+    await watcher.add(make_message(1))
+
+    async def fail(*args):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(fetch_store, "asave_last_fetch_times", fail)
+        with pytest.raises(OSError):
+            await watcher.flush()
+    await watcher.add(make_message(2))
+    await watcher.stop()
+
+    *_, last = fetch_store.get_filenames()
+    assert [m.id for m in fetch_store.load_messages_by_filename(last)] == [1, 2]
+    assert fetch_store.load_channel_cursors()[1].last_message_id == 2
+
+
+class _LiveAdapter:
+    def __init__(self, live_messages):
+        self.live_messages = live_messages
+        self.on_message = None
+
+    async def subscribe_new_messages(self, channel_handles, on_message):
+        self.on_message = on_message
+        return lambda: None
+
+    async def stream_messages(
+        self, channel_handles, last_fetch, on_page, cursors, until
+    ):
+        pass
+
+    async def run_until_disconnected(self):
+        for message in self.live_messages:
+            await self.on_message(message)
+
+
+@pytest.mark.asyncio
+async def test_run_watch_pipeline_prebatches_flushes(tmp_path, fetch_store):
+    live = [make_message(1, text="same"), make_message(2, 2, "same")]
+    prebatch_pipeline = PrebatchPipeline(str(tmp_path / "prebatches"))
+
+    await run_watch_pipeline(
+        fetch_store=fetch_store,
+        telegram_api_adapter=_LiveAdapter(live),
+        channel_handles=["@chan1", "@chan2"],
+        catch_up_start=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        flush_size=100,
+        flush_interval=3600,
+        prebatch_pipeline=prebatch_pipeline,
+    )
+
+    catch_up, live_flush = fetch_store.get_filenames()
+    assert fetch_store.load_messages_by_filename(catch_up) == []
+    assert len(fetch_store.load_messages_by_filename(live_flush)) == 2
+    prebatched = prebatch_pipeline.prebatchStore.get_file_by_index(0)["content"]
+    assert len(prebatched) == 1
+    assert prebatched[0]["dup_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_catch_up_keeps_the_fetch_state(tmp_path, fetch_store):
+    last_fetch = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    cursors = {1: ChannelCursor(1, 5, "2025-01-01T00:00:05+00:00")}
+    fetch_store.save_last_fetch_times(last_fetch, cursors)
+
+    class _FailingAdapter(_LiveAdapter):
+        async def stream_messages(self, *args, **kwargs):
+            await self.on_message(make_message(100))
+            raise ConnectionError("dropped")
+
+    with pytest.raises(RuntimeError):
+        await run_watch_pipeline(
+            fetch_store=fetch_store,
+            telegram_api_adapter=_FailingAdapter([]),
+            channel_handles=["@chan1"],
+            catch_up_start=last_fetch,
+            flush_size=100,
+            flush_interval=3600,
+        )
+
+    assert fetch_store.load_last_fetch_times() == last_fetch
+    assert fetch_store.load_channel_cursors() == cursors
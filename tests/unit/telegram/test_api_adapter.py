@@ -1,9 +1,14 @@
-from datetime import datetime
+import asyncio
+from datetime import datetime, timedelta, timezone
 import pytest
 from unittest.mock import MagicMock, patch
 
 from dropspy.telegram.api_adapter import TelegramAPIAdapter
+from dropspy.telegram.entity_cache import EntityCache
+from dropspy.telegram.types import ChannelCursor, PagingCheckpoint
 from telethon import TelegramClient
+from telethon.errors import ChannelInvalidError, FloodWaitError
+from telethon.tl.types import Channel, ChatPhotoEmpty, Message, PeerChannel
 
 
 @pytest.fixture
@@ -34,3 +39,202 @@ def test_fetch_channel_messages(telegram_client, telegram_api_adapter):
     assert telegram_api_adapter.fetch_channel_messages("@test", datetime.now()) == [
         MagicMock()
     ]
+
+
+class _StubClient:
+    def __init__(self, histories, flood_waits=0, delay=0.0):
+        self.histories = histories
+        self.flood_waits = flood_waits
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.resolved = []
+        self.stale_ids = set()
+        self.requests = []
+
+    async def get_entity(self, handles):
+        self.resolved.extend(handles)
+        return [self.histories[h]["entity"] for h in handles]
+
+    async def iter_messages(
+        self, entity, offset_id=0, offset_date=None, min_id=0, limit=100
+    ):
+        self.requests.append(limit)
+        if self.flood_waits:
+            self.flood_waits -= 1
+            raise FloodWaitError(request=None, capture=0)
+        if (entity.id, entity.access_hash) in self.stale_ids:
+            raise ChannelInvalidError(request=None)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        messages = self.histories[f"@{entity.username}"]["messages"]
+        page = [
+            m
+            for m in messages
+            if (not offset_id or m.id < offset_id)
+            and (not offset_date or m.date < offset_date)
+            and m.id > min_id
+        ]
+        for message in page[:limit]:
+            yield message
+
+
+def _make_history(channel_id, username, count, since):
+    entity = Channel(
+        id=channel_id,
+        title=username,
+        photo=ChatPhotoEmpty(),
+        date=None,
+        username=username,
+        access_hash=channel_id * 1000,
+    )
+    messages = [
+        Message(
+            id=i,
+            peer_id=PeerChannel(channel_id),
+            date=since + timedelta(minutes=i),
+            message=f"{username} {i}",
+        )
+        for i in range(count, 0, -1)
+    ]
+    return {"entity": entity, "messages": messages}
+
+
+@pytest.fixture
+def offline_adapter(tmp_path):
+    return TelegramAPIAdapter(
+        1, "hash", str(tmp_path / "session"), max_concurrent_fetches=3
+    )
+
+
+@pytest.mark.asyncio
+async def test_fetch_messages_runs_channels_concurrently(offline_adapter):
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    histories = {
+        f"@chan{i}": _make_history(i, f"chan{i}", 5, since) for i in range(1, 6)
+    }
+    client = _StubClient(histories, delay=0.01)
+    offline_adapter.client = client
+
+    messages = await offline_adapter.fetch_messages(list(histories), since)
+
+    assert len(messages) == 25
+    assert [m.time for m in messages] == sorted(m.time for m in messages)
+    assert client.max_active == 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_messages_retries_after_flood_wait(offline_adapter):
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    histories = {"@chan1": _make_history(1, "chan1", 3, since)}
+    offline_adapter.client = _StubClient(histories, flood_waits=2)
+
+    messages = await offline_adapter.fetch_messages(list(histories), since)
+
+    assert [m.id for m in messages] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_fetch_messages_uses_channel_cursor(offline_adapter):
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    histories = {
+        "@chan1": _make_history(1, "chan1", 5, since),
+        "@chan2": _make_history(2, "chan2", 2, since),
+    }
+    offline_adapter.client = _StubClient(histories)
+    cursors = {1: ChannelCursor(1, 3, (since + timedelta(minutes=3)).isoformat())}
+
+    messages = await offline_adapter.fetch_messages(list(histories), since, cursors)
+
+    assert [(m.channel_id, m.id) for m in messages if m.channel_id == 1] == [
+        (1, 4),
+        (1, 5),
+    ]
+    assert len([m for m in messages if m.channel_id == 2]) == 2
+
+
+@pytest.mark.asyncio
+async def test_warm_entity_cache_skips_resolution(offline_adapter, tmp_path):
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    histories = {
+        "@chan1": _make_history(1, "chan1", 2, since),
+        "@chan2": _make_history(2, "chan2", 2, since),
+    }
+    client = _StubClient(histories)
+    offline_adapter.client = client
+    offline_adapter.entity_cache = EntityCache(str(tmp_path), timedelta(hours=1))
+
+    await offline_adapter.fetch_messages(["@chan1"], since)
+    messages = await offline_adapter.fetch_messages(["@chan1", "@chan2"], since)
+
+    assert client.resolved == ["@chan1", "@chan2"]
+    assert len(messages) == 4
+
+
+@pytest.mark.asyncio
+async def test_stale_cached_entity_is_resolved_again(offline_adapter, tmp_path):
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    histories = {"@chan1": _make_history(1, "chan1", 2, since)}
+    client = _StubClient(histories)
+    offline_adapter.client = client
+    offline_adapter.entity_cache = EntityCache(str(tmp_path), timedelta(hours=1))
+    await offline_adapter.fetch_messages(["@chan1"], since)
+
+    # The channel was recreated: the cached access hash is no longer valid
+    client.stale_ids.add((1, 1000))
+    histories["@chan1"]["entity"].access_hash = 2000
+    messages = await offline_adapter.fetch_messages(["@chan1"], since)
+
+    assert client.resolved == ["@chan1", "@chan1"]
+    assert len(messages) == 2
+    assert offline_adapter.entity_cache.get("@chan1").access_hash == 2000
+
+
+@pytest.mark.asyncio
+async def test_paging_is_bounded_by_time_not_call_count(tmp_path):
+    adapter = TelegramAPIAdapter(
+        1, "hash", str(tmp_path / "session"), limit_per_api_call=10, min_page_size=2
+    )
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    histories = {"@chan1": _make_history(1, "chan1", 500, since)}
+    client = _StubClient(histories)
+    adapter.client = client
+
+    messages = await adapter.fetch_messages(
+        ["@chan1"],
+        since + timedelta(minutes=100),
+        until=since + timedelta(minutes=450),
+    )
+
+    # Messages 101..449 are inside the window (end exclusive)
+    assert [m.id for m in messages] == list(range(101, 450))
+    assert client.requests[:5] == [2, 4, 8, 10, 10]
+
+
+@pytest.mark.asyncio
+async def test_stream_messages_resumes_from_checkpoint(offline_adapter):
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    histories = {
+        "@chan1": _make_history(1, "chan1", 50, since),
+        "@chan2": _make_history(2, "chan2", 5, since),
+    }
+    offline_adapter.client = _StubClient(histories)
+    pages = []
+
+    async def on_page(entity, messages, checkpoint):
+        pages.append((entity.id, [m.id for m in messages], checkpoint))
+
+    await offline_adapter.stream_messages(
+        ["@chan1", "@chan2"],
+        since,
+        on_page,
+        checkpoints={
+            1: PagingCheckpoint(1, 11, False),
+            2: PagingCheckpoint(2, 0, True),
+        },
+    )
+
+    assert [ids for _, ids, _ in pages] == [list(range(10, 0, -1))]
+    assert pages[-1][2] == PagingCheckpoint(1, 1, True)
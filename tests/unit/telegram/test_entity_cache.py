@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from telethon.tl.types import Channel, ChatPhotoEmpty
+from dropspy.telegram.entity_cache import EntityCache
+
+
+def make_channel(id=1, username="chan1", access_hash=1234):
+    return Channel(
+        id=id,
+        title=f"Title {id}",
+        photo=ChatPhotoEmpty(),
+        date=None,
+        access_hash=access_hash,
+        username=username,
+    )
+
+
+@pytest.fixture
+def entity_cache(tmp_path):
+    return EntityCache(str(tmp_path), ttl=timedelta(hours=1))
+
+
+def test_put_save_and_reload(tmp_path, entity_cache):
+    entity_cache.put("@chan1", make_channel())
+    entity_cache.save()
+
+    reloaded = EntityCache(str(tmp_path), ttl=timedelta(hours=1))
+    cached = reloaded.get("@chan1")
+    assert cached is not None
+    channel = cached.to_channel()
+    assert (channel.id, channel.access_hash, channel.username) == (1, 1234, "chan1")
+
+
+def test_expired_entry_is_ignored(entity_cache):
+    entity_cache.put("@chan1", make_channel())
+    expired = datetime.now(tz=timezone.utc) - timedelta(hours=2)
+    entity_cache.entries["@chan1"].resolved_at = expired.isoformat()
+
+    assert entity_cache.get("@chan1") is None
+
+
+def test_invalidate_by_channel_id(entity_cache):
+    entity_cache.put("@chan1", make_channel(1))
+    entity_cache.put("@chan2", make_channel(2, "chan2"))
+
+    assert entity_cache.invalidate(2) == "@chan2"
+    assert entity_cache.get("@chan2") is None
+    assert entity_cache.get("@chan1") is not None
+    assert entity_cache.invalidate(3) is None
+
+
+def test_channel_without_access_hash_is_not_cached(entity_cache):
+    entity_cache.put("@chan1", make_channel(access_hash=None))
+    assert entity_cache.get("@chan1") is None
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from dropspy.telegram.api_adapter import TelegramAPIAdapter
+from dropspy.telegram.benchmark import run_fetch_benchmark
+from dropspy.telegram.fake_client import (
+    FakeTelegramClient,
+    recorded_channels,
+    synthetic_channels,
+)
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test_adapter_fetches_synthetic_history():
+    channels = synthetic_channels(3, 250, START)
+    client = FakeTelegramClient(channels, page_size=50)
+    adapter = TelegramAPIAdapter(0, "", "", client=client)
+
+    messages = await adapter.fetch_messages(
+        list(channels), START + timedelta(minutes=100)
+    )
+
+    assert len(messages) == 3 * 150
+    assert [m.time for m in messages] == sorted(m.time for m in messages)
+    assert {m.channel_handle for m in messages} == set(channels)
+
+
+@pytest.mark.asyncio
+async def test_injected_flood_waits_are_retried():
+    channels = synthetic_channels(4, 120, START)
+    client = FakeTelegramClient(channels, flood_wait_every=3)
+
+    result = await run_fetch_benchmark(
+        client, list(channels), START, max_concurrent_fetches=2
+    )
+
+    assert result.messages == 4 * 120
+    assert result.flood_waits > 0
+    assert result.requests > result.flood_waits
+
+
+@pytest.mark.asyncio
+async def test_recorded_history_and_live_messages():
+    records = [
+        {
+            "id": i,
+            "channel_id": 7,
+            "channel_handle": "@recorded",
+            "time": (START + timedelta(minutes=i)).isoformat(),
+            "text": f"recorded {i}",
+        }
+        for i in range(1, 4)
+    ]
+    client = FakeTelegramClient(recorded_channels(records))
+    adapter = TelegramAPIAdapter(0, "", "", client=client)
+    live = []
+
+    async def on_message(message):
+        live.append(message)
+
+    await adapter.subscribe_new_messages(["@recorded"], on_message)
+    await client.publish("@recorded", "fresh")
+    messages = await adapter.fetch_messages(["@recorded"], START)
+
+    assert [m.text for m in messages] == [
+        "recorded 1",
+        "recorded 2",
+        "recorded 3",
+        "fresh",
+    ]
+    assert [(m.id, m.text) for m in live] == [(4, "fresh")]
@@ -0,0 +1,48 @@
+from dropspy.telegram.message_batch import MessageBatch, merge_batches
+from dropspy.telegram.types import RawMessage
+
+
+def make_messages():
+    return [
+        RawMessage(3, 10, "@chan10", "2025-01-01T00:03:00+00:00", "third"),
+        RawMessage(1, 20, "@chan20", "2025-01-01T00:01:00+00:00", "first"),
+        RawMessage(2, 10, "@chan10", "2025-01-01T00:02:00+00:00", "second"),
+    ]
+
+
+def test_round_trips_messages():
+    messages = make_messages()
+    batch = MessageBatch.from_messages(messages)
+
+    assert len(batch) == 3
+    assert list(batch.messages()) == messages
+    assert MessageBatch.from_records(batch.to_json()).to_json() == batch.to_json()
+
+
+def test_handles_are_stored_once():
+    batch = MessageBatch.from_messages(make_messages())
+
+    assert list(batch.handle_indexes) == [0, 1, 0]
+    assert batch.handle(0) is batch.handle(2)
+
+
+def test_sorted_by_time_and_select():
+    batch = MessageBatch.from_messages(make_messages()).sorted_by_time()
+
+    assert list(batch.ids) == [1, 2, 3]
+    assert [r["channel_handle"] for r in batch] == ["@chan20", "@chan10", "@chan10"]
+    assert [r["text"] for r in batch.select([2, 0])] == ["third", "first"]
+
+
+def test_merge_batches_from_newest_first_channels():
+    chan10 = MessageBatch.from_messages(
+        [m for m in make_messages() if m.channel_id == 10]
+    )
+    chan20 = MessageBatch.from_messages(
+        [m for m in make_messages() if m.channel_id == 20]
+    )
+
+    merged = merge_batches([chan10, chan20], newest_first=True)
+
+    assert list(merged.ids) == [1, 2, 3]
+    assert [merged.handle(i) for i in range(3)] == ["@chan20", "@chan10", "@chan10"]
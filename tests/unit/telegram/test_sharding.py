@@ -0,0 +1,51 @@
+import pytest
+from datetime import datetime, timezone
+from dropspy.telegram.sharding import ShardedTelegramAPIAdapter
+from dropspy.telegram.types import RawMessage
+
+
+class _ShardAdapter:
+    def __init__(self):
+        self.requested = []
+
+    async def fetch_messages(self, channel_handles, last_fetch, cursors, until):
+        self.requested.extend(channel_handles)
+        return [
+            RawMessage(
+                id=1,
+                channel_id=len(handle),
+                channel_handle=handle,
+                time=f"2025-01-01T00:{len(handle):02d}:00+00:00",
+                text=handle,
+            )
+            for handle in channel_handles
+        ]
+
+
+HANDLES = [f"@channel_{'x' * i}" for i in range(12)]
+
+
+def test_shard_assignment_is_stable():
+    sharded = ShardedTelegramAPIAdapter([_ShardAdapter() for _ in range(3)])
+    again = ShardedTelegramAPIAdapter([_ShardAdapter() for _ in range(3)])
+
+    shards = sharded.partition(HANDLES)
+
+    assert shards == again.partition(HANDLES)
+    assert sorted(h for shard in shards for h in shard) == sorted(HANDLES)
+    assert all(shards)
+    assert sharded.shard_for("@Channel_X") == sharded.shard_for("channel_x")
+
+
+@pytest.mark.asyncio
+async def test_fetch_messages_merges_shards():
+    adapters = [_ShardAdapter() for _ in range(3)]
+    sharded = ShardedTelegramAPIAdapter(adapters)
+
+    messages = await sharded.fetch_messages(
+        HANDLES, datetime(2025, 1, 1, tzinfo=timezone.utc)
+    )
+
+    assert [m.channel_handle for m in messages] == HANDLES
+    for adapter, shard in zip(adapters, sharded.partition(HANDLES)):
+        assert adapter.requested == shard
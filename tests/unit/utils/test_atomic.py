@@ -0,0 +1,19 @@
+import os
+import pytest
+from dropspy.utils import atomic
+from dropspy.utils.atomic import write_atomic
+
+
+def test_failed_write_keeps_the_old_file_and_no_part(tmp_path, monkeypatch):
+    path = tmp_path / "state.json"
+    write_atomic(str(path), b"old")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(atomic.os, "replace", fail)
+    with pytest.raises(OSError):
+        write_atomic(str(path), b"new")
+
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["state.json"]
@@ -0,0 +1,103 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from dropspy.pipeline.batch import BatchStore
+from dropspy.pipeline.fetch import FetchStore, _make_messages_filename
+from dropspy.telegram.types import RawMessage
+from dropspy.utils.blob_store import TEXT_REF_KEY, BlobStore
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    yield store
+    store.close()
+
+
+def make_message(id, text):
+    return RawMessage(id, 1, "@chan1", f"2025-01-01T00:0{id}:00+00:00", text)
+
+
+def test_dehydrate_and_hydrate_round_trip(blob_store):
+    records = [{"id": 1, "text": "hi", "dup_count": 2}, {"id": 2, "text": "hi"}]
+
+    stored = list(blob_store.dehydrate(records))
+
+    assert all("text" not in r and TEXT_REF_KEY in r for r in stored)
+    assert list(stored[0]) == ["id", TEXT_REF_KEY, "dup_count"]
+    assert blob_store.count() == 1
+    assert "hi" in blob_store and "bye" not in blob_store
+    assert list(blob_store.hydrate(stored)) == records
+
+
+def test_normalized_text_is_stored_as_a_hash_too(blob_store):
+    records = [
+        {"id": 1, "text": "Hi!", "normalized_text": "hi"},
+        {"id": 2, "text": "hi", "normalized_text": "hi"},
+    ]
+
+    stored = list(blob_store.dehydrate(records))
+
+    assert list(stored[0]) == ["id", TEXT_REF_KEY, "normalized_text_hash"]
+    assert stored[1][TEXT_REF_KEY] == stored[1]["normalized_text_hash"]
+    assert blob_store.count() == 2
+    assert list(blob_store.hydrate(stored)) == records
+
+
+def test_missing_text_is_an_error(blob_store):
+    with pytest.raises(RuntimeError):
+        list(blob_store.hydrate([{"id": 1, TEXT_REF_KEY: "00" * 16}]))
+
+
+def test_overlapping_fetch_files_share_texts(tmp_path, blob_store):
+    fetch_store = FetchStore(str(tmp_path / "fetches"), blob_store=blob_store)
+    first = [make_message(1, "airdrop"), make_message(2, "claim now")]
+    second = first[1:] + [make_message(3, "airdrop")]
+    filenames = [
+        _make_messages_filename(
+            f"2025-01-0{day}T00:00:00+00:00", f"2025-01-0{day + 1}T00:00:00+00:00"
+        )
+        for day in (1, 2)
+    ]
+
+    for filename, messages in zip(filenames, (first, second)):
+        fetch_store.save_messages(filename, messages)
+
+    assert blob_store.count() == 2
+    saved = (tmp_path / "fetches" / filenames[1]).read_text(encoding="utf-8")
+    assert "claim now" not in saved
+    assert fetch_store.load_messages_by_filename(filenames[1]) == second
+    assert list(fetch_store.iter_message_records(filenames[0])) == [
+        m.to_json() for m in first
+    ]
+
+
+def test_streamed_fetch_files_are_dehydrated(tmp_path, blob_store):
+    fetch_store = FetchStore(str(tmp_path / "fetches"), blob_store=blob_store)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2025, 1, 2, tzinfo=timezone.utc)
+    stream = fetch_store.open_stream(start, end)
+    messages = [make_message(2, "second"), make_message(1, "first")]
+
+    stream.write_page(1, messages)
+    path = stream.finalize()
+
+    with open(path, encoding="utf-8") as f:
+        assert all(TEXT_REF_KEY in json.loads(line) for line in f)
+    assert [m.text for m in fetch_store.iter_messages_between(start, end)] == [
+        "first",
+        "second",
+    ]
+
+
+def test_batch_files_keyed_by_index_are_dehydrated(tmp_path, blob_store):
+    batch_store = BatchStore(str(tmp_path / "batches"), blob_store=blob_store)
+    batches = [[{"text": "a", "dup_count": 1}, {"text": "b", "dup_count": 3}]]
+
+    (path,) = batch_store.save(batches, "input.json")
+
+    assert "dup_count" in open(path, encoding="utf-8").read()
+    assert blob_store.count() == 2
+    assert batch_store._load(path) == {str(i): m for i, m in enumerate(batches[0])}
@@ -1,6 +1,8 @@
 import pytest
 import json
+from datetime import datetime, timezone
 from pathlib import Path
+from dropspy.telegram.types import RawMessage
 from dropspy.utils.json_store import JSONStore
 
 
@@ -63,4 +65,35 @@ def test_save_load_list(file_store):
     assert (file_store.data_dir / filename).exists()
 
     loaded_data = file_store._load(filename)
-    assert loaded_data == data
\ No newline at end of file
+    assert loaded_data == data
+
+
+def test_registered_and_flat_records_take_the_fast_path(file_store):
+    message = RawMessage(1, 2, "@chan", "2025-01-01T00:00:00+00:00", "hi")
+    prebatched = {"text": "hi", "dup_count": 2}
+
+    serialized = file_store._make_serializable([message, prebatched])
+
+    assert serialized == [message.to_json(), prebatched]
+    assert serialized[1] is prebatched
+
+
+def test_unknown_types_fall_back_to_generic_walker(file_store):
+    time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    assert file_store._make_serializable({1: (time, {"nested": [1]})}) == {
+        "1": [str(time), {"nested": [1]}]
+    }
+
+
+def test_interrupted_save_keeps_the_previous_file(file_store, monkeypatch):
+    file_store._save("test.json", [{"key": "old"}])
+
+    def crash(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("dropspy.utils.atomic.os.fsync", crash)
+    with pytest.raises(RuntimeError):
+        file_store._save("test.json", [{"key": "new"}])
+
+    assert file_store._load("test.json") == [{"key": "old"}]
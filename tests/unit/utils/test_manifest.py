@@ -0,0 +1,110 @@
+from datetime import datetime, timezone
+import json
+from dropspy.pipeline.batch import BatchStore
+from dropspy.pipeline.fetch import FetchStore
+from dropspy.pipeline.prebatch import PrebatchPipeline
+from dropspy.utils import manifest as manifest_module
+from dropspy.utils.manifest import MANIFEST_FILENAME, Manifest
+
+RECORDS = [
+    {"id": 2, "time": "2025-01-01T09:30:00+09:00", "text": "b"},
+    {"id": 1, "time": "2025-01-01T00:10:00+00:00", "text": "a"},
+]
+
+
+def test_save_records_manifest_entry(tmp_path):
+    store = FetchStore(str(tmp_path))
+    path = store.save_messages("window.json", RECORDS)
+    store.save_last_fetch_times(datetime(2025, 1, 2, tzinfo=timezone.utc))
+
+    entry = Manifest(str(tmp_path)).get("window.json")
+
+    assert entry.stage == "fetch"
+    assert entry.count == 2
+    assert (entry.start, entry.end) == (RECORDS[1]["time"], RECORDS[0]["time"])
+    assert entry.bytes == (tmp_path / "window.json").stat().st_size
+    assert store.get_filenames() == ["window.json"]
+    assert store.content_hash("window.json") == entry.content_hash
+    assert path.endswith("window.json")
+
+
+def test_manifest_is_rebuilt_for_existing_files(tmp_path):
+    (tmp_path / "legacy.json").write_text(json.dumps(RECORDS), encoding="utf-8")
+    (tmp_path / "last_fetch.json").write_text("{}", encoding="utf-8")
+
+    store = FetchStore(str(tmp_path))
+
+    assert store.get_filenames() == ["legacy.json"]
+    assert store.manifest.get("legacy.json").count == 2
+    assert (tmp_path / MANIFEST_FILENAME).exists()
+
+
+def test_unchanged_input_is_not_prebatched_again(tmp_path):
+    fetch_store = FetchStore(str(tmp_path / "fetches"))
+    fetch_store.save_messages("window.json", RECORDS)
+    source_hash = fetch_store.content_hash("window.json")
+    pipeline = PrebatchPipeline(str(tmp_path / "prebatches"))
+
+    first = pipeline.run_prebatch_pipeline("window.json", RECORDS, source_hash)
+    consumed = []
+    again = pipeline.run_prebatch_pipeline(
+        "window.json", (consumed.append(r) or r for r in RECORDS), source_hash
+    )
+
+    assert again == first
+    assert consumed == []
+    assert pipeline.prebatchStore.manifest.get("window.json").source_hash == (
+        source_hash
+    )
+
+
+def test_batch_parts_are_renamed_in_manifest(tmp_path):
+    store = BatchStore(str(tmp_path))
+
+    store.save([[RECORDS[0]], [RECORDS[1]]], "window.json")
+
+    assert store.manifest.filenames() == ["window/1of2.json", "window/2of2.json"]
+
+
+def test_stores_sharing_a_directory_see_each_others_files(tmp_path):
+    first = FetchStore(str(tmp_path))
+    second = FetchStore(str(tmp_path))
+    first.get_filenames()
+    second.get_filenames()
+
+    first.save_messages("a.json", RECORDS)
+    second.save_messages("b.json", RECORDS)
+
+    assert first.get_filenames() == ["a.json", "b.json"]
+    assert second.get_filenames() == ["a.json", "b.json"]
+    assert first.content_hash("b.json") == second.content_hash("b.json")
+
+
+def test_rebuild_picks_up_files_changed_outside_the_store(tmp_path):
+    store = FetchStore(str(tmp_path))
+    store.save_messages("a.json", RECORDS)
+    store.save_messages("b.json", RECORDS)
+
+    (tmp_path / "a.json").unlink()
+    (tmp_path / "c.json").write_text(json.dumps(RECORDS), encoding="utf-8")
+    # Listings read the manifest only
+    assert store.get_filenames() == ["a.json", "b.json"]
+
+    store.rebuild_manifest()
+
+    assert store.get_filenames() == ["b.json", "c.json"]
+    assert Manifest(str(tmp_path)).get("c.json").count == 2
+
+
+def test_batch_save_writes_the_manifest_once(tmp_path, monkeypatch):
+    store = BatchStore(str(tmp_path))
+    store.manifest.filenames()
+    writes = []
+    monkeypatch.setattr(
+        manifest_module, "write_atomic", lambda path, raw: writes.append(path)
+    )
+
+    store.save([[record] for record in RECORDS * 5], "window.json")
+
+    assert len(writes) == 1
+    assert len(store.manifest.filenames()) == 10
@@ -0,0 +1,13 @@
+from dropspy.utils.merge import merge_by_time
+
+
+def test_merge_by_time_compares_instants_not_strings():
+    utc = [{"id": 1, "time": "2025-01-01T00:30:00+00:00"}]
+    kst = [
+        {"id": 2, "time": "2025-01-01T09:00:00+09:00"},
+        {"id": 3, "time": "2025-01-01T09:45:00+09:00"},
+    ]
+
+    merged = merge_by_time([utc, kst], time_of=lambda record: record["time"])
+
+    assert [record["id"] for record in merged] == [2, 1, 3]
@@ -0,0 +1,22 @@
+from dropspy.utils.minhash import MinHasher, NearDuplicateIndex, similarity
+
+
+def test_similarity_tracks_shared_text():
+    hasher = MinHasher()
+    base = "Claim your free tokens now at https://example.com/ref?code="
+
+    same = similarity(hasher.signature(base + "a"), hasher.signature(base + "a"))
+    near = similarity(hasher.signature(base + "a"), hasher.signature(base + "b"))
+    far = similarity(hasher.signature(base), hasher.signature("Weekly market recap"))
+
+    assert same == 1.0
+    assert near > 0.7
+    assert far < 0.2
+
+
+def test_index_returns_the_first_similar_key():
+    index = NearDuplicateIndex(threshold=0.7)
+    texts = ["hello  world", "Hello world", "something else entirely", "hello world "]
+
+    assert [index.find_or_add(i, t) for i, t in enumerate(texts)] == [0, 0, 2, 0]
+    assert len(index) == 2
@@ -0,0 +1,40 @@
+import pytest
+from dropspy.utils.ndjson import (
+    append_records,
+    iter_records,
+    iter_records_reversed,
+    write_indexed_records,
+)
+
+
+def test_iter_records_reversed_across_chunks(tmp_path):
+    path = tmp_path / "records.ndjson"
+    records = [{"id": i, "text": "에어드랍 " * (i % 7)} for i in range(200)]
+    with open(path, "w", encoding="utf-8") as f:
+        append_records(f, records)
+
+    assert list(iter_records(str(path))) == records
+    assert list(iter_records_reversed(str(path), chunk_size=37)) == records[::-1]
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = tmp_path / "records.ndjson"
+    with open(path, "w", encoding="utf-8") as f:
+        append_records(f, [{"id": 1}, {"id": 2}])
+        f.write('{"id": 3, "te')
+
+    assert list(iter_records(str(path))) == [{"id": 1}, {"id": 2}]
+    assert list(iter_records_reversed(str(path))) == [{"id": 2}, {"id": 1}]
+
+
+def test_indexed_records_must_be_in_time_order(tmp_path):
+    path = tmp_path / "segment.ndjson"
+    records = [
+        {"id": 1, "channel_id": 1, "time": "2025-01-01T05:00:00+00:00"},
+        {"id": 2, "channel_id": 1, "time": "2025-01-01T03:00:00+00:00"},
+    ]
+
+    with pytest.raises(ValueError):
+        write_indexed_records(str(path), records)
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from dropspy.utils.hashing import text_digest
+from dropspy.utils.seen_index import BloomFilter, SeenIndex
+
+NOW = datetime(2025, 1, 10, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def seen_index(tmp_path):
+    index = SeenIndex(str(tmp_path), max_age=timedelta(days=7), max_entries=3)
+    yield index
+    index.close()
+
+
+def digests(*texts):
+    return [text_digest(text) for text in texts]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    added = digests(*(str(i) for i in range(1000)))
+    for digest in added:
+        bloom.add(digest)
+
+    assert all(digest in bloom for digest in added)
+    assert sum(d in bloom for d in digests(*(f"x{i}" for i in range(1000)))) < 50
+
+
+def test_texts_count_as_seen_only_from_other_sources(seen_index):
+    assert seen_index.check_and_add(digests("a", "b"), "day1", NOW) == [False, False]
+    assert seen_index.check_and_add(digests("a", "c"), "day1", NOW) == [False, False]
+    assert seen_index.check_and_add(digests("a", "d"), "day2", NOW) == [True, False]
+
+
+def test_index_survives_reopening(tmp_path, seen_index):
+    seen_index.check_and_add(digests("a"), "day1", NOW)
+    reopened = SeenIndex(str(tmp_path))
+
+    assert reopened.check_and_add(digests("a"), "day2", NOW) == [True]
+    reopened.close()
+
+
+def test_sees_texts_added_by_another_process(tmp_path, seen_index):
+    seen_index.check_and_add(digests("a"), "day1", NOW)
+    other = SeenIndex(str(tmp_path))
+    other.check_and_add(digests("repost"), "day1", NOW)
+    other.close()
+
+    assert seen_index.check_and_add(digests("repost"), "day2", NOW) == [True]
+
+
+def test_age_out_forgets_old_and_excess_texts(seen_index):
+    seen_index.check_and_add(digests("old"), "day1", NOW - timedelta(days=8))
+    seen_index.check_and_add(digests("a", "b"), "day2", NOW - timedelta(days=2))
+    seen_index.check_and_add(digests("c", "d"), "day3", NOW)
+
+    assert seen_index.age_out(NOW) == 2
+    assert len(seen_index) == 3
+    assert seen_index.check_and_add(digests("old"), "day4", NOW) == [False]
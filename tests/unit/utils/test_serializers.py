@@ -0,0 +1,105 @@
+import json
+import pytest
+from dropspy.pipeline.fetch import FetchStore
+from dropspy.utils.json_store import JSONStore
+from dropspy.utils.serializers import (
+    Serializer,
+    iter_items,
+    loads,
+    make_serializer,
+    split_extension,
+)
+
+RECORDS = [{"id": 1, "text": "에어드랍 open"}, {"id": 2, "text": ""}]
+
+
+@pytest.mark.parametrize(
+    "format, compression, module",
+    [
+        ("json", "", None),
+        ("orjson", "", "orjson"),
+        ("msgpack", "", "msgpack"),
+        ("json", "zstd", "zstandard"),
+        ("msgpack", "zstd", "zstandard"),
+    ],
+)
+def test_formats_round_trip_and_are_detected(format, compression, module):
+    if module is not None:
+        pytest.importorskip(module)
+    if format == "msgpack":
+        pytest.importorskip("msgpack")
+    serializer = make_serializer(format, compression)
+
+    raw = serializer.dumps(RECORDS)
+
+    assert serializer.loads(raw) == RECORDS
+    assert loads(raw) == RECORDS
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        make_serializer("yaml")
+
+
+def test_serializer_missing_a_method_cannot_be_created():
+    class DumpOnly(Serializer):
+        def dumps(self, data):
+            return b""
+
+    with pytest.raises(TypeError):
+        DumpOnly()
+
+
+def test_split_extension_keeps_dots_in_stem():
+    name = "2025-01-01T00:00:00.5+00:00~2025-01-02T00:00:00+00:00"
+
+    assert split_extension(f"{name}.json.zst") == (name, ".json.zst")
+    assert split_extension(f"{name}.ndjson") == (name, ".ndjson")
+    assert split_extension("notes.txt") == ("notes.txt", "")
+
+
+def test_store_reads_files_saved_in_another_format(tmp_path):
+    orjson = pytest.importorskip("orjson")
+    compact = JSONStore(tmp_path, serializer=make_serializer("orjson"))
+    path = compact._save("window.json", RECORDS)
+
+    with open(path, "rb") as f:
+        assert f.read() == orjson.dumps(RECORDS)
+    assert JSONStore(tmp_path)._load("window.json") == RECORDS
+
+
+def test_switching_format_replaces_the_old_file(tmp_path):
+    pytest.importorskip("msgpack")
+    FetchStore(tmp_path).save_messages("window.json", RECORDS)
+    binary = FetchStore(tmp_path, serializer=make_serializer("msgpack"))
+
+    path = binary.save_messages("window.json", RECORDS)
+
+    assert path.endswith("window.msgpack")
+    assert binary.get_filenames() == ["window.msgpack"]
+    assert binary._load("window.json") == RECORDS
+
+
+def test_default_serializer_keeps_pretty_json(tmp_path):
+    path = JSONStore(tmp_path)._save("a.json", {"k": "값"})
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == '{\n  "k": "값"\n}'
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_items_reads_across_chunk_boundaries(tmp_path, indent):
+    records = [{"id": i, "text": "에어드랍" * i} for i in range(30)] + [123456]
+    path = tmp_path / "records.json"
+    path.write_text(json.dumps(records, ensure_ascii=False, indent=indent), "utf-8")
+
+    with open(path, "rb") as f:
+        assert list(iter_items(f, chunk_size=5)) == records
+
+
+def test_store_iterates_saved_lists(tmp_path):
+    store = JSONStore(tmp_path)
+    store._save("window.json", RECORDS)
+
+    assert list(store._iter("window.json")) == RECORDS
+    assert list(store._iter("missing.json")) == []
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+import pytest
+
+from dropspy.utils.write_behind import WriteBehind
+
+
+@pytest.mark.asyncio
+async def test_writes_run_in_order_off_the_event_loop():
+    loop_thread = threading.get_ident()
+    written, threads = [], set()
+
+    def write(i):
+        threads.add(threading.get_ident())
+        written.append(i)
+
+    async with WriteBehind(max_pending=2) as writer:
+        for i in range(10):
+            await writer.submit(lambda i=i: write(i))
+
+    assert written == list(range(10))
+    assert loop_thread not in threads
+
+
+@pytest.mark.asyncio
+async def test_submit_waits_while_the_buffer_is_full():
+    release = threading.Event()
+    writer = WriteBehind(max_pending=1)
+    await writer.submit(release.wait)
+    await asyncio.sleep(0.05)  # let the worker pick up the blocked write
+    await writer.submit(lambda: None)
+
+    blocked = asyncio.create_task(writer.submit(lambda: None))
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+
+    release.set()
+    await blocked
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_raised_and_later_writes_are_skipped():
+    written = []
+
+    def fail():
+        raise OSError("disk full")
+
+    writer = WriteBehind()
+    await writer.submit(fail)
+    await writer.submit(lambda: written.append(1))
+    with pytest.raises(RuntimeError, match="disk full"):
+        await writer.drain()
+    assert written == []
+    with pytest.raises(RuntimeError):
+        await writer.submit(lambda: None)
+    with pytest.raises(RuntimeError):
+        await writer.close()